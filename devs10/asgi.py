@@ -3,6 +3,13 @@ ASGI config for devs10 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Logowanie i rejestracja API (kursy.api_views.login_view_api,
+register_view_api) są widokami asynchronicznymi - pod ASGI działają
+natywnie w pętli zdarzeń, a haszowanie haseł odbywa się w ograniczonej
+puli wątków (ustawienie AUTH_ASYNC). Uruchomienie np.:
+
+    uvicorn devs10.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
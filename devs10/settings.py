@@ -49,7 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'kursy.middleware.AuthMiddleware',
+    'kursy.middleware.QueryInspectorMiddleware',
 ]
 
 ROOT_URLCONF = 'devs10.urls'
@@ -71,6 +71,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'devs10.wsgi.application'
 
+# Testy uruchamiane bez limitów żądań (patrz devs10.test_runner)
+TEST_RUNNER = 'devs10.test_runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -123,6 +126,98 @@ STATIC_ROOT = BASE_DIR / 'productionfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR
 
+# Masowe operacje na zapisach: powyżej tej liczby ID operacja wykonuje się w tle
+ENROLLMENT_BULK_BACKGROUND_THRESHOLD = 5000
+
+# Limity załączników: upload jednorazowy (multipart) oraz przesyłanie w częściach
+ATTACHMENT_MAX_SIZE = 10 * 1024 * 1024
+ATTACHMENT_CHUNKED_MAX_SIZE = 512 * 1024 * 1024
+ATTACHMENT_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+# Katalog plików tymczasowych przesyłania w częściach (None - katalog systemowy).
+# Na tym samym systemie plików co MEDIA_ROOT finalizacja to zwykłe przeniesienie pliku.
+ATTACHMENT_UPLOAD_TEMP_DIR = None
+# Sesje przesyłania bez nowych części dłużej niż tyle sekund usuwa komenda expire_chunked_uploads
+ATTACHMENT_UPLOAD_TTL = 24 * 60 * 60
+
+# Deduplikacja załączników: treść przechowywana raz, pod swoją sumą SHA-256
+# (attachments/blobs/...), z licznikiem odwołań usuwanym razem z ostatnim załącznikiem
+ATTACHMENT_DEDUPLICATION = False
+
+# Pobieranie załączników: None (Django wysyła plik), 'x-accel-redirect' (nginx)
+# lub 'x-sendfile' (Apache/lighttpd)
+ATTACHMENT_DOWNLOAD_OFFLOAD = None
+# Lokalizacja 'internal' w nginx wskazująca na MEDIA_ROOT
+ATTACHMENT_ACCEL_REDIRECT_PREFIX = '/protected/'
+
+# Buforowane liczniki pobrań (kursy.counters); 'STORE': 'cache' zapisuje
+# przyrosty we wspólnym cache, co pozwala opróżniać je komendą flush_download_counters
+DOWNLOAD_COUNTER = {
+    'STORE': 'memory',
+    'FLUSH_INTERVAL': 10,
+    'MAX_PENDING': 500,
+    # Przyrosty zapisuje wątek w tle każdego procesu
+    'BACKGROUND_FLUSH': True,
+}
+
+# Cache zbioru kursów dostępnych dla studenta (kursy.access); przy wielu
+# procesach 'CACHE_ALIAS' powinien wskazywać wspólny cache (np. Redis)
+COURSE_ACCESS_CACHE = {
+    # 'auto' - tylko gdy cache jest współdzielony między procesami (przy LocMemCache
+    # cofnięcie dostępu nie dotarłoby do pozostałych procesów)
+    'STORE': 'auto',
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Cache użytkowników dla uwierzytelniania sesją i JWT (kursy.usercache)
+USER_CACHE = {
+    # 'auto' - tylko gdy cache jest współdzielony między procesami (przy LocMemCache
+    # unieważnienie po zmianie hasła nie dotarłoby do pozostałych procesów)
+    'STORE': 'auto',
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    # Użytkownik tokenu dostępu JWT odtwarzany z claimów (email, is_instructor, is_active)
+    # bez zapytania do bazy; zmiany tych pól widoczne po odświeżeniu tokenu
+    'STATELESS_JWT': False,
+}
+
+# Asynchroniczne logowanie i rejestracja (kursy.async_auth)
+AUTH_ASYNC = {
+    # Jednocześnie obsługiwane żądania logowania/rejestracji (na pętlę zdarzeń)
+    'MAX_CONCURRENT': 16,
+    # Wątki haszujące hasła - górna granica CPU zużywanego przez uwierzytelnianie
+    'HASH_WORKERS': 4,
+    # Maksymalny czas oczekiwania w kolejce (s), potem 503 z Retry-After
+    'QUEUE_TIMEOUT': 10,
+}
+
+# Limity żądań logowania, rejestracji, resetu hasła i zapisów (kursy.throttling)
+THROTTLE = {
+    'ENABLED': True,
+    # 'auto' - współdzielony cache (Redis/Memcached), a przy LocMemCache pamięć procesu
+    'STORE': 'auto',
+    'CACHE_ALIAS': 'default',
+    # Liczba zaufanych reverse proxy (np. nginx) dopisujących adres klienta do
+    # X-Forwarded-For. 0 - limity IP liczone po REMOTE_ADDR, nagłówek ignorowany.
+    'NUM_PROXIES': 0,
+    # zakres -> (pojemność wiadra, czas pełnego uzupełnienia w sekundach)
+    'RATES': {
+        'login_ip': (30, 60),
+        'login_account': (10, 300),
+        'register_ip': (10, 3600),
+        'password_reset_ip': (10, 3600),
+        'password_reset_account': (3, 3600),
+        'enroll_user': (20, 60),
+    },
+}
+
+# Cache stron katalogu kursów (kursy.catalog)
+COURSE_CATALOG = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    'PAGE_SIZE': 12,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -134,14 +229,14 @@ AUTH_USER_MODEL = 'kursy.CustomUser'
 # Authentication backends
 AUTHENTICATION_BACKENDS = [
     'kursy.backends.EmailBackend',  # Custom email backend
-    'django.contrib.auth.backends.ModelBackend',  # Fallback to default
+    'kursy.backends.UsernameBackend',  # Fallback to default (ModelBackend)
 ]
 
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'kursy.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -162,6 +257,16 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    # Tokeny z claimami użytkownika dla USER_CACHE['STATELESS_JWT']
+    'TOKEN_OBTAIN_SERIALIZER': 'kursy.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'kursy.authentication.ClaimsTokenRefreshSerializer',
+}
+
+# Wykrywanie zapytań N+1 (kursy.middleware.QueryInspectorMiddleware)
+QUERY_INSPECTOR = {
+    'ENABLED': False,
+    'THRESHOLD': 5,
+    'RAISE': False,
 }
 
 # Login/Logout URLs
@@ -0,0 +1,28 @@
+"""
+Runner testów projektu.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner z wyłączonymi limitami żądań (kursy.throttling)
+    i zapisem liczników pobrań bez wątku w tle (kursy.counters).
+
+    Wiadra w pamięci procesu są wspólne dla wszystkich testów, więc limity
+    zależałyby od kolejności testów. Wątek liczników zapisywałby przyrosty
+    przez osobne połączenie, poza transakcją testu. Testy tych modułów
+    włączają je przez override_settings.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._saved_throttle = getattr(settings, 'THROTTLE', {})
+        self._saved_download_counter = getattr(settings, 'DOWNLOAD_COUNTER', {})
+        settings.THROTTLE = {**self._saved_throttle, 'ENABLED': False}
+        settings.DOWNLOAD_COUNTER = {**self._saved_download_counter, 'BACKGROUND_FLUSH': False}
+
+    def teardown_test_environment(self, **kwargs):
+        settings.THROTTLE = self._saved_throttle
+        settings.DOWNLOAD_COUNTER = self._saved_download_counter
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,90 @@
+"""
+Uprawnienia studentów do kursów.
+
+Zbiór ID kursów z zatwierdzonym zapisem studenta jest trzymany w cache,
+więc sprawdzenie dostępu do kursu, lekcji czy załącznika nie wymaga
+zapytania do bazy. Wpis jest usuwany przy każdej zmianie zapisów
+studenta, która dotyczy statusu 'approved'.
+
+Cofnięcie dostępu musi dotrzeć do wszystkich procesów serwera, dlatego
+w trybie 'auto' cache jest używany tylko wtedy, gdy jest współdzielony
+(np. Redis, Memcached) - przy LocMemCache zapisy są czytane z bazy.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+DEFAULT_COURSE_ACCESS_CACHE = {
+    # 'auto' - tylko współdzielony cache, 'cache' - zawsze, 'none' - bez cache
+    'STORE': 'auto',
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+KEY_PREFIX = 'kursy:access'
+
+
+def _config():
+    return {**DEFAULT_COURSE_ACCESS_CACHE, **getattr(settings, 'COURSE_ACCESS_CACHE', {})}
+
+
+def _cache():
+    """
+    Zwraca cache uprawnień albo None, gdy zbiory kursów nie są cache'owane.
+    """
+    config = _config()
+    if config['STORE'] == 'none':
+        return None
+    cache = caches[config['CACHE_ALIAS']]
+    if config['STORE'] == 'auto' and isinstance(cache, (LocMemCache, DummyCache)):
+        # Cache lokalny dla procesu - unieważnienie nie dotarłoby do pozostałych procesów
+        return None
+    return cache
+
+
+def _key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def approved_course_ids(user):
+    """
+    Zwraca zbiór ID kursów, na które użytkownik ma zatwierdzony zapis.
+    """
+    from .models import Enrollment
+
+    cache = _cache()
+    course_ids = cache.get(_key(user.pk)) if cache is not None else None
+    if course_ids is None:
+        course_ids = frozenset(
+            Enrollment.objects.filter(student_id=user.pk, status='approved')
+            .values_list('course_id', flat=True)
+        )
+        if cache is not None:
+            cache.set(_key(user.pk), course_ids, timeout=_config()['TIMEOUT'])
+    return course_ids
+
+
+def has_course_access(user, course):
+    """
+    Czy użytkownik ma dostęp do treści kursu: prowadzący zawsze,
+    student tylko do widocznego kursu z zatwierdzonym zapisem.
+    """
+    if user.pk == course.instructor_id:
+        return True
+    return course.is_visible and course.pk in approved_course_ids(user)
+
+
+def invalidate_course_access(student_ids):
+    """
+    Usuwa z cache zbiory kursów podanych studentów.
+
+    Wpisy są usuwane od razu i ponownie po zatwierdzeniu transakcji -
+    odczyt w trakcie transakcji mógł zapisać w cache stary stan.
+    """
+    keys = [_key(student_id) for student_id in set(student_ids)]
+    cache = _cache()
+    if not keys or cache is None:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
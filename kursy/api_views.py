@@ -1,58 +1,122 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.contrib.auth import authenticate, login, get_user_model
-from django.http import JsonResponse
-from django.views.decorators.csrf import ensure_csrf_cookie
+from django.urls import reverse
+from django.contrib.auth import aauthenticate, alogin, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from django.views.decorators.http import require_POST
-from django.db import transaction
+from django.db import IntegrityError
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.core.mail import send_mail
 from django.conf import settings
+import csv
+import io
 import json
-from .models import Course, Enrollment, Lesson, Attachment
+from .models import Course, Enrollment, Lesson, Attachment, AttachmentUpload, normalize_email_key
 from .serializers import CourseSerializer, LoginSerializer, EnrollmentSerializer, LessonSerializer, AttachmentSerializer
+from .access import approved_course_ids, has_course_access
+from .async_auth import AuthBusy, auth_async_config, auth_slot, run_hashing
+from .batch import MAX_BATCH_REQUESTS, BatchError, run_batch
+from .counters import get_download_counter
+from .downloads import FileContentNegotiation, serve_attachment
+from .etags import collection_etag, conditional_response, representation_etag
+from .enrollments import (
+    ENROLLMENT_ACTIONS, apply_enrollment_action, apply_enrollment_action_to_matching,
+    import_roster, read_roster_emails,
+)
+from .jobs import get_job, start_job
+from .lessons import MAX_BATCH_OPERATIONS, LessonOrderError, apply_lesson_batch, move_lesson, reorder_lessons
+from .pagination import CourseCursorPagination, EnrollmentCursorPagination
+from . import search
+from .throttling import EnrollThrottle, PasswordResetThrottle, aconsume, client_ip, throttled_response
+from .uploads import (
+    MAX_ATTACHMENTS_PER_LESSON, UploadError, abort_upload, append_chunk, attach_existing_content, finalize_upload,
+    parse_content_range, start_upload, validate_attachment_name,
+)
 
 # Custom permission check for Instructor
 def is_instructor(user):
     return user.is_authenticated and user.is_instructor
 
+def _projection(serializer_class, request):
+    """
+    Odczytuje ?fields= i ?expand= dla serializera.
+    Zwraca (pola, rozwinięcia, odpowiedź z błędem lub None).
+    """
+    fields, unknown = serializer_class.parse_fields(request.query_params.get('fields'))
+    if unknown:
+        return None, None, Response({'detail': f'Nieznane pola: {", ".join(unknown)}'}, status=status.HTTP_400_BAD_REQUEST)
+    expand, unknown = serializer_class.parse_expand(request.query_params.get('expand'))
+    if unknown:
+        return None, None, Response(
+            {'detail': f'Nie można rozwinąć: {", ".join(unknown)}'}, status=status.HTTP_400_BAD_REQUEST
+        )
+    return fields, expand, None
+
+def _auth_busy_response():
+    response = JsonResponse(
+        {'detail': 'Zbyt wiele jednoczesnych prób logowania. Spróbuj ponownie za chwilę.'}, status=503
+    )
+    response['Retry-After'] = str(auth_async_config()['QUEUE_TIMEOUT'])
+    return response
+
 @require_POST
-def login_view_api(request):
+async def login_view_api(request):
     """
     Tradycyjny widok logowania API (bez DRF na razie, dla kompatybilności).
+    Asynchroniczny - przez backendy z AUTHENTICATION_BACKENDS (z sygnałem
+    user_login_failed); hasło jest sprawdzane w puli wątków kursy.async_auth.
     """
     try:
         data = json.loads(request.body)
-        email = data.get('email')
-        password = data.get('password')
-        
-        user = authenticate(request, username=email, password=password)
-        
-        if user is not None:
-            if not user.is_active:
-                return JsonResponse({'detail': 'Konto użytkownika jest nieaktywne.'}, status=401)
-            
-            login(request, user)
-            return JsonResponse({
-                'detail': 'Successfully logged in.',
-                'user': {
-                    'email': user.email,
-                    'is_instructor': user.is_instructor
-                }
-            })
-        else:
-            return JsonResponse({'detail': 'Nieprawidłowy e-mail lub hasło.'}, status=401)
-            
     except json.JSONDecodeError:
         return JsonResponse({'detail': 'Invalid JSON.'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'detail': 'Invalid JSON.'}, status=400)
+    email = data.get('email')
+    password = data.get('password')
+    if not isinstance(email, str) or not isinstance(password, str):
+        return JsonResponse({'detail': 'Wymagane są pola "email" i "password".'}, status=400)
+
+    # Limit sprawdzany przed haszowaniem hasła
+    wait = await aconsume([
+        ('login_ip', client_ip(request)),
+        ('login_account', normalize_email_key(email)),
+    ])
+    if wait:
+        return throttled_response(wait)
+
+    try:
+        async with auth_slot():
+            user = await aauthenticate(request, username=email, password=password)
+    except AuthBusy:
+        return _auth_busy_response()
+
+    if user is None:
+        return JsonResponse({'detail': 'Nieprawidłowy e-mail lub hasło.'}, status=401)
+    if not user.is_active:
+        return JsonResponse({'detail': 'Konto użytkownika jest nieaktywne.'}, status=401)
+
+    await alogin(request, user)
+    return JsonResponse({
+        'detail': 'Successfully logged in.',
+        'user': {
+            'email': user.email,
+            'is_instructor': user.is_instructor
+        }
+    })
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([PasswordResetThrottle])
 def password_reset_api(request):
     """
     Inicjuje proces resetowania hasła (wysyłka email).
@@ -62,8 +126,11 @@ def password_reset_api(request):
 
     if not email:
          return Response({'email': ['To pole jest wymagane.']}, status=status.HTTP_400_BAD_REQUEST)
+    email_key = normalize_email_key(email)
+    if email_key is None:
+        return Response({'email': ['Podaj poprawny adres e-mail.']}, status=status.HTTP_400_BAD_REQUEST)
 
-    user = User.objects.filter(email=email).first()
+    user = User.objects.filter(email_key=email_key).first()
 
     if user:
         # Generowanie tokenu i linku (na razie logujemy link w konsoli, 
@@ -93,14 +160,27 @@ def password_reset_api(request):
     return Response({'message': 'Wysłano email z informacjami o resecie hasła.'}, status=status.HTTP_200_OK)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def register_view_api(request):
+@csrf_exempt
+@require_POST
+async def register_view_api(request):
     """
     Rejestracja nowego użytkownika.
+    Asynchroniczna - hasło jest haszowane w puli wątków kursy.async_auth.
     """
     User = get_user_model()
-    data = request.data
+    wait = await aconsume([('register_ip', client_ip(request))])
+    if wait:
+        return throttled_response(wait)
+
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'detail': 'Invalid JSON.'}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({'detail': 'Invalid JSON.'}, status=400)
+    else:
+        data = request.POST
     
     email = data.get('email')
     password = data.get('password')
@@ -111,12 +191,14 @@ def register_view_api(request):
     
     if not email:
         errors.setdefault('email', []).append('This field is required.')
-    elif User.objects.filter(email=email).exists():
+    elif normalize_email_key(email) is None:
+        errors.setdefault('email', []).append('Enter a valid email address.')
+    elif await User.objects.filter(email_key=normalize_email_key(email)).aexists():
         errors.setdefault('email', []).append('User with this email already exists.')
         
     if not password:
         errors.setdefault('password', []).append('This field is required.')
-    elif len(password) < 8:
+    elif not isinstance(password, str) or len(password) < 8:
         errors.setdefault('password', []).append('Password must be at least 8 characters long.')
         
     if not first_name:
@@ -126,25 +208,57 @@ def register_view_api(request):
         errors.setdefault('last_name', []).append('This field is required.')
         
     if errors:
-        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
-        
+        return JsonResponse(errors, status=400)
+
+    # Username is required by default User model, use email as username
+    user = User(
+        username=User.normalize_username(email),
+        email=User.objects.normalize_email(email),
+        first_name=first_name,
+        last_name=last_name
+    )
+    try:
+        async with auth_slot():
+            user.password = await run_hashing(make_password, password)
+    except AuthBusy:
+        return _auth_busy_response()
+
     try:
-        # Username is required by default User model, use email as username
-        user = User.objects.create_user(
-            username=email,
-            email=email,
-            password=password,
-            first_name=first_name,
-            last_name=last_name
+        await user.asave()
+    except IntegrityError:
+        # Równoległa rejestracja tego samego adresu - chroni unikalny email_key
+        return JsonResponse({'email': ['User with this email already exists.']}, status=400)
+
+    return JsonResponse({
+        'id': user.id,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name
+    }, status=201)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_api(request):
+    """
+    Wiele żądań API w jednym wywołaniu.
+    Oczekuje {"requests": [{"method": str, "path": str, "body": obj,
+    "headers": {"If-Match": str}}], "atomic": bool}. Zwraca odpowiedzi
+    podżądań w tej samej kolejności.
+    """
+    items = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        return Response({'detail': 'Wymagana niepusta lista żądań.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BATCH_REQUESTS:
+        return Response(
+            {'detail': f'Maksymalnie {MAX_BATCH_REQUESTS} żądań w jednym wywołaniu.'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        return Response({
-            'id': user.id,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name
-        }, status=status.HTTP_201_CREATED)
-    except Exception as e:
-        return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    try:
+        results, committed = run_batch(request, items, atomic=request.data.get('atomic') is True)
+    except BatchError as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'responses': results, 'committed': committed})
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -156,9 +270,15 @@ def course_list_create_api(request):
     if request.method == 'GET':
         # TODO: Implement filtering for students (public visible + enrolled)
         # For now, simplistic implementation for instructor/testing
-        courses = Course.objects.all()
-        serializer = CourseSerializer(courses, many=True)
-        return Response(serializer.data)
+        fields, expand, error = _projection(CourseSerializer, request)
+        if error:
+            return error
+        # Paginacja kursorowa po (name, id) - koszt strony nie zależy od jej numeru
+        paginator = CourseCursorPagination()
+        courses = CourseSerializer.optimize_queryset(Course.objects.all(), fields, expand, extra=paginator.ordering)
+        page = paginator.paginate_queryset(courses, request)
+        serializer = CourseSerializer(page, many=True, fields=fields, expand=expand)
+        return paginator.get_paginated_response(serializer.data)
 
     elif request.method == 'POST':
         if not is_instructor(request.user):
@@ -170,29 +290,82 @@ def course_list_create_api(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_api(request):
+    """
+    Wyszukiwanie pełnotekstowe kursów i lekcji (?q=tekst&page=N&page_size=M).
+    Wyniki są posortowane wg trafności i obejmują tylko treści dostępne
+    dla użytkownika: widoczne kursy, a lekcje tylko z kursów prowadzonych
+    lub z zatwierdzonym zapisem.
+    """
+    if not search.is_available():
+        return Response({'detail': 'Wyszukiwanie jest niedostępne.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    text = request.query_params.get('q', '').strip()
+    if not search.build_match_query(text):
+        return Response({'detail': 'Podaj tekst do wyszukania.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'detail': 'Nieprawidłowy numer strony.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Pobieramy o jeden wynik więcej, aby wiedzieć czy istnieje kolejna strona
+    results = search.search(
+        request.user, text, offset=(page - 1) * page_size, limit=page_size + 1,
+        course_ids_with_access=approved_course_ids(request.user),
+    )
+    has_next = len(results) > page_size
+    next_link = None
+    if has_next:
+        next_link = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+    return Response({'next': next_link, 'results': results[:page_size]})
+
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def course_detail_api(request, pk):
     """
     Obsługa pojedynczego kursu.
+    GET przyjmuje ?fields= i ?expand= (edition, instructor).
     """
-    course = get_object_or_404(Course, pk=pk)
+    courses = Course.objects.all()
+    fields = expand = None
+    if request.method == 'GET':
+        fields, expand, error = _projection(CourseSerializer, request)
+        if error:
+            return error
+        courses = CourseSerializer.optimize_queryset(courses, fields, expand, extra=['updated_at'])
+    else:
+        # Edycja i instruktor są częścią ETagu domyślnej reprezentacji
+        courses = courses.select_related('edition', 'instructor')
+    course = get_object_or_404(courses, pk=pk)
 
     # Check permissions for modification
     if request.method in ['PUT', 'PATCH', 'DELETE']:
         if request.user != course.instructor:
             return Response({'detail': 'Brak uprawnień do edycji tego kursu.'}, status=status.HTTP_403_FORBIDDEN)
 
+    # If-None-Match (GET) / If-Match (zapis) - bez serializacji kursu
+    etag = representation_etag(course, CourseSerializer, fields, expand)
+    conditional = conditional_response(request, etag)
+    if conditional is not None:
+        return conditional
+
     if request.method == 'GET':
-        serializer = CourseSerializer(course)
-        return Response(serializer.data)
+        serializer = CourseSerializer(course, fields=fields, expand=expand)
+        return Response(serializer.data, headers={'ETag': etag})
 
     elif request.method in ['PUT', 'PATCH']:
         partial = request.method == 'PATCH'
         serializer = CourseSerializer(course, data=request.data, partial=partial, context={'request': request})
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return Response(serializer.data, headers={'ETag': representation_etag(course, CourseSerializer)})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
@@ -202,6 +375,7 @@ def course_detail_api(request, pk):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([EnrollThrottle])
 def enroll_course_api(request, course_id):
     """
     Wysyłanie prośby o zapisanie na kurs przez studenta.
@@ -242,26 +416,104 @@ def enrollment_list_api(request, course_id):
     """
     Pobiera listę zapisów na dany kurs (tylko dla instruktora).
     Parametr ?status=pending|approved|rejected filtruje wyniki.
+    Parametr ?fields=id,status,name,email ogranicza zwracane pola.
+    Wyniki są stronicowane kursorem (?cursor=, ?page_size=).
     """
     course = get_object_or_404(Course, pk=course_id)
     
     if request.user != course.instructor:
         return Response({'detail': 'Brak uprawnień do przeglądania zapisów.'}, status=status.HTTP_403_FORBIDDEN)
     
+    fields, expand, error = _projection(EnrollmentSerializer, request)
+    if error:
+        return error
+
     status_filter = request.query_params.get('status')
     queryset = course.enrollments.all()
     
     if status_filter in ['pending', 'approved', 'rejected']:
         queryset = queryset.filter(status=status_filter)
-        
-    serializer = EnrollmentSerializer(queryset, many=True)
-    return Response(serializer.data)
+
+    # Strona zapisów pobierana jednym zapytaniem (student dołączony JOIN-em)
+    queryset = EnrollmentSerializer.optimize_queryset(queryset, fields)
+    paginator = EnrollmentCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = EnrollmentSerializer(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
+
+class Echo:
+    """
+    Pseudo-bufor dla csv.writer - zwraca zapisany wiersz zamiast go buforować.
+    """
+    def write(self, value):
+        return value
+
+
+EXPORT_COLUMNS = ['id', 'status', 'email', 'first_name', 'last_name']
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _export_rows(queryset):
+    # Kursor po stronie serwera - w pamięci trzymamy tylko jedną paczkę wierszy
+    values = queryset.order_by('id').values_list(
+        'id', 'status', 'student__email', 'student__first_name', 'student__last_name'
+    )
+    for row in values.iterator(chunk_size=2000):
+        yield dict(zip(EXPORT_COLUMNS, row))
+
+
+def _stream_csv(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_COLUMNS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def enrollment_export_api(request, course_id):
+    """
+    Eksport listy zapisów kursu jako strumień CSV lub NDJSON (tylko dla instruktora).
+    Parametr ?type=csv|ndjson wybiera format (domyślnie csv),
+    ?status=pending|approved|rejected filtruje wyniki.
+    """
+    course = get_object_or_404(Course, pk=course_id)
+
+    if request.user != course.instructor:
+        return Response({'detail': 'Brak uprawnień do eksportu zapisów.'}, status=status.HTTP_403_FORBIDDEN)
+
+    export_type = request.query_params.get('type', 'csv')
+    if export_type not in EXPORT_CONTENT_TYPES:
+        return Response({'detail': 'Nieprawidłowy format eksportu.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = course.enrollments.all()
+    status_filter = request.query_params.get('status')
+    if status_filter in ['pending', 'approved', 'rejected']:
+        queryset = queryset.filter(status=status_filter)
+
+    rows = _export_rows(queryset)
+    content = _stream_csv(rows) if export_type == 'csv' else _stream_ndjson(rows)
+    response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[export_type])
+    response['Content-Disposition'] = f'attachment; filename="course_{course.id}_enrollments.{export_type}"'
+    return response
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def enrollment_bulk_update_api(request, course_id):
     """
     Masowa aktualizacja statusów zapisów (approve, reject, delete, restore).
+    Zmieniane są tylko zapisy w dozwolonym statusie źródłowym; odpowiedź
+    zawiera dokładne liczby zmienionych, niezmienionych i nieprawidłowych ID.
+    Duże listy (lub {"background": true}) są przetwarzane w tle - wtedy
+    zwracany jest 202 z identyfikatorem zadania.
     """
     course = get_object_or_404(Course, pk=course_id)
     
@@ -273,48 +525,113 @@ def enrollment_bulk_update_api(request, course_id):
     
     if not enrollment_ids or not isinstance(enrollment_ids, list):
         return Response({'detail': 'Nieprawidłowa lista ID.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        enrollment_ids = [int(pk) for pk in enrollment_ids]
+    except (TypeError, ValueError):
+        return Response({'detail': 'Nieprawidłowa lista ID.'}, status=status.HTTP_400_BAD_REQUEST)
         
-    if action not in ['approve', 'reject', 'delete', 'restore']:
+    if action not in ENROLLMENT_ACTIONS:
         return Response({'detail': 'Nieprawidłowa akcja.'}, status=status.HTTP_400_BAD_REQUEST)
-    
+
+    background = request.data.get('background') is True
+    if background or len(enrollment_ids) > settings.ENROLLMENT_BULK_BACKGROUND_THRESHOLD:
+        job_id = start_job(request.user.id, course.id, apply_enrollment_action, course, action, enrollment_ids)
+        return Response({
+            'message': 'Operacja została zlecona.',
+            'job_id': job_id,
+            'status_url': reverse('api_enrollment_bulk_job', args=[course.id, job_id]),
+        }, status=status.HTTP_202_ACCEPTED)
+
+    result = apply_enrollment_action(course, action, enrollment_ids)
+    return Response({
+        'message': 'Operacja zakończona sukcesem.',
+        'updated_count': result['changed_count'],
+        **result,
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def enrollment_bulk_update_matching_api(request, course_id):
+    """
+    Akcja na wszystkich pasujących zapisach kursu (np. zatwierdź wszystkie oczekujące).
+    Oczekuje {"action": str, "status": str (opcjonalnie), "exclude_ids": [int] (opcjonalnie)}.
+    """
+    course = get_object_or_404(Course, pk=course_id)
+
+    if request.user != course.instructor:
+        return Response({'detail': 'Brak uprawnień do zarządzania zapisami.'}, status=status.HTTP_403_FORBIDDEN)
+
+    action = request.data.get('action')
+    if action not in ENROLLMENT_ACTIONS:
+        return Response({'detail': 'Nieprawidłowa akcja.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    status_filter = request.data.get('status')
+    if status_filter is not None and status_filter not in ENROLLMENT_ACTIONS[action][0]:
+        return Response({'detail': 'Akcja nie dotyczy zapisów o tym statusie.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    exclude_ids = request.data.get('exclude_ids', [])
+    if not isinstance(exclude_ids, list):
+        return Response({'detail': 'Nieprawidłowa lista ID.'}, status=status.HTTP_400_BAD_REQUEST)
     try:
-        with transaction.atomic():
-            enrollments = Enrollment.objects.filter(
-                id__in=enrollment_ids, 
-                course=course
-            ).select_for_update()
-            
-            # Weryfikacja czy wszystkie ID należą do tego kursu
-            if enrollments.count() != len(enrollment_ids):
-                # Można tu rzucić błąd albo zignorować brakujące. 
-                # Bezpieczniej rzucić błąd spójności.
-                 return Response({'detail': 'Niektóre zapisy nie należą do tego kursu lub nie istnieją.'}, status=status.HTTP_400_BAD_REQUEST)
-
-            if action == 'approve':
-                # Tylko z pending/rejected na approved? Zazwyczaj z pending.
-                # Ale restore też robi to samo.
-                enrollments.update(status='approved')
-                
-            elif action == 'reject':
-                enrollments.update(status='rejected')
-                
-            elif action == 'restore':
-                enrollments.update(status='approved')
-                
-            elif action == 'delete':
-                # Usuwanie rekordów (np. wyrzucenie z kursu)
-                enrollments.delete()
-                
-        return Response({'message': 'Operacja zakończona sukcesem.', 'updated_count': len(enrollment_ids)})
-        
-    except Exception as e:
-        return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        exclude_ids = [int(pk) for pk in exclude_ids]
+    except (TypeError, ValueError):
+        return Response({'detail': 'Nieprawidłowa lista ID.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    changed = apply_enrollment_action_to_matching(course, action, status=status_filter, exclude_ids=exclude_ids)
+    return Response({
+        'message': 'Operacja zakończona sukcesem.',
+        'updated_count': changed,
+        'changed_count': changed,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def enrollment_bulk_job_api(request, course_id, job_id):
+    """
+    Status zadania masowej aktualizacji zapisów uruchomionego w tle.
+    """
+    job = get_job(job_id)
+    if job is None or job['owner_id'] != request.user.id or job['course_id'] != course_id:
+        return Response({'detail': 'Nie znaleziono zadania.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def enrollment_import_api(request, course_id):
+    """
+    Import listy studentów z pliku CSV z adresami e-mail (pole 'file').
+    Opcjonalne pole 'status' określa status tworzonych zapisów (domyślnie approved).
+    Istniejące zapisy są pomijane, nieznane adresy zwracane w odpowiedzi.
+    """
+    course = get_object_or_404(Course, pk=course_id)
+
+    if request.user != course.instructor:
+        return Response({'detail': 'Brak uprawnień do zarządzania zapisami.'}, status=status.HTTP_403_FORBIDDEN)
+
+    roster = request.FILES.get('file')
+    if not roster:
+        return Response({'detail': 'Nie przesłano pliku.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    enrollment_status = request.data.get('status', 'approved')
+    if enrollment_status not in dict(Enrollment.STATUS_CHOICES):
+        return Response({'detail': 'Nieprawidłowy status.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    lines = io.TextIOWrapper(roster.file, encoding='utf-8-sig', newline='')
+    try:
+        result = import_roster(course, read_roster_emails(lines), status=enrollment_status)
+    except UnicodeDecodeError:
+        return Response({'detail': 'Plik musi być zakodowany w UTF-8.'}, status=status.HTTP_400_BAD_REQUEST)
+    finally:
+        lines.detach()
+
+    return Response({'message': 'Import zakończony.', **result})
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def lesson_list_create_api(request, course_id):
     """
-    GET: Lista lekcji dla kursu.
+    GET: Lista lekcji dla kursu (?fields=, ?expand=course).
     POST: Tworzenie lekcji (tylko instruktor).
     """
     course = get_object_or_404(Course, pk=course_id)
@@ -322,14 +639,28 @@ def lesson_list_create_api(request, course_id):
     if request.method == 'GET':
         # Dla instruktora kursu: wszystkie lekcje
         # Dla studenta: tylko opublikowane
-        if request.user == course.instructor:
-            lessons = course.lessons.all()
+        # Kolejność wg pozycji - indeks (course, position)
+        if request.user.id == course.instructor_id:
+            lessons = course.lessons.order_by('position', 'id')
+        elif has_course_access(request.user, course):
+            lessons = course.lessons.filter(is_published=True).order_by('position', 'id')
         else:
-            # TODO: check enrollment status
-            lessons = course.lessons.filter(is_published=True)
-            
-        serializer = LessonSerializer(lessons, many=True)
-        return Response(serializer.data)
+            return Response({'detail': 'Brak dostępu.'}, status=status.HTTP_403_FORBIDDEN)
+
+        fields, expand, error = _projection(LessonSerializer, request)
+        if error:
+            return error
+
+        scope = 'all' if request.user.id == course.instructor_id else 'published'
+        etag = collection_etag(lessons, f'{course.id}-{scope}', serializer_class=LessonSerializer,
+                               fields=fields, expand=expand)
+        conditional = conditional_response(request, etag)
+        if conditional is not None:
+            return conditional
+
+        lessons = LessonSerializer.optimize_queryset(lessons, fields, expand)
+        serializer = LessonSerializer(lessons, many=True, fields=fields, expand=expand)
+        return Response(serializer.data, headers={'ETag': etag})
 
     elif request.method == 'POST':
         if request.user != course.instructor:
@@ -341,32 +672,107 @@ def lesson_list_create_api(request, course_id):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def lesson_reorder_api(request, course_id):
+    """
+    Zmiana kolejności lekcji kursu (tylko instruktor).
+    Oczekuje {"lesson_ids": [int]} - pełna nowa kolejność, albo
+    {"lesson_id": int, "after_id": int|null} - przeniesienie jednej lekcji.
+    """
+    course = get_object_or_404(Course, pk=course_id)
+
+    if request.user.id != course.instructor_id:
+        return Response({'detail': 'Brak uprawnień do zmiany kolejności lekcji.'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        if 'lesson_ids' in request.data:
+            lesson_ids = request.data['lesson_ids']
+            if not isinstance(lesson_ids, list):
+                raise LessonOrderError('Nieprawidłowa lista ID.')
+            moved = reorder_lessons(course, [int(pk) for pk in lesson_ids])
+            return Response({'message': 'Kolejność lekcji została zapisana.', 'updated_count': moved})
+
+        lesson = get_object_or_404(Lesson, pk=int(request.data.get('lesson_id')), course=course)
+        after_id = request.data.get('after_id')
+        position = move_lesson(lesson, int(after_id) if after_id is not None else None)
+    except LessonOrderError as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    except (TypeError, ValueError):
+        return Response({'detail': 'Nieprawidłowe ID lekcji.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'message': 'Lekcja została przeniesiona.', 'id': lesson.id, 'position': position})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def lesson_batch_api(request, course_id):
+    """
+    Wiele operacji na lekcjach kursu w jednym żądaniu (tylko instruktor).
+    Oczekuje {"operations": [...]} - patrz apply_lesson_batch. Operacje są
+    wykonywane w jednej transakcji: wszystkie albo żadna.
+    """
+    course = get_object_or_404(Course, pk=course_id)
+
+    if request.user.id != course.instructor_id:
+        return Response({'detail': 'Brak uprawnień do edycji lekcji tego kursu.'}, status=status.HTTP_403_FORBIDDEN)
+
+    operations = request.data.get('operations') if isinstance(request.data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return Response({'detail': 'Wymagana niepusta lista operacji.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return Response(
+            {'detail': f'Maksymalnie {MAX_BATCH_OPERATIONS} operacji w jednym żądaniu.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results, errors = apply_lesson_batch(course, operations)
+    if errors:
+        return Response(
+            {'detail': 'Żadna operacja nie została wykonana.', 'errors': errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({'results': results})
+
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def lesson_detail_api(request, course_id, pk):
     """
-    Operacje na pojedynczej lekcji.
+    Operacje na pojedynczej lekcji. GET przyjmuje ?fields= i ?expand=course.
     """
     course = get_object_or_404(Course, pk=course_id)
     lesson = get_object_or_404(Lesson, pk=pk, course=course)
+    # Kurs jest już wczytany (?expand=course i ETag nie pobierają go ponownie)
+    lesson.course = course
 
     if request.method in ['PUT', 'PATCH', 'DELETE']:
         if request.user != course.instructor:
             return Response({'detail': 'Brak uprawnień do edycji tej lekcji.'}, status=status.HTTP_403_FORBIDDEN)
 
+    fields = expand = None
     if request.method == 'GET':
         if not lesson.is_published and request.user != course.instructor:
              return Response({'detail': 'Nie znaleziono lekcji.'}, status=status.HTTP_404_NOT_FOUND)
-             
-        serializer = LessonSerializer(lesson)
-        return Response(serializer.data)
+        if not has_course_access(request.user, course):
+            return Response({'detail': 'Brak dostępu.'}, status=status.HTTP_403_FORBIDDEN)
+        fields, expand, error = _projection(LessonSerializer, request)
+        if error:
+            return error
+
+    etag = representation_etag(lesson, LessonSerializer, fields, expand)
+    conditional = conditional_response(request, etag)
+    if conditional is not None:
+        return conditional
+
+    if request.method == 'GET':
+        serializer = LessonSerializer(lesson, fields=fields, expand=expand)
+        return Response(serializer.data, headers={'ETag': etag})
 
     elif request.method in ['PUT', 'PATCH']:
         partial = request.method == 'PATCH'
         serializer = LessonSerializer(lesson, data=request.data, partial=partial)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return Response(serializer.data, headers={'ETag': representation_etag(lesson, LessonSerializer)})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
@@ -385,36 +791,48 @@ def attachment_list_create_api(request, course_id, lesson_id):
 
     if request.method == 'GET':
         # Sprawdź dostęp (instruktor lub student zapisany)
-        # TODO: check enrollment status for student
         if not lesson.is_published and request.user != course.instructor:
              return Response({'detail': 'Brak dostępu.'}, status=status.HTTP_403_FORBIDDEN)
+        if not has_course_access(request.user, course):
+            return Response({'detail': 'Brak dostępu.'}, status=status.HTTP_403_FORBIDDEN)
         
+        fields, expand, error = _projection(AttachmentSerializer, request)
+        if error:
+            return error
+
         attachments = lesson.attachments.all()
-        serializer = AttachmentSerializer(attachments, many=True)
-        return Response(serializer.data)
+        # Liczniki pobrań są zmieniane przez UPDATE (bez updated_at) - wchodzą do ETagu jako suma
+        etag = collection_etag(attachments, str(lesson.id), extra_sum='download_count',
+                               serializer_class=AttachmentSerializer, fields=fields, expand=expand)
+        conditional = conditional_response(request, etag)
+        if conditional is not None:
+            return conditional
+
+        attachments = AttachmentSerializer.optimize_queryset(attachments, fields, expand)
+        serializer = AttachmentSerializer(attachments, many=True, fields=fields, expand=expand)
+        return Response(serializer.data, headers={'ETag': etag})
 
     elif request.method == 'POST':
         if request.user != course.instructor:
             return Response({'detail': 'Brak uprawnień do dodawania plików.'}, status=status.HTTP_403_FORBIDDEN)
         
         # Limit liczby plików (max 10)
-        if lesson.attachments.count() >= 10:
-             return Response({'detail': 'Przekroczono limit 10 załączników dla tej lekcji.'}, status=status.HTTP_400_BAD_REQUEST)
+        if lesson.attachments.count() >= MAX_ATTACHMENTS_PER_LESSON:
+             return Response({'detail': f'Przekroczono limit {MAX_ATTACHMENTS_PER_LESSON} załączników dla tej lekcji.'}, status=status.HTTP_400_BAD_REQUEST)
 
         file_obj = request.FILES.get('file')
         if not file_obj:
             return Response({'detail': 'Brak pliku.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Limit rozmiaru (10MB)
-        if file_obj.size > 10 * 1024 * 1024:
-             return Response({'detail': 'Plik jest za duży (max 10MB).'}, status=status.HTTP_400_BAD_REQUEST)
+        # Limit rozmiaru (większe pliki przesyłane są w częściach)
+        if file_obj.size > settings.ATTACHMENT_MAX_SIZE:
+             max_mb = settings.ATTACHMENT_MAX_SIZE // (1024 * 1024)
+             return Response({'detail': f'Plik jest za duży (max {max_mb}MB).'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Walidacja rozszerzenia
-        import os
-        allowed_extensions = ['.pdf', '.zip', '.pptx', '.docx', '.txt', '.jpg', '.jpeg']
-        ext = os.path.splitext(file_obj.name)[1].lower()
-        if ext not in allowed_extensions:
-             return Response({'detail': f'Niedozwolone rozszerzenie: {ext}'}, status=status.HTTP_400_BAD_REQUEST)
+        error = validate_attachment_name(file_obj.name)
+        if error:
+             return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
 
         # Serializer save - pass file in data
         # Note: Model expects 'file' and 'original_filename'
@@ -426,6 +844,144 @@ def attachment_list_create_api(request, course_id, lesson_id):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def _upload_error_response(error):
+    return Response({'detail': error.detail, **error.extra}, status=error.status_code)
+
+def _sha256_error(sha256):
+    # Suma jest opcjonalna, ale jeśli podana - musi być napisem
+    if sha256 is not None and not isinstance(sha256, str):
+        return Response({'sha256': ['Nieprawidłowa suma SHA-256.']}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+def _upload_status(upload):
+    return {
+        'upload_id': str(upload.pk),
+        'filename': upload.original_filename,
+        'size': upload.total_size,
+        'offset': upload.received_bytes,
+        'chunk_size': settings.ATTACHMENT_CHUNK_MAX_SIZE,
+    }
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def chunked_upload_create_api(request, course_id, lesson_id):
+    """
+    Rozpoczyna przesyłanie załącznika w częściach (tylko instruktor).
+    Oczekuje {"filename": str, "size": int} i opcjonalnie {"sha256": str}.
+    """
+    course = get_object_or_404(Course, pk=course_id)
+    lesson = get_object_or_404(Lesson, pk=lesson_id, course=course)
+
+    if request.user != course.instructor:
+        return Response({'detail': 'Brak uprawnień do dodawania plików.'}, status=status.HTTP_403_FORBIDDEN)
+
+    filename = request.data.get('filename')
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({'detail': 'Nieprawidłowy rozmiar pliku.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not filename:
+        return Response({'filename': ['To pole jest wymagane.']}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(filename, str):
+        return Response({'filename': ['Nieprawidłowa nazwa pliku.']}, status=status.HTTP_400_BAD_REQUEST)
+    sha256 = request.data.get('sha256')
+    error = _sha256_error(sha256)
+    if error:
+        return error
+
+    try:
+        attachment = attach_existing_content(lesson, filename, sha256, request.user)
+        if attachment is not None:
+            # Treść jest już przechowywana - nie trzeba przesyłać pliku
+            return Response({
+                'deduplicated': True,
+                'attachment': AttachmentSerializer(attachment).data,
+            }, status=status.HTTP_201_CREATED)
+        upload = start_upload(lesson, request.user, filename, size)
+    except UploadError as error:
+        return _upload_error_response(error)
+    return Response(_upload_status(upload), status=status.HTTP_201_CREATED)
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def chunked_upload_detail_api(request, course_id, lesson_id, upload_id):
+    """
+    GET: Stan przesyłania (offset, od którego należy wznowić).
+    PUT: Kolejna część pliku (surowe bajty, nagłówek Content-Range).
+    DELETE: Przerwanie przesyłania.
+    """
+    upload = get_object_or_404(
+        AttachmentUpload, pk=upload_id, lesson_id=lesson_id, lesson__course_id=course_id,
+        uploaded_by=request.user
+    )
+
+    if request.method == 'GET':
+        return Response(_upload_status(upload))
+
+    elif request.method == 'PUT':
+        try:
+            start, length = parse_content_range(request.headers.get('Content-Range'), upload)
+            append_chunk(upload, request._request, start, length)
+        except UploadError as error:
+            return _upload_error_response(error)
+        return Response(_upload_status(upload))
+
+    elif request.method == 'DELETE':
+        abort_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def chunked_upload_complete_api(request, course_id, lesson_id, upload_id):
+    """
+    Finalizuje przesyłanie i tworzy załącznik.
+    Opcjonalne {"sha256": str} weryfikuje sumę kontrolną całego pliku.
+    """
+    upload = get_object_or_404(
+        AttachmentUpload, pk=upload_id, lesson_id=lesson_id, lesson__course_id=course_id,
+        uploaded_by=request.user
+    )
+    sha256 = request.data.get('sha256')
+    error = _sha256_error(sha256)
+    if error:
+        return error
+    try:
+        attachment = finalize_upload(upload, expected_sha256=sha256)
+    except UploadError as error:
+        return _upload_error_response(error)
+    return Response(AttachmentSerializer(attachment).data, status=status.HTTP_201_CREATED)
+
+class AttachmentDownloadAPIView(APIView):
+    """
+    Pobranie pliku załącznika (instruktor kursu lub student z zatwierdzonym zapisem).
+    Obsługuje ETag/If-None-Match, HTTP Range oraz offload do proxy
+    (ustawienie ATTACHMENT_DOWNLOAD_OFFLOAD).
+
+    Klasa zamiast @api_view, bo potrzebuje własnej negocjacji treści:
+    odpowiedzią jest plik, więc nagłówek Accept klienta (np. application/pdf)
+    nie może kończyć się błędem 406.
+    """
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = FileContentNegotiation
+
+    def get(self, request, course_id, lesson_id, pk):
+        attachment = get_object_or_404(
+            Attachment.objects.select_related('lesson__course'),
+            pk=pk, lesson_id=lesson_id, lesson__course_id=course_id
+        )
+        lesson = attachment.lesson
+        course = lesson.course
+
+        if request.user.id != course.instructor_id:
+            if not (lesson.is_published and has_course_access(request.user, course)):
+                return Response({'detail': 'Brak dostępu.'}, status=status.HTTP_403_FORBIDDEN)
+
+        response, counted = serve_attachment(request, attachment)
+        if counted:
+            # Przyrost trafia do bufora - pobranie nie czeka na blokadę wiersza
+            get_download_counter().increment(attachment.pk)
+        return response
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def attachment_detail_api(request, course_id, lesson_id, pk):
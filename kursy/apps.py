@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class KursyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kursy'
+
+    def ready(self):
+        from . import signals  # noqa: F401
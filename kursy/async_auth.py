@@ -0,0 +1,93 @@
+"""
+Asynchroniczne logowanie i rejestracja (ASGI).
+
+Haszowanie haseł (PBKDF2) zajmuje większość czasu obsługi tych żądań,
+dlatego odbywa się w osobnej, ograniczonej puli wątków - pętla zdarzeń
+i wątki obsługujące pozostałe endpointy nie są blokowane. Liczba
+jednocześnie obsługiwanych żądań uwierzytelniania jest ograniczona
+w całym procesie (MAX_CONCURRENT) - także pod WSGI, gdzie każde żądanie
+ma własną pętlę zdarzeń. Kolejne żądania czekają najwyżej QUEUE_TIMEOUT
+sekund, a potem dostają 503 z nagłówkiem Retry-After.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULT_AUTH_ASYNC = {
+    'MAX_CONCURRENT': 16,
+    'HASH_WORKERS': 4,
+    'QUEUE_TIMEOUT': 10,
+}
+
+# Odstęp między próbami zajęcia miejsca (s) - oczekiwanie nie blokuje pętli zdarzeń
+SLOT_POLL_INTERVAL = 0.01
+
+_executor = None
+_slots = None
+_slots_lock = threading.Lock()
+
+
+class AuthBusy(Exception):
+    """
+    Przekroczono czas oczekiwania na wolne miejsce w kolejce uwierzytelniania.
+    """
+
+
+def auth_async_config():
+    return {**DEFAULT_AUTH_ASYNC, **getattr(settings, 'AUTH_ASYNC', {})}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=auth_async_config()['HASH_WORKERS'], thread_name_prefix='kursy-hash'
+        )
+    return _executor
+
+
+async def run_hashing(func, *args):
+    """
+    Wykonuje funkcję haszującą (check_password, make_password) w puli wątków.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+
+
+def _get_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(auth_async_config()['MAX_CONCURRENT'])
+        return _slots
+
+
+@receiver(setting_changed)
+def _reset_slots(sender, setting, **kwargs):
+    global _slots
+    if setting == 'AUTH_ASYNC':
+        with _slots_lock:
+            _slots = None
+
+
+@asynccontextmanager
+async def auth_slot():
+    """
+    Zajmuje miejsce w limicie jednoczesnych żądań uwierzytelniania
+    (semafor wspólny dla wszystkich wątków i pętli zdarzeń procesu).
+    """
+    semaphore = _get_slots()
+    deadline = time.monotonic() + auth_async_config()['QUEUE_TIMEOUT']
+    while not semaphore.acquire(blocking=False):
+        if time.monotonic() >= deadline:
+            raise AuthBusy
+        await asyncio.sleep(SLOT_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        semaphore.release()
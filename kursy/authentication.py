@@ -0,0 +1,78 @@
+"""
+Uwierzytelnianie JWT z cache użytkowników (kursy.usercache) oraz tokeny
+z danymi użytkownika w claimach (tryb USER_CACHE['STATELESS_JWT']).
+"""
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .usercache import CLAIM_FIELDS, get_cached_user, user_cache_config, user_claims, user_from_claims
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Token odświeżania, który w trybie STATELESS_JWT wydaje tokeny dostępu
+    z aktualnymi danymi użytkownika (email, is_instructor, is_active)
+    w claimach - przy logowaniu i przy każdym odświeżeniu.
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token._user = user
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        if user_cache_config()['STATELESS_JWT']:
+            user = getattr(self, '_user', None)
+            if user is None:
+                user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+                user = get_user_model()._default_manager.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user is not None:
+                for claim, value in user_claims(user).items():
+                    access[claim] = value
+        return access
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication odczytujące użytkownika z cache zamiast z bazy.
+
+    W trybie USER_CACHE['STATELESS_JWT'] użytkownik tokenu z claimami
+    (ClaimsRefreshToken) jest odtwarzany bez żadnego zapytania.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Token nie zawiera identyfikatora użytkownika.') from e
+
+        if user_cache_config()['STATELESS_JWT'] and all(claim in validated_token for claim in CLAIM_FIELDS):
+            user = user_from_claims(user_id, validated_token)
+            if not user.is_active:
+                raise AuthenticationFailed('Konto użytkownika jest nieaktywne.', code='user_inactive')
+            return user
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed('Nie znaleziono użytkownika.', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('Konto użytkownika jest nieaktywne.', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Hasło nie jest w cache - zostanie wczytane z bazy
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed('Hasło użytkownika zostało zmienione.', code='password_changed')
+        return user
@@ -1,9 +1,26 @@
 """
-Backend autentykacji używający email zamiast username.
+Backendy autentykacji: email zamiast username oraz zapasowe logowanie
+nazwą użytkownika. W wersjach asynchronicznych hasło jest sprawdzane
+w ograniczonej puli wątków (kursy.async_auth), nie w pętli zdarzeń.
 """
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
 
+from .async_auth import run_hashing
+from .models import normalize_email_key
+from .usercache import get_cached_user
+
+
+async def _acheck_credentials(backend, user, password):
+    UserModel = get_user_model()
+    if user is None:
+        # Jak ModelBackend: haszujemy także dla nieznanego konta (stały czas odpowiedzi)
+        await run_hashing(UserModel().set_password, password)
+        return None
+    if await run_hashing(user.check_password, password) and backend.user_can_authenticate(user):
+        return user
+    return None
+
 
 class EmailBackend(ModelBackend):
     """
@@ -11,8 +28,12 @@ class EmailBackend(ModelBackend):
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
         UserModel = get_user_model()
+        email_key = normalize_email_key(username)
+        if email_key is None:
+            return None
         try:
-            user = UserModel.objects.get(email=username)
+            # Wyszukiwanie po unikalnym indeksie - bez względu na wielkość liter
+            user = UserModel.objects.get(email_key=email_key)
         except UserModel.DoesNotExist:
             return None
         
@@ -20,10 +41,38 @@ class EmailBackend(ModelBackend):
             return user
         return None
 
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """
+        Wersja dla widoków asynchronicznych: zapytanie przez asynchroniczny ORM,
+        haszowanie w ograniczonej puli wątków (kursy.async_auth).
+        """
+        UserModel = get_user_model()
+        email_key = normalize_email_key(username)
+        if email_key is None:
+            return None
+        user = await UserModel.objects.filter(email_key=email_key).afirst()
+        return await _acheck_credentials(self, user, password)
+
     def get_user(self, user_id):
+        # Wywoływane przy każdym żądaniu z sesją - użytkownik z cache
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+
+class UsernameBackend(ModelBackend):
+    """
+    Zapasowe logowanie nazwą użytkownika (ModelBackend). Wersja
+    asynchroniczna ModelBackend haszuje w pętli zdarzeń - tu w puli wątków.
+    """
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
         UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
         try:
-            return UserModel.objects.get(pk=user_id)
+            user = await UserModel._default_manager.aget_by_natural_key(username)
         except UserModel.DoesNotExist:
-            return None
-
+            user = None
+        return await _acheck_credentials(self, user, password)
@@ -0,0 +1,152 @@
+"""
+Wiele żądań API w jednym wywołaniu HTTP.
+
+Podżądania są kierowane bezpośrednio do widoków z kursy.urls, z pominięciem
+middleware. Użytkownik uwierzytelniony w żądaniu zbiorczym jest
+przekazywany do podżądań (ForcedAuthentication w DRF), więc sesja lub
+token są sprawdzane tylko raz. CSRF jest sprawdzany dla żądania
+zbiorczego.
+"""
+import io
+import json
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+
+MAX_BATCH_REQUESTS = 20
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+BATCH_HEADERS = ('If-Match', 'If-None-Match')
+
+# Trasy, których nie można wywołać w żądaniu zbiorczym: logowanie (zmienia
+# sesję), odpowiedzi strumieniowe, przesyłanie plików i samo żądanie zbiorcze.
+EXCLUDED_ROUTES = {
+    'api_login', 'api_register', 'api_password_reset', 'api_batch',
+    'api_enrollment_export', 'api_attachment_download', 'api_attachment_list_create',
+    'api_chunked_upload_create', 'api_chunked_upload_detail', 'api_chunked_upload_complete',
+}
+
+
+class BatchError(Exception):
+    """
+    Nieprawidłowe podżądanie.
+    """
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _resolve(item):
+    if not isinstance(item, dict):
+        raise BatchError('Podżądanie musi być obiektem.')
+    method = str(item.get('method', 'GET')).upper()
+    if method not in BATCH_METHODS:
+        raise BatchError(f"Dozwolone metody: {', '.join(BATCH_METHODS)}.")
+    url = urlsplit(str(item.get('path', '')))
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        raise BatchError('Nieznana ścieżka API.')
+    if match.app_name or not match.url_name or not match.url_name.startswith('api_') \
+            or match.url_name in EXCLUDED_ROUTES:
+        raise BatchError('Ta ścieżka nie jest dostępna w żądaniu zbiorczym.')
+    headers = item.get('headers') or {}
+    if not isinstance(headers, dict) or set(headers) - set(BATCH_HEADERS):
+        raise BatchError(f"Dozwolone nagłówki: {', '.join(BATCH_HEADERS)}.")
+    return method, url, match, headers
+
+
+def _build_request(request, method, url, headers, body):
+    """
+    Tworzy podżądanie na wzór żądania zbiorczego (META, sesja, użytkownik).
+    """
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith('HTTP_IF_') and key not in ('CONTENT_TYPE', 'CONTENT_LENGTH')
+    }
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+    })
+    for name, value in headers.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = str(value)
+    sub_request = WSGIRequest(environ)
+    sub_request.session = request.session
+    sub_request.user = request.user
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def _dispatch(request, method, url, match, headers, body):
+    sub_request = _build_request(request, method, url, headers, body)
+    sub_request.resolver_match = match
+    response = match.func(sub_request, *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+
+    result = {'status': response.status_code, 'headers': {}, 'body': None}
+    for name in ('ETag', 'Location', 'Retry-After'):
+        if response.has_header(name):
+            result['headers'][name] = response[name]
+    if response.content:
+        if response.get('Content-Type', '').startswith('application/json'):
+            result['body'] = json.loads(response.content)
+        else:
+            result['body'] = response.content.decode(response.charset or 'utf-8', 'replace')
+    return result
+
+
+def run_batch(request, items, atomic=False):
+    """
+    Wykonuje podżądania po kolei. Zwraca (odpowiedzi w kolejności podżądań,
+    czy zmiany zostały zapisane).
+
+    Przy atomic=True wszystkie podżądania działają w jednej transakcji:
+    pierwsza odpowiedź z błędem (status >= 400) wycofuje zmiany, a kolejne
+    podżądania nie są wykonywane (status 424).
+    """
+    plans = []
+    for item in items:
+        try:
+            plans.append(_resolve(item))
+        except BatchError as error:
+            if atomic:
+                raise BatchError(f'Podżądanie {len(plans)}: {error}')
+            plans.append(error)
+
+    results = []
+
+    def execute():
+        for item, plan in zip(items, plans):
+            if isinstance(plan, BatchError):
+                results.append({'status': 400, 'headers': {}, 'body': {'detail': str(plan)}})
+                continue
+            result = _dispatch(request, *plan, item.get('body'))
+            results.append(result)
+            if atomic and result['status'] >= 400:
+                raise _Rollback
+
+    if not atomic:
+        execute()
+        return results, True
+
+    try:
+        with transaction.atomic():
+            execute()
+    except _Rollback:
+        failed = len(results) - 1
+        results.extend(
+            {'status': 424, 'headers': {}, 'body': {'detail': f'Pominięto - podżądanie {failed} zakończyło się błędem.'}}
+            for _ in range(len(items) - len(results))
+        )
+        return results, False
+    return results, True
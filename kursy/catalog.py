@@ -0,0 +1,126 @@
+"""
+Katalog kursów dla studentów.
+
+Strony katalogu (widoczne kursy, opcjonalnie z jednej edycji) są wspólne
+dla wszystkich studentów i trzymane w cache. Każda edycja ma własny numer
+wersji - zmiana kursu zwiększa wersję jego edycji i wersję katalogu
+wszystkich edycji, przez co stare strony przestają być odczytywane.
+Status zapisu konkretnego studenta jest nakładany osobno, jednym
+zapytaniem ograniczonym do kursów z bieżącej strony.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_COURSE_CATALOG = {
+    'CACHE_ALIAS': 'default',
+    # Liczniki zapisów na kursach mogą być nieaktualne najwyżej o tyle sekund
+    'TIMEOUT': 300,
+    'PAGE_SIZE': 12,
+}
+KEY_PREFIX = 'kursy:catalog'
+ALL_EDITIONS = 'all'
+
+
+def _config():
+    return {**DEFAULT_COURSE_CATALOG, **getattr(settings, 'COURSE_CATALOG', {})}
+
+
+def _cache():
+    return caches[_config()['CACHE_ALIAS']]
+
+
+def _version_key(edition_id):
+    return f'{KEY_PREFIX}:version:{edition_id or ALL_EDITIONS}'
+
+
+def _version(cache, edition_id):
+    key = _version_key(edition_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def invalidate_catalog(edition_ids):
+    """
+    Unieważnia strony katalogu podanych edycji oraz katalogu wszystkich edycji.
+    """
+    cache = _cache()
+    for edition_id in {*edition_ids, None}:
+        key = _version_key(edition_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Brak wersji - nic nie zostało jeszcze zapisane w cache
+            pass
+
+
+def _load_page(edition_id, number, page_size):
+    from .models import Course
+
+    courses = (
+        Course.objects.filter(is_visible=True)
+        .select_related('instructor', 'edition')
+        .only(
+            'id', 'name', 'description', 'approved_count',
+            'edition__name', 'instructor__first_name', 'instructor__last_name',
+        )
+        .order_by('name', 'id')
+    )
+    if edition_id:
+        courses = courses.filter(edition_id=edition_id)
+    count = courses.count()
+    num_pages = max((count + page_size - 1) // page_size, 1)
+    number = min(number, num_pages)
+    offset = (number - 1) * page_size
+    return {
+        'courses': list(courses[offset:offset + page_size]),
+        'count': count,
+        'number': number,
+        'num_pages': num_pages,
+    }
+
+
+def catalog_page(edition_id=None, number=1):
+    """
+    Zwraca stronę katalogu: {'courses', 'count', 'number', 'num_pages'}.
+    Numer strony spoza zakresu jest zamieniany na ostatnią stronę.
+    """
+    config = _config()
+    cache = _cache()
+    number = max(number, 1)
+    version = _version(cache, edition_id)
+    key = f'{KEY_PREFIX}:{edition_id or ALL_EDITIONS}:{version}:{number}'
+    page = cache.get(key)
+    if page is None:
+        page = _load_page(edition_id, number, config['PAGE_SIZE'])
+        cache.set(key, page, timeout=config['TIMEOUT'])
+    return page
+
+
+def catalog_editions():
+    """
+    Edycje do filtra katalogu (cache unieważniany przy zmianie kursów i edycji).
+    """
+    from .models import CourseEdition
+
+    cache = _cache()
+    key = f'{KEY_PREFIX}:editions:{_version(cache, None)}'
+    editions = cache.get(key)
+    if editions is None:
+        editions = list(CourseEdition.objects.filter(courses__is_visible=True).distinct().values('id', 'name'))
+        cache.set(key, editions, timeout=_config()['TIMEOUT'])
+    return editions
+
+
+def user_statuses(user, courses):
+    """
+    Statusy zapisów użytkownika dla podanych kursów ({course_id: status}).
+    """
+    from .models import Enrollment
+
+    return dict(
+        Enrollment.objects.filter(student_id=user.pk, course_id__in=[course.id for course in courses])
+        .values_list('course_id', 'status')
+    )
@@ -0,0 +1,273 @@
+"""
+Buforowane liczniki pobrań załączników.
+
+Pobranie nie aktualizuje wiersza Attachment od razu - przyrosty są
+zbierane w magazynie (pamięć procesu lub cache Django) i zapisywane
+zbiorczo co FLUSH_INTERVAL sekund lub po MAX_PENDING pobraniach,
+jednym UPDATE ... SET download_count = download_count + N na każdą
+wartość przyrostu. Zapis wykonuje wątek w tle - żądanie pobrania nigdy
+nie czeka na blokadę wiersza.
+"""
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DatabaseError, connections
+from django.db.models import F
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DOWNLOAD_COUNTER = {
+    # 'memory' - bufor w pamięci procesu, 'cache' - wspólny cache Django
+    'STORE': 'memory',
+    'CACHE_ALIAS': 'default',
+    # Maksymalny czas (s), przez jaki przyrosty czekają na zapis
+    'FLUSH_INTERVAL': 10,
+    # Liczba pobrań, po której bufor jest zapisywany niezależnie od czasu
+    'MAX_PENDING': 500,
+    # Zapis w wątku w tle; False - przy pobraniu, które przekroczyło limit (testy)
+    'BACKGROUND_FLUSH': True,
+}
+
+
+def apply_deltas(deltas):
+    """
+    Zapisuje przyrosty liczników - jedno zapytanie UPDATE na każdą wartość przyrostu.
+    """
+    from .models import Attachment
+
+    ids_by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        ids_by_delta[delta].append(pk)
+    for delta, ids in ids_by_delta.items():
+        Attachment.objects.filter(pk__in=ids).update(download_count=F('download_count') + delta)
+
+
+class MemoryCounterStore:
+    """
+    Bufor przyrostów w pamięci bieżącego procesu.
+    """
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+
+    def add(self, pk, amount):
+        with self._lock:
+            self._pending[pk] += amount
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        return pending
+
+    def restore(self, deltas):
+        with self._lock:
+            self._pending.update(deltas)
+
+
+class CacheCounterStore:
+    """
+    Bufor przyrostów we wspólnym cache (np. Redis/Memcached), dzięki czemu
+    przyrosty wszystkich procesów mogą zostać zapisane z dowolnego z nich.
+
+    Każdy załącznik ma własny klucz zwiększany atomowo (incr). Zbiór
+    "brudnych" identyfikatorów jest modyfikowany pod blokadą cache.add().
+    """
+    shared = True
+    key_prefix = 'kursy:downloads'
+    lock_timeout = 5
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def _key(self, pk):
+        return f'{self.key_prefix}:{pk}'
+
+    @property
+    def _dirty_key(self):
+        return f'{self.key_prefix}:dirty'
+
+    @contextmanager
+    def _locked(self):
+        lock_key = f'{self.key_prefix}:lock'
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        acquired = self.cache.add(lock_key, token, timeout=self.lock_timeout)
+        while not acquired and time.monotonic() <= deadline:
+            time.sleep(0.01)
+            acquired = self.cache.add(lock_key, token, timeout=self.lock_timeout)
+        if not acquired:
+            # Blokada wygasa po lock_timeout - jej właściciel nie zdążył jej zwolnić
+            logger.warning('Nie uzyskano blokady liczników pobrań w %s s.', self.lock_timeout)
+        try:
+            yield
+        finally:
+            # Zwalniamy tylko własną blokadę (mogła wygasnąć i zostać przejęta)
+            if acquired and self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+
+    def _mark_dirty(self, ids):
+        with self._locked():
+            dirty = self.cache.get(self._dirty_key, set())
+            dirty.update(ids)
+            self.cache.set(self._dirty_key, dirty, timeout=None)
+
+    def add(self, pk, amount):
+        key = self._key(pk)
+        self.cache.add(key, 0, timeout=None)
+        try:
+            value = self.cache.incr(key, amount)
+        except ValueError:
+            # Klucz usunięty między add() a incr()
+            self.cache.set(key, amount, timeout=None)
+            value = amount
+        # Licznik startował od zera - identyfikator trzeba zarejestrować
+        if value == amount:
+            self._mark_dirty({pk})
+
+    def drain(self):
+        with self._locked():
+            ids = self.cache.get(self._dirty_key, set())
+            self.cache.delete(self._dirty_key)
+
+        values = self.cache.get_many([self._key(pk) for pk in ids])
+        deltas = Counter()
+        leftover = set()
+        for pk in ids:
+            value = values.get(self._key(pk)) or 0
+            if value <= 0:
+                continue
+            # decr zamiast delete - nie gubimy przyrostów dodanych w międzyczasie
+            if self.cache.decr(self._key(pk), value) > 0:
+                leftover.add(pk)
+            deltas[pk] = value
+        if leftover:
+            self._mark_dirty(leftover)
+        return deltas
+
+    def restore(self, deltas):
+        for pk, delta in deltas.items():
+            self.add(pk, delta)
+
+
+class DownloadCounter:
+    """
+    Licznik pobrań z ograniczonym oknem utraty danych.
+
+    Przyrosty trafiają do magazynu; wątek w tle zapisuje je do bazy co
+    `flush_interval` sekund, a wcześniej - gdy zbierze się `max_pending`
+    pobrań. Bufor jest zapisywany także przy zamknięciu procesu oraz na
+    żądanie (komenda flush_download_counters przy wspólnym magazynie).
+    """
+    def __init__(self, store, flush_interval, max_pending, background=True):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.background = background
+        self._lock = threading.Lock()
+        self._since_flush = 0
+        self._last_flush = time.monotonic()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def increment(self, pk, amount=1):
+        self.store.add(pk, amount)
+        with self._lock:
+            self._since_flush += amount
+            full = self._since_flush >= self.max_pending
+            due = full or time.monotonic() - self._last_flush >= self.flush_interval
+        if self.background:
+            self._start_flusher()
+            if full:
+                self._wake.set()
+        elif due:
+            self.flush()
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='kursy-download-counter', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Błąd zapisu liczników pobrań.')
+            finally:
+                # Połączenia tego wątku - nie trzymamy ich otwartych między zapisami
+                connections.close_all()
+
+    def stop(self):
+        """
+        Zatrzymuje wątek zapisujący (po zapisaniu bieżącego bufora).
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def flush(self):
+        """
+        Zapisuje zebrane przyrosty. Zwraca liczbę zapisanych pobrań.
+        """
+        with self._lock:
+            self._since_flush = 0
+            self._last_flush = time.monotonic()
+        deltas = self.store.drain()
+        if not deltas:
+            return 0
+        try:
+            apply_deltas(deltas)
+        except DatabaseError:
+            # Przyrosty wracają do bufora i zostaną zapisane przy kolejnej próbie
+            self.store.restore(deltas)
+            logger.exception('Nie udało się zapisać liczników pobrań.')
+            return 0
+        return sum(deltas.values())
+
+
+@lru_cache(maxsize=None)
+def get_download_counter():
+    config = {**DEFAULT_DOWNLOAD_COUNTER, **getattr(settings, 'DOWNLOAD_COUNTER', {})}
+    if config['STORE'] == 'cache':
+        store = CacheCounterStore(config['CACHE_ALIAS'])
+    elif config['STORE'] == 'memory':
+        store = MemoryCounterStore()
+    else:
+        raise ValueError(f"Nieznany magazyn liczników: {config['STORE']}")
+    return DownloadCounter(store, config['FLUSH_INTERVAL'], config['MAX_PENDING'], config['BACKGROUND_FLUSH'])
+
+
+@atexit.register
+def _flush_at_exit():
+    # Zapisujemy tylko licznik, który został faktycznie utworzony w tym procesie
+    if get_download_counter.cache_info().currsize:
+        counter = get_download_counter()
+        counter.stop()
+        counter.flush()
+
+
+@receiver(setting_changed)
+def _reset_download_counter(sender, setting, **kwargs):
+    if setting == 'DOWNLOAD_COUNTER':
+        if get_download_counter.cache_info().currsize:
+            get_download_counter().stop()
+        get_download_counter.cache_clear()
@@ -0,0 +1,177 @@
+"""
+Serwowanie plików załączników: żądania warunkowe, zakresy bajtów (HTTP Range)
+i przekazywanie transferu do serwera proxy (X-Accel-Redirect / X-Sendfile).
+"""
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_etags
+from rest_framework.negotiation import BaseContentNegotiation
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class FileContentNegotiation(BaseContentNegotiation):
+    """
+    Negocjacja dla widoków zwracających plik: nagłówek Accept jest pomijany,
+    a odpowiedzi DRF (błędy) są renderowane pierwszym rendererem.
+    """
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def attachment_etag(attachment):
+    """
+    Silny ETag wyliczony z zapisanej w bazie sumy SHA-256 (bez czytania pliku).
+    """
+    if attachment.sha256:
+        return f'"{attachment.sha256}"'
+    return f'"{attachment.pk}-{attachment.size_bytes}"'
+
+
+def parse_range(header, size):
+    """
+    Parsuje nagłówek Range z pojedynczym zakresem.
+
+    Zwraca (start, end) włącznie, None gdy nagłówek należy zignorować
+    (brak, wiele zakresów, błędna składnia) lub False gdy zakres jest
+    niemożliwy do spełnienia (416).
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        # Pusty plik nie ma żadnego bajtu do wysłania
+        return False
+    if not first:
+        # bytes=-N - ostatnie N bajtów
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and start > int(last):
+        return None
+    if start >= size:
+        return False
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def _content_disposition(filename):
+    return f"attachment; filename*=UTF-8''{quote(filename)}"
+
+
+def _read_range(file, start, length):
+    with file:
+        file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def offload_response(attachment):
+    """
+    Odpowiedź bez treści - transfer bajtów wykonuje serwer proxy.
+    Zwraca None, gdy offload nie jest skonfigurowany.
+    """
+    mode = getattr(settings, 'ATTACHMENT_DOWNLOAD_OFFLOAD', None)
+    if not mode:
+        return None
+    response = HttpResponse(content_type=attachment.content_type or 'application/octet-stream')
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'ATTACHMENT_ACCEL_REDIRECT_PREFIX', '/protected/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(attachment.file.name)
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = attachment.file.path
+    else:
+        raise ValueError(f'Nieznany tryb ATTACHMENT_DOWNLOAD_OFFLOAD: {mode}')
+    return response
+
+
+def requested_range(request, etag, size):
+    """
+    Zakres z nagłówka Range (jak parse_range), pomijany gdy If-Range
+    nie zgadza się z bieżącym ETagiem.
+    """
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and etag not in parse_etags(if_range):
+        # Plik zmienił się od pobrania pierwszej części - wysyłamy całość
+        return None
+    return byte_range
+
+
+def is_counted_download(request, byte_range, size):
+    """
+    Czy żądanie jest pobraniem: GET całego pliku lub zakresu obejmującego
+    ostatni bajt (kończy pobieranie, także wznowione). HEAD, sondy
+    w rodzaju bytes=0-0 i środkowe części pliku nie są liczone.
+    """
+    if request.method != 'GET' or byte_range is False:
+        return False
+    return byte_range is None or byte_range[1] == size - 1
+
+
+def serve_attachment(request, attachment):
+    """
+    Buduje odpowiedź z plikiem załącznika.
+
+    Zwraca krotkę (response, counted) - `counted` mówi, czy żądanie należy
+    liczyć jako pobranie (is_counted_download).
+    """
+    etag = attachment_etag(attachment)
+    conditional = get_conditional_response(request, etag=etag)
+    if conditional is not None:
+        conditional['ETag'] = etag
+        return conditional, False
+
+    size = attachment.size_bytes or attachment.file.size
+    byte_range = requested_range(request, etag, size)
+    counted = is_counted_download(request, byte_range, size)
+
+    # Przy offloadzie proxy samo obsługuje Range i wysyła plik
+    response = offload_response(attachment)
+    if response is None:
+        response = _python_response(attachment, byte_range, size)
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = _content_disposition(attachment.original_filename)
+    response['Cache-Control'] = 'private'
+    return response, counted
+
+
+def _python_response(attachment, byte_range, size):
+    content_type = attachment.content_type or 'application/octet-stream'
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    file = attachment.file.storage.open(attachment.file.name, 'rb')
+    response = StreamingHttpResponse(_read_range(file, start, length), content_type=content_type)
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
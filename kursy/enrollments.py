@@ -0,0 +1,205 @@
+"""
+Operacje masowe na zapisach na kursy.
+
+Każda akcja to przejście między statusami (np. pending -> approved).
+Identyfikatory są przetwarzane w paczkach - każda paczka to osobna,
+krótka transakcja z warunkowym UPDATE/DELETE, który zmienia tylko zapisy
+w dozwolonym statusie źródłowym. Liczniki zapisów kursu są korygowane
+w tej samej transakcji na podstawie liczby zmienionych wierszy.
+"""
+import csv
+from itertools import islice
+
+from django.db import transaction
+
+from .access import invalidate_course_access
+from .models import Course, CustomUser, Enrollment, normalize_email_key
+
+# akcja -> (dozwolone statusy źródłowe, status docelowy; None oznacza usunięcie)
+ENROLLMENT_ACTIONS = {
+    'approve': (('pending',), 'approved'),
+    'reject': (('pending',), 'rejected'),
+    'restore': (('rejected',), 'approved'),
+    'delete': (('approved',), None),
+}
+
+BULK_CHUNK_SIZE = 500
+IMPORT_CHUNK_SIZE = 1000
+
+
+def _apply_to_queryset(course, queryset, source_statuses, target_status):
+    """
+    Zmienia status (lub usuwa) zapisy z querysetu i koryguje liczniki kursu.
+    Zwraca liczbę zmienionych zapisów.
+    """
+    changed = 0
+    deltas = {}
+    with transaction.atomic():
+        # Osobne zapytanie na każdy status źródłowy - liczba wierszy mówi dokładnie,
+        # ile zapisów opuściło dany status
+        for source_status in source_statuses:
+            subset = queryset.filter(status=source_status)
+            if 'approved' in (source_status, target_status):
+                # Zmienia się zbiór kursów dostępnych dla tych studentów
+                invalidate_course_access(subset.values_list('student_id', flat=True))
+            if target_status is None:
+                count = subset.delete()[0]
+            else:
+                count = subset.update(status=target_status)
+            if count:
+                deltas[source_status] = deltas.get(source_status, 0) - count
+                if target_status is not None:
+                    deltas[target_status] = deltas.get(target_status, 0) + count
+                changed += count
+        Course.objects.adjust_enrollment_counts(course.id, deltas)
+    return changed
+
+
+def apply_enrollment_action(course, action, enrollment_ids, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Wykonuje akcję na podanych zapisach kursu.
+
+    Zwraca dokładny wynik dla każdego identyfikatora:
+    - changed: zapis zmienił status (lub został usunięty),
+    - unchanged: zapis istnieje, ale jego status nie pozwala na akcję,
+    - invalid: zapis nie istnieje lub należy do innego kursu.
+    """
+    source_statuses, target_status = ENROLLMENT_ACTIONS[action]
+    ids = list(dict.fromkeys(enrollment_ids))
+    changed, unchanged, invalid = [], [], []
+
+    for offset in range(0, len(ids), chunk_size):
+        chunk = ids[offset:offset + chunk_size]
+        with transaction.atomic():
+            found = dict(
+                Enrollment.objects.filter(course=course, id__in=chunk)
+                .select_for_update()
+                .values_list('id', 'status')
+            )
+            eligible = [pk for pk, current in found.items() if current in source_statuses]
+            if eligible:
+                # Warunek na statusie źródłowym powtarzamy w samym UPDATE
+                _apply_to_queryset(
+                    course, Enrollment.objects.filter(id__in=eligible), source_statuses, target_status
+                )
+        eligible_set = set(eligible)
+        for pk in chunk:
+            if pk not in found:
+                invalid.append(pk)
+            elif pk in eligible_set:
+                changed.append(pk)
+            else:
+                unchanged.append(pk)
+
+    return {
+        'action': action,
+        'changed_count': len(changed),
+        'unchanged_count': len(unchanged),
+        'invalid_count': len(invalid),
+        'unchanged_ids': unchanged,
+        'invalid_ids': invalid,
+    }
+
+
+def apply_enrollment_action_to_matching(course, action, status=None, exclude_ids=()):
+    """
+    Wykonuje akcję na wszystkich zapisach kursu pasujących do filtra,
+    jednym zapytaniem UPDATE/DELETE. Zwraca liczbę zmienionych zapisów.
+
+    `status` zawęża statusy źródłowe akcji; `exclude_ids` pomija wskazane zapisy.
+    """
+    source_statuses, target_status = ENROLLMENT_ACTIONS[action]
+    if status is not None:
+        source_statuses = [s for s in source_statuses if s == status]
+    if not source_statuses:
+        return 0
+    queryset = Enrollment.objects.filter(course=course)
+    if exclude_ids:
+        queryset = queryset.exclude(id__in=exclude_ids)
+    return _apply_to_queryset(course, queryset, source_statuses, target_status)
+
+
+def read_roster_emails(lines):
+    """
+    Czyta adresy e-mail z pliku CSV (iterowalnego po liniach).
+
+    Jeśli pierwszy wiersz zawiera kolumnę 'email', jest traktowany jako
+    nagłówek; w przeciwnym razie adres jest brany z pierwszej kolumny.
+    """
+    reader = csv.reader(lines)
+    column = 0
+    for index, row in enumerate(reader):
+        cells = [cell.strip() for cell in row]
+        if index == 0:
+            header = [cell.lower() for cell in cells]
+            if 'email' in header or 'e-mail' in header:
+                column = header.index('email') if 'email' in header else header.index('e-mail')
+                continue
+        if len(cells) > column and cells[column]:
+            yield cells[column]
+
+
+def _unique(values):
+    seen = set()
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+            yield value
+
+
+def import_roster(course, emails, status='approved', chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Zapisuje na kurs studentów o podanych adresach e-mail.
+
+    Adresy są rozwiązywane paczkami (jedno zapytanie IN po email_key, bez
+    względu na wielkość liter), a zapisy
+    tworzone przez bulk_create(ignore_conflicts=True), więc istniejące zapisy
+    (unique_together student/kurs) są pomijane. bulk_create nie zwraca, które
+    wiersze wstawił, dlatego utworzone zapisy są odczytywane ponownie po
+    wstawieniu, a liczniki kursu przeliczane z wierszy w tej samej transakcji
+    (równoległy zapis mógł wstawić część z nich). Zwraca liczby utworzonych,
+    pominiętych (już zapisanych) i nieznanych adresów.
+    """
+    created = skipped = 0
+    unknown = []
+    unique_emails = _unique(emails)
+
+    while True:
+        batch = list(islice(unique_emails, chunk_size))
+        if not batch:
+            break
+
+        keys = {email: normalize_email_key(email) for email in batch}
+        students = dict(
+            CustomUser.objects.filter(email_key__in=set(keys.values()), is_instructor=False)
+            .values_list('email_key', 'id')
+        )
+        unknown.extend(email for email in batch if keys[email] not in students)
+
+        student_ids = set(students.values())
+        with transaction.atomic():
+            existing = set(
+                Enrollment.objects.filter(course=course, student_id__in=student_ids)
+                .values_list('student_id', flat=True)
+            )
+            Enrollment.objects.bulk_create([
+                Enrollment(course=course, student_id=student_id, status=status)
+                for student_id in student_ids - existing
+            ], ignore_conflicts=True)
+            inserted = set(
+                Enrollment.objects.filter(course=course, student_id__in=student_ids - existing, status=status)
+                .values_list('student_id', flat=True)
+            )
+            if inserted:
+                Course.objects.recount_enrollments(Course.objects.filter(pk=course.id))
+                if status == 'approved':
+                    invalidate_course_access(inserted)
+        created += len(inserted)
+        skipped += len(student_ids) - len(inserted)
+
+    return {
+        'created_count': created,
+        'skipped_count': skipped,
+        'unknown_count': len(unknown),
+        'unknown_emails': unknown,
+    }
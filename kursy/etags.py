@@ -0,0 +1,87 @@
+"""
+Nagłówki ETag dla zasobów API.
+
+ETag jest wyliczany z pola updated_at (i ID obiektu), więc odpowiedź 304
+lub 412 zapada bez serializacji obiektu. ETag reprezentacji obejmuje też
+updated_at obiektów zagnieżdżonych w odpowiedzi oraz projekcję ?fields=
+i ?expand=. Dla list używany jest jeden agregat: liczba wierszy
+i najpóźniejszy updated_at (także rozwiniętych relacji) - z tą samą
+projekcją co ETag obiektu.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+
+
+def _stamp(value):
+    return int(value.timestamp() * 1_000_000) if value else 0
+
+
+def object_etag(obj, related=(), variant=''):
+    """
+    `related` - obiekty zagnieżdżone w odpowiedzi (None dla pustej relacji),
+    `variant` - identyfikator projekcji innej niż domyślna.
+    """
+    parts = [obj._meta.model_name, obj.pk, _stamp(obj.updated_at)]
+    parts += [_stamp(getattr(item, 'updated_at', None)) for item in related]
+    if variant:
+        parts.append(variant)
+    return '"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def _projection_variant(serializer_class, fields, expand):
+    """
+    (rozwinięte relacje, identyfikator projekcji - pusty dla domyślnej).
+    """
+    representation = serializer_class.representation(fields, expand)
+    variant = ''
+    if representation != serializer_class.representation():
+        variant = hashlib.sha1(repr(representation).encode()).hexdigest()[:12]
+    return representation[1], variant
+
+
+def representation_etag(obj, serializer_class, fields=None, expand=None):
+    """
+    ETag reprezentacji obiektu zwracanej przez `serializer_class` z daną
+    projekcją. Rozwinięte relacje muszą być już wczytane (select_related).
+    """
+    expanded, variant = _projection_variant(serializer_class, fields, expand)
+    related = [getattr(obj, name) for name in expanded]
+    return object_etag(obj, related, variant)
+
+
+def collection_etag(queryset, scope, extra_sum=None, serializer_class=None, fields=None, expand=None):
+    """
+    ETag listy: zmienia się przy dodaniu, usunięciu lub zapisie dowolnego elementu.
+    `extra_sum` to pole sumowane dodatkowo (np. licznik zmieniany przez UPDATE).
+    Z `serializer_class` ETag obejmuje projekcję ?fields=/?expand= i najpóźniejszy
+    updated_at każdej rozwiniętej relacji.
+    """
+    expanded, variant = (), ''
+    if serializer_class is not None:
+        expanded, variant = _projection_variant(serializer_class, fields, expand)
+    aggregates = {'total': Count('pk'), 'latest': Max('updated_at')}
+    for name in expanded:
+        aggregates[f'latest_{name}'] = Max(f'{name}__updated_at')
+    if extra_sum:
+        aggregates['extra'] = Sum(extra_sum)
+    values = queryset.order_by().aggregate(**aggregates)
+    parts = [queryset.model._meta.model_name, scope, values['total'], _stamp(values['latest'])]
+    parts += [_stamp(values[f'latest_{name}']) for name in expanded]
+    if extra_sum:
+        parts.append(values['extra'] or 0)
+    if variant:
+        parts.append(variant)
+    return '"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def conditional_response(request, etag):
+    """
+    Zwraca 304 (If-None-Match przy GET) lub 412 (niespełniony If-Match),
+    albo None, gdy żądanie należy obsłużyć normalnie.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
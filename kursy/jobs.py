@@ -0,0 +1,62 @@
+"""
+Proste zadania w tle dla długich operacji API.
+
+Zadanie wykonuje się w puli wątków bieżącego procesu, a jego stan
+(pending/running/done/failed) i wynik trafiają do cache Django, skąd
+odczytuje je endpoint statusu. Przy wielu procesach cache musi być
+współdzielony (np. Redis), aby status był widoczny z każdego z nich.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+JOB_TTL = 60 * 60
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='kursy-job')
+
+
+def _job_key(job_id):
+    return f'kursy:job:{job_id}'
+
+
+def get_job(job_id):
+    return cache.get(_job_key(job_id))
+
+
+def _set_job(job_id, **state):
+    job = get_job(job_id) or {}
+    job.update(state)
+    cache.set(_job_key(job_id), job, JOB_TTL)
+
+
+def _run(job_id, func, args, kwargs):
+    _set_job(job_id, status='running')
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        logger.exception('Zadanie %s zakończyło się błędem.', job_id)
+        _set_job(job_id, status='failed')
+    else:
+        _set_job(job_id, status='done', result=result)
+    finally:
+        # Wątek puli ma własne połączenie z bazą - zamykamy je po zadaniu
+        connections.close_all()
+
+
+def start_job(owner_id, course_id, func, *args, **kwargs):
+    """
+    Uruchamia funkcję w tle i zwraca identyfikator zadania.
+    Zadanie jest przypisane do właściciela i kursu, którego dotyczy.
+    """
+    job_id = uuid.uuid4().hex
+    cache.set(
+        _job_key(job_id),
+        {'id': job_id, 'owner_id': owner_id, 'course_id': course_id, 'status': 'pending'},
+        JOB_TTL,
+    )
+    _executor.submit(_run, job_id, func, args, kwargs)
+    return job_id
@@ -0,0 +1,202 @@
+"""
+Kolejność lekcji w kursie.
+
+Pozycje lekcji są liczbami z odstępami (LESSON_POSITION_GAP), więc
+przeniesienie jednej lekcji to zwykle UPDATE jednego wiersza - nowa
+pozycja leży w połowie między sąsiadami. Dopiero gdy odstęp się
+wyczerpie, pozycje kursu są numerowane od nowa.
+"""
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import LESSON_POSITION_GAP, Lesson
+
+REORDER_BATCH_SIZE = 500
+
+
+class LessonOrderError(Exception):
+    """
+    Nieprawidłowe żądanie zmiany kolejności lekcji.
+    """
+
+
+def reorder_lessons(course, lesson_ids):
+    """
+    Ustala kolejność wszystkich lekcji kursu wg listy ID.
+
+    Lista musi zawierać każdą lekcję kursu dokładnie raz. Zapisywane są
+    tylko lekcje, których pozycja się zmienia - jedno zapytanie UPDATE
+    na REORDER_BATCH_SIZE lekcji. Zwraca liczbę przeniesionych lekcji.
+    """
+    with transaction.atomic():
+        current = dict(
+            Lesson.objects.select_for_update().filter(course=course).values_list('id', 'position')
+        )
+        if len(lesson_ids) != len(current) or set(lesson_ids) != set(current):
+            raise LessonOrderError('Lista musi zawierać każdą lekcję kursu dokładnie raz.')
+        return _apply_positions(current, lesson_ids)
+
+
+def _apply_positions(current, ordered_ids):
+    now = timezone.now()
+    changed = [
+        Lesson(pk=pk, position=(index + 1) * LESSON_POSITION_GAP, updated_at=now)
+        for index, pk in enumerate(ordered_ids)
+        if current[pk] != (index + 1) * LESSON_POSITION_GAP
+    ]
+    Lesson.objects.bulk_update(changed, ['position', 'updated_at'], batch_size=REORDER_BATCH_SIZE)
+    return len(changed)
+
+
+def move_lesson(lesson, after_id=None):
+    """
+    Przenosi lekcję bezpośrednio za lekcję `after_id` (None - na początek kursu).
+    Zwraca nową pozycję lekcji.
+    """
+    with transaction.atomic():
+        siblings = Lesson.objects.select_for_update().filter(course_id=lesson.course_id).exclude(pk=lesson.pk)
+        if after_id is None:
+            lower, following = 0, siblings
+        else:
+            lower = siblings.filter(pk=after_id).values_list('position', flat=True).first()
+            if lower is None:
+                raise LessonOrderError('Lekcja docelowa nie należy do tego kursu.')
+            following = siblings.filter(Q(position__gt=lower) | Q(position=lower, id__gt=after_id))
+        upper = following.order_by('position', 'id').values_list('position', flat=True).first()
+
+        if upper is None:
+            position = lower + LESSON_POSITION_GAP
+        elif upper - lower >= 2:
+            position = (lower + upper) // 2
+        else:
+            # Brak miejsca między sąsiadami - numerujemy kurs od nowa
+            current = dict(siblings.values_list('id', 'position'))
+            ordered = list(siblings.order_by('position', 'id').values_list('id', flat=True))
+            ordered.insert(ordered.index(after_id) + 1 if after_id is not None else 0, lesson.pk)
+            current[lesson.pk] = lesson.position
+            _apply_positions(current, ordered)
+            lesson.position = (ordered.index(lesson.pk) + 1) * LESSON_POSITION_GAP
+            return lesson.position
+
+        Lesson.objects.filter(pk=lesson.pk).update(position=position, updated_at=timezone.now())
+    lesson.position = position
+    return position
+
+
+BATCH_OPERATIONS = ('create', 'update', 'delete', 'publish', 'unpublish')
+MAX_BATCH_OPERATIONS = 200
+
+
+def _validate_batch(course, operations):
+    """
+    Sprawdza operacje. Zwraca (błędy, lekcje kursu wskazane w operacjach,
+    serializer tworzonych lekcji, serializery aktualizacji {indeks: serializer}).
+    """
+    from .serializers import LessonSerializer
+
+    errors = {}
+    ids = {}
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+            errors[index] = {'op': [f"Dozwolone operacje: {', '.join(BATCH_OPERATIONS)}."]}
+            continue
+        if operation['op'] == 'create':
+            continue
+        try:
+            pk = int(operation.get('id'))
+        except (TypeError, ValueError):
+            errors[index] = {'id': ['Wymagane ID lekcji.']}
+            continue
+        if pk in ids.values():
+            errors[index] = {'id': ['Lekcja występuje w kilku operacjach.']}
+        ids[index] = pk
+
+    lessons = Lesson.objects.filter(course=course, id__in=set(ids.values())).in_bulk()
+    for index, pk in ids.items():
+        if pk not in lessons:
+            errors.setdefault(index, {'id': ['Lekcja nie należy do tego kursu.']})
+
+    create_indexes = [i for i, op in enumerate(operations) if i not in errors and op['op'] == 'create']
+    creates = LessonSerializer(data=[operations[i].get('data', {}) for i in create_indexes], many=True)
+    if create_indexes and not creates.is_valid():
+        item_errors = creates.errors
+        if isinstance(item_errors, list):
+            item_errors = dict(enumerate(item_errors))
+        for number, index in enumerate(create_indexes):
+            if item_errors.get(number):
+                errors[index] = item_errors[number]
+
+    updates = {}
+    for index, pk in ids.items():
+        if index in errors or operations[index]['op'] != 'update':
+            continue
+        serializer = LessonSerializer(lessons[pk], data=operations[index].get('data', {}), partial=True)
+        if serializer.is_valid():
+            updates[index] = serializer
+        else:
+            errors[index] = serializer.errors
+
+    return errors, lessons, (create_indexes, creates), updates
+
+
+def apply_lesson_batch(course, operations):
+    """
+    Wykonuje listę operacji na lekcjach kursu w jednej transakcji.
+
+    Każda operacja to {"op": "create", "data": {...}}, {"op": "update",
+    "id": ..., "data": {...}}, {"op": "delete", "id": ...} albo
+    {"op": "publish"/"unpublish", "id": ...}. Jeśli którakolwiek operacja
+    jest błędna, nic nie jest zapisywane i zwracana jest lista błędów.
+
+    Zwraca (wyniki, błędy) - obie listy w kolejności operacji.
+    """
+    from .search import index_lessons
+    from .serializers import LessonSerializer
+
+    errors, lessons, (create_indexes, creates), updates = _validate_batch(course, operations)
+    if errors:
+        return [], [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+
+    results = [None] * len(operations)
+    now = timezone.now()
+    with transaction.atomic():
+        if create_indexes:
+            last = Lesson.objects.filter(course=course).aggregate(last=Max('position'))['last'] or 0
+            new_lessons = [
+                Lesson(course=course, position=last + (number + 1) * LESSON_POSITION_GAP, **data)
+                for number, data in enumerate(creates.validated_data)
+            ]
+            Lesson.objects.bulk_create(new_lessons)
+            index_lessons(new_lessons)
+            for index, lesson in zip(create_indexes, new_lessons):
+                results[index] = {'index': index, 'op': 'create', 'id': lesson.pk,
+                                  'lesson': LessonSerializer(lesson).data}
+
+        if updates:
+            fields = {'updated_at'}
+            changed = []
+            for index, serializer in updates.items():
+                lesson = serializer.instance
+                for field, value in serializer.validated_data.items():
+                    setattr(lesson, field, value)
+                    fields.add(field)
+                lesson.updated_at = now
+                changed.append(lesson)
+                results[index] = {'index': index, 'op': 'update', 'id': lesson.pk,
+                                  'lesson': LessonSerializer(lesson).data}
+            Lesson.objects.bulk_update(changed, sorted(fields), batch_size=REORDER_BATCH_SIZE)
+            index_lessons(changed)
+
+        by_op = {}
+        for index, operation in enumerate(operations):
+            if operation['op'] in ('delete', 'publish', 'unpublish'):
+                by_op.setdefault(operation['op'], []).append(int(operation['id']))
+                results[index] = {'index': index, 'op': operation['op'], 'id': int(operation['id'])}
+        for op, published in (('publish', True), ('unpublish', False)):
+            if op in by_op:
+                Lesson.objects.filter(id__in=by_op[op]).update(is_published=published, updated_at=now)
+        if 'delete' in by_op:
+            Lesson.objects.filter(id__in=by_op['delete']).delete()
+
+    return results, []
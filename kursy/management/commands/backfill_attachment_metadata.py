@@ -0,0 +1,37 @@
+"""
+Management command uzupełniający rozmiar, typ MIME i sumę SHA-256 istniejących załączników.
+"""
+from django.core.management.base import BaseCommand
+from kursy.models import Attachment
+
+
+class Command(BaseCommand):
+    help = 'Uzupełnia size_bytes, content_type i sha256 załączników zapisanych przed ich wprowadzeniem'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Przelicz metadane wszystkich załączników, nie tylko brakujące.'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Attachment.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(sha256='')
+
+        updated = 0
+        missing = 0
+        for attachment in queryset.iterator(chunk_size=500):
+            try:
+                attachment.populate_file_metadata()
+            except (FileNotFoundError, OSError):
+                missing += 1
+                self.stdout.write(self.style.WARNING(f'Brak pliku: {attachment.file.name} (id={attachment.id})'))
+                continue
+            finally:
+                attachment.file.close()
+            attachment.save(update_fields=['size_bytes', 'content_type', 'sha256'])
+            updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Zaktualizowano: {updated}, brakujące pliki: {missing}'))
@@ -0,0 +1,26 @@
+"""
+Management command usuwający porzucone sesje przesyłania w częściach.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from kursy.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    help = ('Usuwa sesje przesyłania załączników bez nowych części dłużej niż ATTACHMENT_UPLOAD_TTL '
+            'oraz ich pliki tymczasowe (do uruchamiania okresowo, np. z crona)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=None,
+            help='Wiek sesji w sekundach (domyślnie ATTACHMENT_UPLOAD_TTL).'
+        )
+
+    def handle(self, *args, **options):
+        max_age = options['max_age']
+        if max_age is None:
+            max_age = settings.ATTACHMENT_UPLOAD_TTL
+        expired, orphans = expire_uploads(max_age)
+        self.stdout.write(self.style.SUCCESS(f'Usunięte sesje: {expired}, osierocone pliki: {orphans}'))
@@ -0,0 +1,20 @@
+"""
+Management command zapisujący buforowane liczniki pobrań do bazy.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from kursy.counters import get_download_counter
+
+
+class Command(BaseCommand):
+    help = ('Zapisuje buforowane przyrosty liczników pobrań załączników do bazy '
+            '(wymaga DOWNLOAD_COUNTER["STORE"] = "cache" - obejmuje wszystkie procesy)')
+
+    def handle(self, *args, **options):
+        counter = get_download_counter()
+        if not counter.store.shared:
+            raise CommandError(
+                'Przyrosty są buforowane w pamięci procesów serwera (DOWNLOAD_COUNTER["STORE"] = "memory") '
+                '- komenda nie ma do nich dostępu. Zapisuje je wątek w tle każdego procesu.'
+            )
+        flushed = counter.flush()
+        self.stdout.write(self.style.SUCCESS(f'Zapisano pobrań: {flushed}'))
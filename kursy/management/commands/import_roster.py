@@ -0,0 +1,39 @@
+"""
+Management command zapisujący na kurs studentów z pliku CSV z adresami e-mail.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from kursy.enrollments import import_roster, read_roster_emails
+from kursy.models import Course, Enrollment
+
+
+class Command(BaseCommand):
+    help = 'Zapisuje na kurs studentów, których adresy e-mail znajdują się w pliku CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int, help='ID kursu')
+        parser.add_argument('csv_path', help='Ścieżka do pliku CSV z adresami e-mail')
+        parser.add_argument(
+            '--status',
+            default='approved',
+            choices=[value for value, _ in Enrollment.STATUS_CHOICES],
+            help='Status tworzonych zapisów (domyślnie approved).'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(pk=options['course_id'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Kurs o ID {options['course_id']} nie istnieje.")
+
+        try:
+            with open(options['csv_path'], encoding='utf-8-sig', newline='') as roster:
+                result = import_roster(course, read_roster_emails(roster), status=options['status'])
+        except OSError as error:
+            raise CommandError(f'Nie można odczytać pliku: {error}')
+
+        for email in result['unknown_emails']:
+            self.stdout.write(self.style.WARNING(f'Nieznany adres: {email}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Utworzono: {result['created_count']}, pominięto: {result['skipped_count']}, "
+            f"nieznane: {result['unknown_count']}"
+        ))
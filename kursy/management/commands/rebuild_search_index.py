@@ -0,0 +1,15 @@
+"""
+Management command odbudowujący indeks wyszukiwania pełnotekstowego (FTS5).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from kursy import search
+
+
+class Command(BaseCommand):
+    help = 'Odbudowuje indeks wyszukiwania kursów i lekcji z danych w bazie'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Wyszukiwanie pełnotekstowe wymaga bazy SQLite z FTS5.')
+        courses, lessons = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Zaindeksowano kursy: {courses}, lekcje: {lessons}'))
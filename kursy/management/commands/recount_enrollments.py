@@ -0,0 +1,19 @@
+"""
+Management command przeliczający od nowa liczniki zapisów kursów.
+"""
+from django.core.management.base import BaseCommand
+from kursy.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Przelicza liczniki zapisów (pending/approved/rejected) kursów na podstawie tabeli zapisów'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help='ID kursów (domyślnie wszystkie)')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['course_ids']:
+            courses = courses.filter(pk__in=options['course_ids'])
+        updated = Course.objects.recount_enrollments(courses)
+        self.stdout.write(self.style.SUCCESS(f'Przeliczono liczniki kursów: {updated}'))
@@ -1,9 +1,103 @@
-class AuthMiddleware:
+"""
+Middleware aplikacji kursy.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('kursy.queries')
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:[^()]*)\)', re.IGNORECASE)
+
+DEFAULT_QUERY_INSPECTOR = {
+    'ENABLED': False,
+    # Ile razy ten sam kształt zapytania może wystąpić w jednym żądaniu
+    'THRESHOLD': 5,
+    # Rzuca NPlusOneError zamiast logować (przydatne w testach)
+    'RAISE': False,
+}
+
+
+class NPlusOneError(Exception):
+    """
+    Wykryto powtarzające się zapytania SQL w obrębie jednego żądania.
+    """
+
+
+def normalize_sql(sql):
+    """
+    Sprowadza zapytanie SQL do "kształtu" - bez literałów i z listami IN
+    zwiniętymi do jednego elementu, tak aby zapytania różniące się tylko
+    parametrami trafiały do tej samej grupy.
+    """
+    sql = _STRING_LITERAL_RE.sub('?', sql)
+    sql = _NUMBER_LITERAL_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """
+    Wrapper wykonania zapytań (connection.execute_wrapper) zbierający
+    znormalizowane kształty wszystkich zapytań.
+    """
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[normalize_sql(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+class QueryInspectorMiddleware:
+    """
+    Wykrywa wzorzec N+1 - zapytania o tym samym kształcie powtarzane
+    w obrębie jednego żądania.
+
+    Włączany ustawieniem QUERY_INSPECTOR['ENABLED']; gdy jest wyłączony,
+    Django pomija middleware całkowicie.
+    """
     def __init__(self, get_response):
+        self.config = {**DEFAULT_QUERY_INSPECTOR, **getattr(settings, 'QUERY_INSPECTOR', {})}
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
         self.get_response = get_response
 
     def __call__(self, request):
-        # Placeholder for authentication logic
-        response = self.get_response(request)
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        offenders = recorder.repeated(self.config['THRESHOLD'])
+        if offenders:
+            self.report(request, recorder, offenders)
         return response
 
+    def report(self, request, recorder, offenders):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else request.path
+        lines = [f'{count}x {shape}' for shape, count in offenders]
+        message = (
+            f'Powtarzające się zapytania w {url_name} '
+            f'({recorder.total} zapytań łącznie):\n' + '\n'.join(lines)
+        )
+        if self.config['RAISE']:
+            raise NPlusOneError(message)
+        logger.warning(message, extra={'url_name': url_name, 'query_shapes': offenders})
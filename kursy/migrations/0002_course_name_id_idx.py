@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['name', 'id'], name='course_name_id_idx'),
+        ),
+    ]
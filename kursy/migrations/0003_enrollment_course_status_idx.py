@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0002_course_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'status', 'id'], name='enrollment_course_status_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0003_enrollment_course_status_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='content_type',
+            field=models.CharField(blank=True, help_text='Typ zawartości pliku.', max_length=255, verbose_name='Typ MIME'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='Skrót SHA-256 zawartości pliku (hex).', max_length=64, verbose_name='Suma SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='size_bytes',
+            field=models.PositiveBigIntegerField(default=0, help_text='Rozmiar pliku w bajtach, zapisany przy przesłaniu.', verbose_name='Rozmiar'),
+        ),
+    ]
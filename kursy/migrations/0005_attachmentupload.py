@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:02
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0004_attachment_file_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('original_filename', models.CharField(help_text='Oryginalna nazwa pliku przesłanego przez użytkownika.', max_length=255, verbose_name='Oryginalna nazwa pliku')),
+                ('total_size', models.PositiveBigIntegerField(help_text='Deklarowany rozmiar pliku w bajtach.', verbose_name='Rozmiar całkowity')),
+                ('received_bytes', models.PositiveBigIntegerField(default=0, help_text='Liczba bajtów zapisanych w pliku tymczasowym.', verbose_name='Odebrane bajty')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Utworzono')),
+                ('lesson', models.ForeignKey(help_text='Lekcja, do której trafi załącznik.', on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='kursy.lesson', verbose_name='Lekcja')),
+                ('uploaded_by', models.ForeignKey(help_text='Użytkownik przesyłający plik.', on_delete=django.db.models.deletion.CASCADE, related_name='attachment_uploads', to=settings.AUTH_USER_MODEL, verbose_name='Przesyłający')),
+            ],
+            options={
+                'verbose_name': 'Przesyłanie załącznika',
+                'verbose_name_plural': 'Przesyłania załączników',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import django.db.models.deletion
+import kursy.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0005_attachmentupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(help_text='Skrót SHA-256 zawartości pliku (hex).', max_length=64, unique=True, verbose_name='Suma SHA-256')),
+                ('file', models.FileField(blank=True, help_text='Ścieżka do pliku na serwerze.', max_length=255, upload_to=kursy.models.attachment_blob_path, verbose_name='Plik')),
+                ('size_bytes', models.PositiveBigIntegerField(default=0, help_text='Rozmiar pliku w bajtach.', verbose_name='Rozmiar')),
+                ('ref_count', models.IntegerField(default=0, help_text='Liczba załączników korzystających z tej treści.', verbose_name='Liczba odwołań')),
+            ],
+            options={
+                'verbose_name': 'Treść załącznika',
+                'verbose_name_plural': 'Treści załączników',
+            },
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='blob',
+            field=models.ForeignKey(blank=True, help_text='Współdzielona treść pliku (tylko w trybie deduplikacji).', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='attachments', to='kursy.attachmentblob', verbose_name='Treść'),
+        ),
+    ]
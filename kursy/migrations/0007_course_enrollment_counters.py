@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_enrollment_counters(apps, schema_editor):
+    Course = apps.get_model('kursy', 'Course')
+    Enrollment = apps.get_model('kursy', 'Enrollment')
+
+    def count(status):
+        totals = (
+            Enrollment.objects.filter(course=OuterRef('pk'), status=status)
+            .order_by().values('course').annotate(total=Count('id')).values('total')
+        )
+        return Coalesce(Subquery(totals), Value(0))
+
+    Course.objects.update(
+        pending_count=count('pending'),
+        approved_count=count('approved'),
+        rejected_count=count('rejected'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0006_attachment_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='approved_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Liczba zatwierdzonych zapisów (aktualizowana przy każdej zmianie zapisów).', verbose_name='Zatwierdzone zapisy'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Liczba oczekujących zapisów (aktualizowana przy każdej zmianie zapisów).', verbose_name='Oczekujące zapisy'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rejected_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Liczba odrzuconych zapisów (aktualizowana przy każdej zmianie zapisów).', verbose_name='Odrzucone zapisy'),
+        ),
+        migrations.RunPython(fill_enrollment_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+COURSE_INDEX = 'kursy_course_fts'
+LESSON_INDEX = 'kursy_lesson_fts'
+TOKENIZER = "tokenize='unicode61 remove_diacritics 2'"
+
+
+def create_search_index(apps, schema_editor):
+    # Indeks FTS5 jest dostępny tylko w SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'CREATE VIRTUAL TABLE {COURSE_INDEX} USING fts5(name, description, {TOKENIZER})')
+    schema_editor.execute(f'CREATE VIRTUAL TABLE {LESSON_INDEX} USING fts5(title, description, {TOKENIZER})')
+    schema_editor.execute(
+        f'INSERT INTO {COURSE_INDEX}(rowid, name, description) SELECT id, name, description FROM kursy_course'
+    )
+    schema_editor.execute(
+        f'INSERT INTO {LESSON_INDEX}(rowid, title, description) SELECT id, title, description FROM kursy_lesson'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {COURSE_INDEX}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {LESSON_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0007_course_enrollment_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,30 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Czas ostatniego zapisu załącznika - podstawa nagłówka ETag w API.', verbose_name='Ostatnia zmiana'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Czas ostatniego zapisu kursu - podstawa nagłówka ETag w API.', verbose_name='Ostatnia zmiana'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Czas ostatniego zapisu lekcji - podstawa nagłówka ETag w API.', verbose_name='Ostatnia zmiana'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:33
+
+from django.db import migrations, models
+
+POSITION_GAP = 1024
+
+
+def assign_positions(apps, schema_editor):
+    # Dotychczasowa kolejność (alfabetyczna) staje się kolejnością pozycji
+    Lesson = apps.get_model('kursy', 'Lesson')
+    lessons = []
+    course_id, position = None, 0
+    for lesson in Lesson.objects.order_by('course_id', 'title', 'id').only('id', 'course_id').iterator():
+        if lesson.course_id != course_id:
+            course_id, position = lesson.course_id, 0
+        position += POSITION_GAP
+        lesson.position = position
+        lessons.append(lesson)
+    Lesson.objects.bulk_update(lessons, ['position'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0009_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='lesson',
+            options={'ordering': ['position', 'id'], 'verbose_name': 'Lekcja', 'verbose_name_plural': 'Lekcje'},
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='position',
+            field=models.PositiveIntegerField(default=0, help_text='Pozycja lekcji w kursie. Kolejne lekcje mają pozycje co LESSON_POSITION_GAP, więc przeniesienie lekcji zmienia zwykle tylko jej wiersz.', verbose_name='Pozycja'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'position'], name='lesson_course_position_idx'),
+        ),
+        migrations.RunPython(assign_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+FILL_BATCH_SIZE = 1000
+
+
+def normalize_email_key(email):
+    return (email or '').strip().lower() or None
+
+
+def fill_email_keys(apps, schema_editor):
+    CustomUser = apps.get_model('kursy', 'CustomUser')
+
+    keys = {}
+    for user_id, email in CustomUser.objects.values_list('id', 'email').iterator():
+        key = normalize_email_key(email)
+        if key is not None:
+            keys.setdefault(key, []).append(user_id)
+
+    duplicates = {key: ids for key, ids in keys.items() if len(ids) > 1}
+    if duplicates:
+        listing = '\n'.join(f'  {key}: ID {", ".join(map(str, ids))}' for key, ids in sorted(duplicates.items()))
+        raise RuntimeError(
+            'Nie można dodać unikalnego klucza e-mail - adresy powtarzają się '
+            '(bez względu na wielkość liter):\n' + listing +
+            '\nPołącz lub zmień te konta i uruchom migrację ponownie.'
+        )
+
+    users = [CustomUser(id=ids[0], email_key=key) for key, ids in keys.items()]
+    CustomUser.objects.bulk_update(users, ['email_key'], batch_size=FILL_BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0010_lesson_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='email_key',
+            field=models.CharField(editable=False, help_text='Znormalizowany adres e-mail (ustawiany przy zapisie).', max_length=254, null=True, verbose_name='Klucz adresu e-mail'),
+        ),
+        migrations.RunPython(fill_email_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customuser',
+            name='email_key',
+            field=models.CharField(editable=False, help_text='Znormalizowany adres e-mail (ustawiany przy zapisie).', max_length=254, null=True, unique=True, verbose_name='Klucz adresu e-mail'),
+        ),
+    ]
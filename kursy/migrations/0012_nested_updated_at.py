@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0011_customuser_email_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseedition',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Czas ostatniego zapisu edycji - część ETagu kursów, w których jest zagnieżdżona.', verbose_name='Ostatnia zmiana'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Czas ostatniego zapisu użytkownika - część ETagu zasobów, w których jest zagnieżdżony.', verbose_name='Ostatnia zmiana'),
+        ),
+    ]
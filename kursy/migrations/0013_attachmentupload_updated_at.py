@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kursy', '0012_nested_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachmentupload',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Czas ostatniej odebranej części - porzucone sesje są usuwane po ATTACHMENT_UPLOAD_TTL.', verbose_name='Ostatnia aktywność'),
+        ),
+    ]
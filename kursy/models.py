@@ -1,5 +1,25 @@
+import hashlib
+import mimetypes
+import uuid
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .access import invalidate_course_access
+
+
+def normalize_email_key(email):
+    """
+    Klucz adresu e-mail do wyszukiwania: bez białych znaków i wielkich liter.
+    Pusty adres lub wartość niebędąca napisem (np. z nieprawidłowego
+    żądania) - None (wielu użytkowników może nie mieć adresu).
+    """
+    if not isinstance(email, str):
+        return None
+    return email.strip().lower() or None
 
 
 class CustomUser(AbstractUser):
@@ -8,12 +28,27 @@ class CustomUser(AbstractUser):
 
     Dodaje pole is_instructor do oznaczenia prowadzących kursów.
     Wymaga podania imienia i nazwiska przy rejestracji.
+    Logowanie i rejestracja wyszukują użytkownika po email_key
+    (unikalny indeks), a nie po polu email.
     """
     is_instructor = models.BooleanField(
         default=False,
         verbose_name="Prowadzący",
         help_text="Oznacza, czy użytkownik jest prowadzącym kursy."
     )
+    email_key = models.CharField(
+        max_length=254,
+        unique=True,
+        null=True,
+        editable=False,
+        verbose_name="Klucz adresu e-mail",
+        help_text="Znormalizowany adres e-mail (ustawiany przy zapisie)."
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Ostatnia zmiana",
+        help_text="Czas ostatniego zapisu użytkownika - część ETagu zasobów, w których jest zagnieżdżony."
+    )
 
     class Meta:
         verbose_name = "Użytkownik"
@@ -22,6 +57,25 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
 
+    def save(self, *args, **kwargs):
+        self.email_key = normalize_email_key(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'email' in update_fields:
+                update_fields.add('email_key')
+            # Samo last_login (logowanie) nie zmienia danych zwracanych w API
+            if update_fields - {'last_login'}:
+                update_fields.add('updated_at')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    def get_session_auth_hash(self):
+        # Użytkownik z cache (kursy.usercache) ma zamiast hasła gotowy skrót sesji
+        if 'password' not in self.__dict__ and getattr(self, '_session_auth_hash', None):
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+
 
 class CourseEdition(models.Model):
     """
@@ -35,6 +89,11 @@ class CourseEdition(models.Model):
         verbose_name="Nazwa edycji",
         help_text="Nazwa edycji kursu (np. '2025/26 Semestr 2')."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Ostatnia zmiana",
+        help_text="Czas ostatniego zapisu edycji - część ETagu kursów, w których jest zagnieżdżona."
+    )
 
     class Meta:
         verbose_name = "Edycja kursu"
@@ -45,6 +104,63 @@ class CourseEdition(models.Model):
         return self.name
 
 
+# Odstęp między pozycjami kolejnych lekcji
+LESSON_POSITION_GAP = 1024
+
+# status zapisu -> pole licznika na kursie
+ENROLLMENT_COUNTER_FIELDS = {
+    'pending': 'pending_count',
+    'approved': 'approved_count',
+    'rejected': 'rejected_count',
+}
+
+
+class CourseManager(models.Manager):
+    def adjust_enrollment_counts(self, course_id, deltas):
+        """
+        Zmienia liczniki zapisów kursu o podane przyrosty ({status: przyrost})
+        jednym zapytaniem UPDATE.
+        """
+        changes = {
+            ENROLLMENT_COUNTER_FIELDS[status_value]: F(ENROLLMENT_COUNTER_FIELDS[status_value]) + delta
+            for status_value, delta in deltas.items() if delta
+        }
+        if changes:
+            self.filter(pk=course_id).update(**changes)
+
+    def subtract_enrollments(self, enrollments):
+        """
+        Odejmuje od liczników zapisy z querysetu (przed ich usunięciem),
+        po jednym UPDATE na każdy kurs.
+        """
+        counts = (
+            enrollments.order_by().values_list('course_id', 'status')
+            .annotate(total=Count('id'))
+        )
+        deltas = {}
+        for course_id, status_value, total in counts:
+            deltas.setdefault(course_id, {})[status_value] = -total
+        for course_id, course_deltas in deltas.items():
+            self.adjust_enrollment_counts(course_id, course_deltas)
+
+    def recount_enrollments(self, courses=None):
+        """
+        Przelicza liczniki zapisów od nowa. Zwraca liczbę zaktualizowanych kursów.
+        """
+        courses = self.all() if courses is None else courses
+
+        def count(status_value):
+            totals = (
+                Enrollment.objects.filter(course=OuterRef('pk'), status=status_value)
+                .order_by().values('course').annotate(total=Count('id')).values('total')
+            )
+            return Coalesce(Subquery(totals), Value(0))
+
+        return courses.update(**{
+            field: count(status_value) for status_value, field in ENROLLMENT_COUNTER_FIELDS.items()
+        })
+
+
 class Course(models.Model):
     """
     Centralny model kursu.
@@ -81,15 +197,64 @@ class Course(models.Model):
         verbose_name="Edycja kursu",
         help_text="Edycja/semestr, do którego należy kurs."
     )
+    pending_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Oczekujące zapisy",
+        help_text="Liczba oczekujących zapisów (aktualizowana przy każdej zmianie zapisów)."
+    )
+    approved_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Zatwierdzone zapisy",
+        help_text="Liczba zatwierdzonych zapisów (aktualizowana przy każdej zmianie zapisów)."
+    )
+    rejected_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Odrzucone zapisy",
+        help_text="Liczba odrzuconych zapisów (aktualizowana przy każdej zmianie zapisów)."
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Ostatnia zmiana",
+        help_text="Czas ostatniego zapisu kursu - podstawa nagłówka ETag w API."
+    )
+
+    objects = CourseManager()
 
     class Meta:
         verbose_name = "Kurs"
         verbose_name_plural = "Kursy"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='course_name_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.edition})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Edycja zapisana w bazie - przy przeniesieniu kursu trzeba odświeżyć katalog obu edycji
+        instance._saved_edition_id = instance.__dict__.get('edition_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Zapisuje kurs bez nadpisywania liczników zapisów - te są zmieniane
+        wyłącznie przyrostowo (CourseManager.adjust_enrollment_counts),
+        a wartości w pamięci mogą być nieaktualne.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            counters = set(ENROLLMENT_COUNTER_FIELDS.values()) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in counters and field.name not in counters
+            ]
+        super().save(*args, **kwargs)
+
 
 class Lesson(models.Model):
     """
@@ -119,19 +284,138 @@ class Lesson(models.Model):
         verbose_name="Kurs",
         help_text="Kurs, do którego należy lekcja."
     )
+    position = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Pozycja",
+        help_text="Pozycja lekcji w kursie. Kolejne lekcje mają pozycje co LESSON_POSITION_GAP, "
+                  "więc przeniesienie lekcji zmienia zwykle tylko jej wiersz."
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Ostatnia zmiana",
+        help_text="Czas ostatniego zapisu lekcji - podstawa nagłówka ETag w API."
+    )
 
     class Meta:
         verbose_name = "Lekcja"
         verbose_name_plural = "Lekcje"
-        ordering = ['title']
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(fields=['course', 'position'], name='lesson_course_position_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.course})"
 
+    def save(self, *args, **kwargs):
+        # Nowa lekcja trafia na koniec kursu
+        if self._state.adding and not self.position:
+            last = Lesson.objects.filter(course_id=self.course_id).aggregate(last=Max('position'))['last']
+            self.position = (last or 0) + LESSON_POSITION_GAP
+        super().save(*args, **kwargs)
+
 def lesson_attachment_path(instance, filename):
     # Plik zostanie zapisany w MEDIA_ROOT/attachments/course_<id>/lesson_<id>/<filename>
     return f'attachments/course_{instance.lesson.course.id}/lesson_{instance.lesson.id}/{filename}'
 
+def attachment_blob_path(instance, filename):
+    # Plik zostanie zapisany w MEDIA_ROOT/attachments/blobs/<ab>/<cd>/<sha256>
+    sha = instance.sha256
+    return f'attachments/blobs/{sha[:2]}/{sha[2:4]}/{sha}'
+
+class AttachmentBlobManager(models.Manager):
+    def acquire(self, sha256, size_bytes=0, content=None):
+        """
+        Zwraca blob o danej sumie SHA-256 i zwiększa jego licznik referencji.
+
+        Jeśli blob nie istnieje, tworzy go z `content`; bez `content` zwraca None.
+        Nowo zapisany plik jest zapamiętany w `blob.new_file` - jeśli transakcja
+        zostanie wycofana, należy go usunąć przez discard_new_file().
+        """
+        new_file = None
+        with transaction.atomic():
+            blob = self.select_for_update().filter(sha256=sha256).first()
+            if blob is None:
+                if content is None:
+                    return None
+                blob, _ = self.get_or_create(sha256=sha256, defaults={'size_bytes': size_bytes})
+                blob = self.select_for_update().get(pk=blob.pk)
+            if not blob.file:
+                name = attachment_blob_path(blob, None)
+                storage = blob.file.storage
+                # Plik o tej nazwie ma z definicji tę samą treść - nie zapisujemy go ponownie
+                if not storage.exists(name):
+                    name = new_file = storage.save(name, content)
+                blob.file = name
+                blob.save(update_fields=['file'])
+            self.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        blob.new_file = new_file
+        return blob
+
+    def discard_new_file(self, blob):
+        """
+        Usuwa plik zapisany przez acquire() po wycofaniu transakcji, która
+        utworzyła blob (wywoływać poza tą transakcją). Plik zostaje, jeśli
+        w międzyczasie inny zapis utworzył blob o tej samej treści.
+        """
+        name = getattr(blob, 'new_file', None)
+        if name and not self.filter(sha256=blob.sha256).exclude(file='').exists():
+            blob.file.storage.delete(name)
+
+    def release(self, blob_id):
+        """
+        Zmniejsza licznik referencji; blob bez referencji jest usuwany razem z plikiem.
+        """
+        with transaction.atomic():
+            self.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+            orphan = self.select_for_update().filter(pk=blob_id, ref_count__lte=0).first()
+            if orphan is None:
+                return
+            storage, name = orphan.file.storage, orphan.file.name
+            orphan.delete()
+            if name:
+                transaction.on_commit(lambda: storage.delete(name))
+
+class AttachmentBlob(models.Model):
+    """
+    Model treści pliku adresowanej sumą SHA-256 (tryb deduplikacji załączników).
+
+    Ta sama treść jest przechowywana raz, niezależnie od liczby załączników,
+    które się do niej odwołują.
+    """
+    sha256 = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Suma SHA-256",
+        help_text="Skrót SHA-256 zawartości pliku (hex)."
+    )
+    file = models.FileField(
+        upload_to=attachment_blob_path,
+        max_length=255,
+        blank=True,
+        verbose_name="Plik",
+        help_text="Ścieżka do pliku na serwerze."
+    )
+    size_bytes = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Rozmiar",
+        help_text="Rozmiar pliku w bajtach."
+    )
+    ref_count = models.IntegerField(
+        default=0,
+        verbose_name="Liczba odwołań",
+        help_text="Liczba załączników korzystających z tej treści."
+    )
+
+    objects = AttachmentBlobManager()
+
+    class Meta:
+        verbose_name = "Treść załącznika"
+        verbose_name_plural = "Treści załączników"
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count})"
+
 class Attachment(models.Model):
     """
     Model załącznika do lekcji.
@@ -153,6 +437,32 @@ class Attachment(models.Model):
         verbose_name="Liczba pobrań",
         help_text="Liczba pobrań pliku."
     )
+    size_bytes = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Rozmiar",
+        help_text="Rozmiar pliku w bajtach, zapisany przy przesłaniu."
+    )
+    content_type = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Typ MIME",
+        help_text="Typ zawartości pliku."
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="Suma SHA-256",
+        help_text="Skrót SHA-256 zawartości pliku (hex)."
+    )
+    blob = models.ForeignKey(
+        AttachmentBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='attachments',
+        verbose_name="Treść",
+        help_text="Współdzielona treść pliku (tylko w trybie deduplikacji)."
+    )
     lesson = models.ForeignKey(
         Lesson,
         on_delete=models.CASCADE,
@@ -160,6 +470,11 @@ class Attachment(models.Model):
         verbose_name="Lekcja",
         help_text="Lekcja, do której należy załącznik."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Ostatnia zmiana",
+        help_text="Czas ostatniego zapisu załącznika - podstawa nagłówka ETag w API."
+    )
 
     class Meta:
         verbose_name = "Załącznik"
@@ -169,6 +484,126 @@ class Attachment(models.Model):
     def __str__(self):
         return f"{self.original_filename} ({self.lesson})"
 
+    def save(self, *args, **kwargs):
+        # Metadane liczymy tylko dla nowo przypisanego (jeszcze niezapisanego) pliku
+        if self.file and not self.file._committed:
+            self.populate_file_metadata()
+            if settings.ATTACHMENT_DEDUPLICATION:
+                try:
+                    with transaction.atomic():
+                        self.store_content(self.file.file, self.file.name)
+                        super().save(*args, **kwargs)
+                except Exception:
+                    self.discard_stored_content()
+                    raise
+                return
+        super().save(*args, **kwargs)
+
+    def store_content(self, content, filename):
+        """
+        Zapisuje treść pliku (wymaga wyliczonych sha256 i size_bytes).
+
+        W trybie deduplikacji treść trafia do współdzielonego bloba (lub jest
+        z niego ponownie użyta), w przeciwnym razie do katalogu lekcji.
+        """
+        if settings.ATTACHMENT_DEDUPLICATION:
+            self.blob = AttachmentBlob.objects.acquire(self.sha256, self.size_bytes, content)
+            self.file = self.blob.file.name
+        else:
+            self.file.save(filename, content, save=False)
+
+    def discard_stored_content(self):
+        """
+        Usuwa plik zapisany przez store_content(), gdy transakcja tworząca
+        załącznik została wycofana.
+        """
+        if self.blob_id:
+            AttachmentBlob.objects.discard_new_file(self.blob)
+        elif self.file and self.file._committed:
+            self.file.delete(save=False)
+
+    def populate_file_metadata(self):
+        """
+        Wylicza rozmiar, typ MIME i skrót SHA-256 pliku, czytając go porcjami.
+        Typ MIME wynika z (dozwolonego) rozszerzenia - nagłówek Content-Type
+        podany przez klienta jest pomijany.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        self.file.open('rb')
+        try:
+            for chunk in self.file.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+        finally:
+            self.file.seek(0)
+        self.size_bytes = size
+        self.sha256 = digest.hexdigest()
+        guessed_type, _ = mimetypes.guess_type(self.original_filename or self.file.name)
+        self.content_type = guessed_type or 'application/octet-stream'
+
+
+class AttachmentUpload(models.Model):
+    """
+    Model sesji przesyłania pliku w częściach (wznawialny upload).
+
+    Przechowuje postęp przesyłania; dane trafiają do pliku tymczasowego
+    na dysku i po finalizacji są przenoszone do nowego załącznika.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.CASCADE,
+        related_name='uploads',
+        verbose_name="Lekcja",
+        help_text="Lekcja, do której trafi załącznik."
+    )
+    uploaded_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='attachment_uploads',
+        verbose_name="Przesyłający",
+        help_text="Użytkownik przesyłający plik."
+    )
+    original_filename = models.CharField(
+        max_length=255,
+        verbose_name="Oryginalna nazwa pliku",
+        help_text="Oryginalna nazwa pliku przesłanego przez użytkownika."
+    )
+    total_size = models.PositiveBigIntegerField(
+        verbose_name="Rozmiar całkowity",
+        help_text="Deklarowany rozmiar pliku w bajtach."
+    )
+    received_bytes = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Odebrane bajty",
+        help_text="Liczba bajtów zapisanych w pliku tymczasowym."
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Utworzono"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Ostatnia aktywność",
+        help_text="Czas ostatniej odebranej części - porzucone sesje są usuwane po ATTACHMENT_UPLOAD_TTL."
+    )
+
+    class Meta:
+        verbose_name = "Przesyłanie załącznika"
+        verbose_name_plural = "Przesyłania załączników"
+
+    def __str__(self):
+        return f"{self.original_filename} ({self.received_bytes}/{self.total_size})"
+
+    @property
+    def is_complete(self):
+        return self.received_bytes == self.total_size
+
 
 class Enrollment(models.Model):
     """
@@ -213,6 +648,51 @@ class Enrollment(models.Model):
         verbose_name_plural = "Zapisy na kursy"
         unique_together = ['student', 'course']
         ordering = ['-id']
+        indexes = [
+            models.Index(fields=['course', 'status', 'id'], name='enrollment_course_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.course} ({self.get_status_display()})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status zapisany w bazie - potrzebny do korekty liczników kursu
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Zapisuje zapis i aktualizuje liczniki kursu w tej samej transakcji.
+        """
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        tracks_status = 'status' in self.__dict__ and (update_fields is None or 'status' in update_fields)
+        with transaction.atomic():
+            old_status = None
+            if not adding and tracks_status:
+                old_status = getattr(self, '_saved_status', None)
+                if old_status is None:
+                    old_status = Enrollment.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+            super().save(*args, **kwargs)
+            if adding:
+                Course.objects.adjust_enrollment_counts(self.course_id, {self.status: 1})
+            elif tracks_status and old_status != self.status:
+                Course.objects.adjust_enrollment_counts(
+                    self.course_id, {old_status: -1, self.status: 1} if old_status else {self.status: 1}
+                )
+            if (adding or tracks_status) and old_status != self.status and 'approved' in (old_status, self.status):
+                invalidate_course_access([self.student_id])
+        if tracks_status:
+            self._saved_status = self.status
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            status_value = getattr(self, '_saved_status', None) or self.status
+            result = super().delete(*args, **kwargs)
+            if result[0]:
+                Course.objects.adjust_enrollment_counts(self.course_id, {status_value: -1})
+                if status_value == 'approved':
+                    invalidate_course_access([self.student_id])
+        return result
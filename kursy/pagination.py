@@ -0,0 +1,155 @@
+"""
+Paginacja kursorowa (keyset) dla endpointów API.
+
+W odróżnieniu od paginacji LIMIT/OFFSET koszt pobrania strony nie rośnie
+wraz z numerem strony - kolejna strona zaczyna się od warunku WHERE
+na wartościach ostatniego zwróconego wiersza.
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginacja kursorowa po stabilnym porządku pól.
+
+    `ordering` musi jednoznacznie wyznaczać kolejność wierszy, dlatego
+    ostatnim polem powinien być klucz główny. Pola z prefiksem '-'
+    są sortowane malejąco.
+    """
+    ordering = ('id',)
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Nieprawidłowy kursor.'
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset.model)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.build_seek_filter(position))
+
+        # Pobieramy o jeden wiersz więcej, aby wiedzieć czy istnieje kolejna strona
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = self.get_position(results[-1]) if self.has_next else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.encode_cursor(self.next_position) if self.has_next else None,
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_position(self, obj):
+        return [self._get_attr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def build_seek_filter(self, position):
+        """
+        Buduje warunek "wiersz leży za pozycją" dla porządku leksykograficznego:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {f.lstrip('-'): value for f, value in zip(self.ordering[:index], position)}
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': position[index]}))
+        return reduce(lambda left, right: left | right, conditions)
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """
+        Pozycja z parametru kursora, z wartościami przekształconymi przez
+        to_python() pól porządku. Kursor jest w rękach klienta - każda
+        niepoprawna wartość daje 404, a nie błąd zapytania.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                self._to_python(model, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _to_python(model, name, value):
+        if value is None or isinstance(value, (dict, list)):
+            raise ValueError(value)
+        *relations, attname = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(attname).to_python(value)
+
+    @staticmethod
+    def _get_attr(obj, name):
+        if isinstance(obj, dict):
+            return obj[name]
+        for part in name.split('__'):
+            obj = getattr(obj, part)
+        return obj
+
+
+class CourseCursorPagination(KeysetPagination):
+    """
+    Paginacja listy kursów po (name, id).
+    """
+    ordering = ('name', 'id')
+
+
+class EnrollmentCursorPagination(KeysetPagination):
+    """
+    Paginacja listy zapisów - najnowsze zapisy najpierw (jak Enrollment.Meta.ordering).
+    """
+    ordering = ('-id',)
+    page_size = 100
+    max_page_size = 500
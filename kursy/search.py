@@ -0,0 +1,158 @@
+"""
+Wyszukiwanie pełnotekstowe kursów i lekcji (SQLite FTS5).
+
+Każdy model ma własną tabelę FTS5, w której rowid jest równy ID obiektu,
+więc aktualizacja i usunięcie wpisu to operacje po kluczu. Tabele
+zawierają tylko tekst - widoczność (is_visible, is_published, zapisy)
+jest sprawdzana przy wyszukiwaniu przez złączenie z tabelami kursów
+i lekcji, dzięki czemu zmiana widoczności nie wymaga reindeksacji.
+"""
+import re
+
+from django.db import connection
+
+COURSE_INDEX = 'kursy_course_fts'
+LESSON_INDEX = 'kursy_lesson_fts'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def create_index_sql():
+    tokenizer = "tokenize='unicode61 remove_diacritics 2'"
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {COURSE_INDEX} USING fts5(name, description, {tokenizer})',
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {LESSON_INDEX} USING fts5(title, description, {tokenizer})',
+    ]
+
+
+def index_course(course):
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {COURSE_INDEX}(rowid, name, description) VALUES (%s, %s, %s)',
+                [course.pk, course.name, course.description]
+            )
+
+
+def unindex_course(course_id):
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {COURSE_INDEX} WHERE rowid = %s', [course_id])
+
+
+def index_lesson(lesson):
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {LESSON_INDEX}(rowid, title, description) VALUES (%s, %s, %s)',
+                [lesson.pk, lesson.title, lesson.description]
+            )
+
+
+def index_lessons(lessons):
+    """
+    Indeksuje wiele lekcji jednym wywołaniem (bulk_create/bulk_update nie wysyłają sygnałów).
+    """
+    if is_available() and lessons:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {LESSON_INDEX}(rowid, title, description) VALUES (%s, %s, %s)',
+                [[lesson.pk, lesson.title, lesson.description] for lesson in lessons]
+            )
+
+
+def unindex_lesson(lesson_id):
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {LESSON_INDEX} WHERE rowid = %s', [lesson_id])
+
+
+def rebuild_index():
+    """
+    Odbudowuje oba indeksy z tabel kursów i lekcji. Zwraca (kursy, lekcje).
+    """
+    with connection.cursor() as cursor:
+        for sql in create_index_sql():
+            cursor.execute(sql)
+        cursor.execute(f'DELETE FROM {COURSE_INDEX}')
+        cursor.execute(
+            f'INSERT INTO {COURSE_INDEX}(rowid, name, description) SELECT id, name, description FROM kursy_course'
+        )
+        courses = cursor.rowcount
+        cursor.execute(f'DELETE FROM {LESSON_INDEX}')
+        cursor.execute(
+            f'INSERT INTO {LESSON_INDEX}(rowid, title, description) SELECT id, title, description FROM kursy_lesson'
+        )
+        lessons = cursor.rowcount
+    return courses, lessons
+
+
+def build_match_query(text):
+    """
+    Zamienia tekst użytkownika na zapytanie FTS5: każde słowo jako fraza
+    w cudzysłowie z dopasowaniem prefiksu, połączone operatorem AND.
+    Składnia FTS5 z tekstu użytkownika nie jest interpretowana.
+    """
+    terms = TOKEN_RE.findall(text or '')[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search(user, text, offset=0, limit=20, course_ids_with_access=()):
+    """
+    Zwraca listę wyników posortowaną wg trafności (bm25, mniejszy = lepszy).
+
+    Kursy: widoczne lub prowadzone przez użytkownika. Lekcje: z kursów
+    prowadzonych przez użytkownika albo opublikowane w widocznych kursach,
+    na które ma zatwierdzony zapis (`course_ids_with_access`).
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    params = [match, user.pk]
+    lesson_access = 'c.instructor_id = %s'
+    lesson_params = [match, user.pk]
+    course_ids = list(course_ids_with_access)
+    if course_ids:
+        placeholders = ', '.join(['%s'] * len(course_ids))
+        lesson_access += f' OR (c.is_visible AND l.is_published AND c.id IN ({placeholders}))'
+        lesson_params += course_ids
+
+    sql = f'''
+        SELECT 'course' AS type, c.id, c.name, c.id, c.name,
+               snippet({COURSE_INDEX}, 1, '[', ']', '…', 12),
+               bm25({COURSE_INDEX}, 10.0, 1.0) AS score
+        FROM {COURSE_INDEX}
+        JOIN kursy_course c ON c.id = {COURSE_INDEX}.rowid
+        WHERE {COURSE_INDEX} MATCH %s AND (c.is_visible OR c.instructor_id = %s)
+        UNION ALL
+        SELECT 'lesson' AS type, l.id, l.title, c.id, c.name,
+               snippet({LESSON_INDEX}, 1, '[', ']', '…', 12),
+               bm25({LESSON_INDEX}, 10.0, 1.0) AS score
+        FROM {LESSON_INDEX}
+        JOIN kursy_lesson l ON l.id = {LESSON_INDEX}.rowid
+        JOIN kursy_course c ON c.id = l.course_id
+        WHERE {LESSON_INDEX} MATCH %s AND ({lesson_access})
+        ORDER BY score, type, 2
+        LIMIT %s OFFSET %s
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + lesson_params + [limit, offset])
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'type': row[0],
+            'id': row[1],
+            'title': row[2],
+            'course_id': row[3],
+            'course_name': row[4],
+            'snippet': row[5],
+            'score': round(-row[6], 4),
+        }
+        for row in rows
+    ]
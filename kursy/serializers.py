@@ -1,13 +1,125 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import CustomUser, Course, CourseEdition, Enrollment, Lesson, Attachment
+from django.urls import reverse
+from .models import CustomUser, Course, CourseEdition, Enrollment, Lesson, Attachment, normalize_email_key
 
 
-class UserSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer z projekcją pól i rozwijaniem relacji na żądanie.
+
+    Argument `fields` ogranicza zwracane pola (bez niego: `default_fields`
+    lub wszystkie z Meta.fields). Relacje z `expandable_fields` są zwracane
+    jako ID, a jako zagnieżdżony obiekt tylko wtedy, gdy są w `expand`
+    (bez argumentu `expand` rozwijane są relacje z `default_expand`).
+    """
+    default_fields = None
+    default_expand = ()
+    # Relacje rozwijane na żądanie: pole -> klasa serializera
+    expandable_fields = {}
+    # Kolumny pól, których nie da się wywnioskować z `source` (np. SerializerMethodField)
+    field_columns = {}
+    # Kolumny pobierane zawsze (np. potrzebne do sprawdzenia uprawnień)
+    required_columns = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.default_expand if expand is None else expand
+        for name, serializer_class in self.expandable_fields.items():
+            if name in expand:
+                self.fields[name] = serializer_class(read_only=True, expand=())
+            else:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        allowed = fields if fields is not None else self.default_fields
+        if allowed is not None:
+            for name in set(self.fields) - set(allowed):
+                self.fields.pop(name)
+
+    @classmethod
+    def parse_fields(cls, raw):
+        """
+        Parsuje parametr `?fields=a,b`. Zwraca (pola, nieznane_pola).
+        """
+        if not raw:
+            return None, []
+        requested = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in requested if name not in cls.Meta.fields]
+        return requested, unknown
+
+    @classmethod
+    def parse_expand(cls, raw):
+        """
+        Parsuje parametr `?expand=a,b`. Brak parametru - None (domyślne
+        rozwinięcia), pusty parametr - żadnych. Zwraca (relacje, nieznane).
+        """
+        if raw is None:
+            return None, []
+        requested = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in requested if name not in cls.expandable_fields]
+        return requested, unknown
+
+    @classmethod
+    def get_columns(cls, fields=None, expand=None):
+        """
+        Kolumny potrzebne do wyrenderowania żądanych pól (ścieżki dla only()),
+        albo None, gdy którejś nie da się ustalić.
+        """
+        columns = {cls.Meta.model._meta.pk.name, *cls.required_columns}
+        for name, field in cls(fields=fields, expand=expand).fields.items():
+            if field.write_only:
+                continue
+            if name in cls.field_columns:
+                columns.update(cls.field_columns[name])
+            elif isinstance(field, DynamicFieldsModelSerializer):
+                nested = type(field).get_columns(expand=())
+                if nested is None:
+                    return None
+                columns.update(f'{field.source}__{column}' for column in nested)
+            elif field.source == '*':
+                return None
+            else:
+                columns.add(field.source.replace('.', '__'))
+        return columns
+
+    @classmethod
+    def representation(cls, fields=None, expand=None):
+        """
+        Znormalizowana projekcja: (zwracane pola, rozwinięte relacje) jako
+        posortowane krotki - takie same dla równoważnych ?fields= i ?expand=.
+        """
+        serializer_fields = cls(fields=fields, expand=expand).fields
+        names = tuple(sorted(name for name, field in serializer_fields.items() if not field.write_only))
+        expanded = tuple(
+            name for name in names if isinstance(serializer_fields[name], DynamicFieldsModelSerializer)
+        )
+        return names, expanded
+
+    @classmethod
+    def optimize_queryset(cls, queryset, fields=None, expand=None, extra=()):
+        """
+        Dopasowuje zapytanie do żądanych pól: relacje dołączane JOIN-em
+        tylko wtedy, gdy są potrzebne, pozostałe kolumny odroczone.
+        `extra` to dodatkowe kolumny (np. pola sortowania paginacji).
+        """
+        columns = cls.get_columns(fields, expand)
+        if columns is None:
+            return queryset
+        columns.update(extra)
+        related = {column.rsplit('__', 1)[0] for column in columns if '__' in column}
+        if related:
+            queryset = queryset.select_related(*related)
+            columns.update(related)
+        return queryset.only(*columns)
+
+
+class UserSerializer(DynamicFieldsModelSerializer):
     """
     Serializer dla modelu CustomUser.
     Zwraca podstawowe informacje o użytkowniku.
     """
+    # Potrzebne do ETagu zasobów, w których użytkownik jest zagnieżdżony
+    required_columns = ('updated_at',)
+
     class Meta:
         model = CustomUser
         fields = ['id', 'email', 'first_name', 'last_name', 'is_instructor']
@@ -80,7 +192,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         """
         Sprawdza czy email jest unikalny.
         """
-        if CustomUser.objects.filter(email=value).exists():
+        if CustomUser.objects.filter(email_key=normalize_email_key(value)).exists():
             raise serializers.ValidationError('Ten adres e-mail jest już zarejestrowany.')
         return value
 
@@ -98,24 +210,30 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class CourseEditionSerializer(serializers.ModelSerializer):
+class CourseEditionSerializer(DynamicFieldsModelSerializer):
     """
     Serializer dla edycji kursu.
     """
+    required_columns = ('updated_at',)
+
     class Meta:
         model = CourseEdition
         fields = ['id', 'name']
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsModelSerializer):
     """
     Serializer dla modelu Course.
+
+    Edycja i instruktor są domyślnie zagnieżdżone; `expand=` (puste)
+    zwraca je jako ID bez dodatkowych JOIN-ów.
     """
-    edition = CourseEditionSerializer(read_only=True)
     edition_id = serializers.PrimaryKeyRelatedField(
         queryset=CourseEdition.objects.all(), source='edition', write_only=True
     )
-    instructor = UserSerializer(read_only=True)
+
+    expandable_fields = {'edition': CourseEditionSerializer, 'instructor': UserSerializer}
+    default_expand = ('edition', 'instructor')
 
     class Meta:
         model = Course
@@ -130,10 +248,13 @@ class CourseSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(DynamicFieldsModelSerializer):
     """
-    Serializer dla modelu Lesson.
+    Serializer dla modelu Lesson. Kurs jest zwracany jako ID, `expand=course`
+    zagnieżdża go (jednym JOIN-em).
     """
+    expandable_fields = {'course': CourseSerializer}
+
     class Meta:
         model = Lesson
         fields = ['id', 'title', 'description', 'is_published', 'course']
@@ -146,34 +267,46 @@ class LessonSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class AttachmentSerializer(serializers.ModelSerializer):
+class AttachmentSerializer(DynamicFieldsModelSerializer):
     """
     Serializer dla modelu Attachment.
     """
     file_url = serializers.SerializerMethodField()
-    size = serializers.SerializerMethodField()
+    # Rozmiar zapisany w bazie przy przesłaniu - bez odpytywania systemu plików
+    size = serializers.IntegerField(source='size_bytes', read_only=True)
+
+    field_columns = {'file_url': ['lesson']}
 
     class Meta:
         model = Attachment
-        fields = ['id', 'original_filename', 'file', 'file_url', 'download_count', 'size']
+        fields = ['id', 'original_filename', 'file', 'file_url', 'download_count', 'size',
+                  'content_type', 'sha256']
+        read_only_fields = ['content_type', 'sha256']
         extra_kwargs = {'file': {'write_only': True}}
 
     def get_file_url(self, obj):
-        return obj.file.url
-
-    def get_size(self, obj):
-        try:
-            return obj.file.size
-        except:
-            return 0
+        # Plik tylko przez endpoint pobierania (uprawnienia, Range, licznik) - nie z /media/
+        return reverse('api_attachment_download', args=[obj.lesson.course_id, obj.lesson_id, obj.pk])
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(DynamicFieldsModelSerializer):
     """
     Serializer dla zapisów na kurs.
+
+    Pola `name` i `email` to płaska projekcja danych studenta dla list,
+    które nie potrzebują pełnego obiektu `student`.
     """
     student = UserSerializer(read_only=True)
-    
+    name = serializers.SerializerMethodField()
+    email = serializers.EmailField(source='student.email', read_only=True)
+
+    default_fields = ['id', 'status', 'student']
+    field_columns = {'name': ['student__first_name', 'student__last_name']}
+    required_columns = ('course',)
+
     class Meta:
         model = Enrollment
-        fields = ['id', 'status', 'student']
+        fields = ['id', 'status', 'student', 'name', 'email']
+
+    def get_name(self, obj):
+        return f"{obj.student.first_name} {obj.student.last_name}".strip()
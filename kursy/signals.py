@@ -0,0 +1,85 @@
+"""
+Sygnały aplikacji kursy.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .access import invalidate_course_access
+from .catalog import invalidate_catalog
+from .models import Attachment, AttachmentBlob, Course, CourseEdition, CustomUser, Enrollment, Lesson
+from .search import index_course, index_lesson, unindex_course, unindex_lesson
+from .usercache import invalidate_users
+
+
+@receiver(post_delete, sender=Attachment)
+def release_attachment_blob(sender, instance, **kwargs):
+    """
+    Zwalnia referencję do współdzielonej treści usuniętego załącznika.
+    """
+    if instance.blob_id:
+        AttachmentBlob.objects.release(instance.blob_id)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def subtract_student_enrollments(sender, instance, **kwargs):
+    """
+    Koryguje liczniki kursów przed kaskadowym usunięciem zapisów studenta.
+    """
+    Course.objects.subtract_enrollments(Enrollment.objects.filter(student=instance))
+    invalidate_course_access([instance.pk])
+
+
+@receiver(post_save, sender=CustomUser)
+def reset_new_user_access(sender, instance, created, **kwargs):
+    """
+    Nowy użytkownik nie może odziedziczyć wpisu w cache po usuniętym koncie
+    o tym samym ID.
+    """
+    if created:
+        invalidate_course_access([instance.pk])
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Każdy zapis użytkownika (w tym zmiana hasła) unieważnia wpis w cache
+    uwierzytelniania.
+    """
+    invalidate_users([instance.pk])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_catalog(sender, instance, **kwargs):
+    """
+    Odświeża strony katalogu edycji kursu (również poprzedniej, jeśli kurs ją zmienił).
+    """
+    invalidate_catalog({instance.edition_id, getattr(instance, '_saved_edition_id', None)} - {None})
+    instance._saved_edition_id = instance.edition_id
+
+
+@receiver(post_save, sender=CourseEdition)
+@receiver(post_delete, sender=CourseEdition)
+def invalidate_edition_catalog(sender, instance, **kwargs):
+    invalidate_catalog({instance.pk})
+
+
+@receiver(post_save, sender=Course)
+def index_saved_course(sender, instance, **kwargs):
+    index_course(instance)
+
+
+@receiver(post_delete, sender=Course)
+def unindex_deleted_course(sender, instance, **kwargs):
+    unindex_course(instance.pk)
+
+
+@receiver(post_save, sender=Lesson)
+def index_saved_lesson(sender, instance, **kwargs):
+    index_lesson(instance)
+
+
+@receiver(post_delete, sender=Lesson)
+def unindex_deleted_lesson(sender, instance, **kwargs):
+    unindex_lesson(instance.pk)
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+from django.test import TestCase, AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_login_failed
+from kursy.async_auth import auth_slot
+
+User = get_user_model()
+
+class AsyncAuthTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='jan@example.com', email='jan@example.com', password='password123', is_instructor=True
+        )
+        self.client = AsyncClient()
+        self.login_url = reverse('api_login')
+        self.register_url = reverse('api_register')
+
+    async def test_login_hashes_off_event_loop(self):
+        threads = []
+        original = User.check_password
+
+        def check_password(user, raw_password):
+            threads.append(threading.current_thread().name)
+            return original(user, raw_password)
+
+        with patch.object(User, 'check_password', check_password):
+            response = await self.client.post(
+                self.login_url, {'email': 'jan@example.com', 'password': 'password123'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user'], {'email': 'jan@example.com', 'is_instructor': True})
+        self.assertTrue(threads[0].startswith('kursy-hash'))
+
+        # Sesja jest ustawiona - kolejne żądania są uwierzytelnione
+        response = await self.client.get(reverse('api_course_list_create'))
+        self.assertEqual(response.status_code, 200)
+
+    async def test_login_rejects_bad_credentials(self):
+        for email, password in [('jan@example.com', 'zle-haslo'), ('nikt@example.com', 'password123')]:
+            response = await self.client.post(
+                self.login_url, {'email': email, 'password': password}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 401)
+
+    async def test_register_creates_user(self):
+        response = await self.client.post(self.register_url, {
+            'email': 'Nowy@Example.com', 'password': 'password123', 'first_name': 'Nowy', 'last_name': 'Student'
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        user = await User.objects.aget(pk=response.json()['id'])
+        self.assertEqual(user.email_key, 'nowy@example.com')
+        self.assertTrue(user.check_password('password123'))
+
+    @override_settings(AUTH_ASYNC={'MAX_CONCURRENT': 1, 'QUEUE_TIMEOUT': 0.05})
+    async def test_login_storm_is_queued_then_rejected(self):
+        # Jedyne miejsce zajęte przez inne żądanie - kolejne czeka, a potem dostaje 503
+        async with auth_slot():
+            response = await self.client.post(
+                self.login_url, {'email': 'jan@example.com', 'password': 'password123'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+        response = await self.client.post(
+            self.login_url, {'email': 'jan@example.com', 'password': 'password123'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    async def test_failed_login_sends_signal(self):
+        calls = []
+
+        def handler(sender, credentials, request, **kwargs):
+            calls.append(credentials)
+
+        user_login_failed.connect(handler)
+        try:
+            response = await self.client.post(
+                self.login_url, {'email': 'jan@example.com', 'password': 'zle-haslo'}, content_type='application/json'
+            )
+        finally:
+            user_login_failed.disconnect(handler)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0]['username'], 'jan@example.com')
+
+    async def test_login_falls_back_to_username_backend(self):
+        await User.objects.acreate_user(
+            username='stary-login', email='stary@example.com', password='password123'
+        )
+        threads = []
+        original = User.check_password
+
+        def check_password(user, raw_password):
+            threads.append(threading.current_thread().name)
+            return original(user, raw_password)
+
+        with patch.object(User, 'check_password', check_password):
+            response = await self.client.post(
+                self.login_url, {'email': 'stary-login', 'password': 'password123'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], 'stary@example.com')
+        self.assertTrue(all(name.startswith('kursy-hash') for name in threads))
+
+    @override_settings(AUTH_ASYNC={'MAX_CONCURRENT': 1, 'QUEUE_TIMEOUT': 0.05})
+    def test_limit_is_shared_between_event_loops(self):
+        # Pod WSGI każde żądanie ma własną pętlę zdarzeń - limit i tak obowiązuje
+        acquired = threading.Event()
+        release = threading.Event()
+
+        async def hold_slot():
+            async with auth_slot():
+                acquired.set()
+                await asyncio.to_thread(release.wait, 5)
+
+        holder = threading.Thread(target=asyncio.run, args=(hold_slot(),))
+        holder.start()
+        try:
+            self.assertTrue(acquired.wait(5))
+            response = Client().post(
+                self.login_url, {'email': 'jan@example.com', 'password': 'password123'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 503)
+        finally:
+            release.set()
+            holder.join()
+
+        response = Client().post(
+            self.login_url, {'email': 'jan@example.com', 'password': 'password123'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
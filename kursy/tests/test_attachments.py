@@ -0,0 +1,589 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+from io import BytesIO, StringIO
+
+from django.core.cache import caches
+from django.core.management.base import CommandError
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Lesson, Attachment, AttachmentBlob, AttachmentUpload, Enrollment
+from kursy.counters import CacheCounterStore, get_download_counter
+from kursy.uploads import UploadError, append_chunk, upload_temp_path
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AttachmentTestCase(TestCase):
+    """
+    Wspólne dane dla testów załączników (pliki trafiają do katalogu tymczasowego).
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        get_download_counter.cache_clear()
+        # Przyrosty niezapisane w teście nie mogą przejść do kolejnych testów
+        self.addCleanup(lambda: get_download_counter().store.drain())
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        self.lesson = Lesson.objects.create(
+            title='Lekcja', course=self.course, is_published=True
+        )
+        self.list_create_url = reverse('api_attachment_list_create', kwargs={
+            'course_id': self.course.id, 'lesson_id': self.lesson.id
+        })
+        self.client = Client()
+
+
+class AttachmentMetadataTests(AttachmentTestCase):
+    def test_metadata_stored_on_upload(self):
+        self.client.force_login(self.instructor)
+        content = b'%PDF-1.4 test'
+        file = SimpleUploadedFile('notes.pdf', content, content_type='application/pdf')
+
+        response = self.client.post(self.list_create_url, {'file': file})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        attachment = Attachment.objects.get()
+        self.assertEqual(attachment.size_bytes, len(content))
+        self.assertEqual(attachment.content_type, 'application/pdf')
+        self.assertEqual(attachment.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(response.json()['size'], len(content))
+
+    def test_content_type_ignores_client_header(self):
+        self.client.force_login(self.instructor)
+        file = SimpleUploadedFile('notes.txt', b'<script>alert(1)</script>', content_type='text/html')
+        response = self.client.post(self.list_create_url, {'file': file})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Attachment.objects.get().content_type, 'text/plain')
+
+    def test_listing_does_not_touch_storage(self):
+        """Lista załączników korzysta wyłącznie z danych w bazie."""
+        Attachment.objects.create(
+            lesson=self.lesson, original_filename='missing.txt', file='path/to/missing', size_bytes=123
+        )
+        self.client.force_login(self.instructor)
+        response = self.client.get(self.list_create_url)
+        self.assertEqual(response.json()[0]['size'], 123)
+
+    def test_backfill_command(self):
+        attachment = Attachment.objects.create(
+            lesson=self.lesson, original_filename='a.txt',
+            file=SimpleUploadedFile('a.txt', b'abc')
+        )
+        Attachment.objects.filter(pk=attachment.pk).update(size_bytes=0, sha256='', content_type='')
+        Attachment.objects.create(lesson=self.lesson, original_filename='b.txt', file='path/to/missing')
+
+        out = StringIO()
+        call_command('backfill_attachment_metadata', stdout=out)
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.size_bytes, 3)
+        self.assertEqual(attachment.sha256, hashlib.sha256(b'abc').hexdigest())
+        self.assertEqual(attachment.content_type, 'text/plain')
+        self.assertIn('brakujące pliki: 1', out.getvalue())
+
+
+class AttachmentDownloadTests(AttachmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = User.objects.create_user(username='student', password='password')
+        self.outsider = User.objects.create_user(username='outsider', password='password')
+        Enrollment.objects.create(student=self.student, course=self.course, status='approved')
+
+        self.content = b'0123456789' * 10
+        self.attachment = Attachment.objects.create(
+            lesson=self.lesson, original_filename='wyklad.pdf',
+            file=SimpleUploadedFile('wyklad.pdf', self.content, content_type='application/pdf')
+        )
+        self.url = reverse('api_attachment_download', kwargs={
+            'course_id': self.course.id, 'lesson_id': self.lesson.id, 'pk': self.attachment.id
+        })
+
+    def downloads_counted(self):
+        get_download_counter().flush()
+        self.attachment.refresh_from_db()
+        return self.attachment.download_count
+
+    def test_enrolled_student_downloads(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['ETag'], f'"{self.attachment.sha256}"')
+        self.assertIn('wyklad.pdf', response['Content-Disposition'])
+
+        get_download_counter().flush()
+        self.attachment.refresh_from_db()
+        self.assertEqual(self.attachment.download_count, 1)
+
+    def test_download_ignores_accept_header(self):
+        self.client.force_login(self.student)
+        for accept in ('application/pdf', 'application/octet-stream', 'text/html'):
+            response = self.client.get(self.url, HTTP_ACCEPT=accept)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, accept)
+            self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        # Błędy nadal jako JSON
+        self.client.force_login(self.outsider)
+        response = self.client.get(self.url, HTTP_ACCEPT='application/pdf')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json(), {'detail': 'Brak dostępu.'})
+
+    def test_not_enrolled_forbidden(self):
+        self.client.force_login(self.outsider)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unpublished_lesson_forbidden_for_student(self):
+        Lesson.objects.filter(pk=self.lesson.pk).update(is_published=False)
+        self.client.force_login(self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_range_request(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+        # Środkowa część pliku nie jest liczona jako nowe pobranie
+        self.assertEqual(self.downloads_counted(), 0)
+
+    def test_only_requests_reaching_last_byte_are_counted(self):
+        self.client.force_login(self.student)
+        # Sonda odtwarzacza i HEAD nie są pobraniami
+        self.client.get(self.url, HTTP_RANGE='bytes=0-0')
+        self.client.head(self.url)
+        self.assertEqual(self.downloads_counted(), 0)
+
+        # Wznowione pobieranie kończy się na ostatnim bajcie - liczone raz
+        self.client.get(self.url, HTTP_RANGE='bytes=0-49')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=50-')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(self.downloads_counted(), 1)
+
+    def test_suffix_and_unsatisfiable_range(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=500-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_range_of_empty_file_not_satisfiable(self):
+        attachment = Attachment.objects.create(
+            lesson=self.lesson, original_filename='pusty.txt', file=SimpleUploadedFile('pusty.txt', b'')
+        )
+        url = reverse('api_attachment_download', args=[self.course.id, self.lesson.id, attachment.id])
+        self.client.force_login(self.student)
+        for header in ('bytes=-5', 'bytes=0-'):
+            response = self.client.get(url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.assertEqual(response['Content-Range'], 'bytes */0')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_file_url_points_to_download_endpoint(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.list_create_url)
+        self.assertEqual(response.json()[0]['file_url'], self.url)
+
+    def test_if_range_mismatch_sends_full_file(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stary"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_none_match(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{self.attachment.sha256}"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(ATTACHMENT_DOWNLOAD_OFFLOAD='x-accel-redirect', ATTACHMENT_ACCEL_REDIRECT_PREFIX='/protected/')
+    def test_accel_redirect_offload(self):
+        self.client.force_login(self.instructor)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + self.attachment.file.name)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.downloads_counted(), 1)
+
+        # Zakresy obsługuje proxy - liczone według tych samych reguł
+        self.client.get(self.url, HTTP_RANGE='bytes=0-0')
+        self.client.head(self.url)
+        self.assertEqual(self.downloads_counted(), 1)
+
+
+class DownloadCounterTests(AttachmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = Attachment.objects.create(lesson=self.lesson, original_filename='a.txt', file='a')
+        self.second = Attachment.objects.create(lesson=self.lesson, original_filename='b.txt', file='b')
+
+    def assertCounts(self, first, second):
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.download_count, self.second.download_count), (first, second))
+
+    @override_settings(DOWNLOAD_COUNTER={'STORE': 'memory', 'FLUSH_INTERVAL': 3600, 'MAX_PENDING': 1000,
+                                         'BACKGROUND_FLUSH': False})
+    def test_increments_are_buffered_until_flush(self):
+        counter = get_download_counter()
+        for _ in range(3):
+            counter.increment(self.first.pk)
+        counter.increment(self.second.pk)
+        self.assertCounts(0, 0)
+
+        # Dwie różne wartości przyrostu - dwa zapytania UPDATE
+        with self.assertNumQueries(2):
+            self.assertEqual(counter.flush(), 4)
+        self.assertCounts(3, 1)
+
+    @override_settings(DOWNLOAD_COUNTER={'STORE': 'memory', 'FLUSH_INTERVAL': 3600, 'MAX_PENDING': 2,
+                                         'BACKGROUND_FLUSH': False})
+    def test_flush_after_max_pending(self):
+        counter = get_download_counter()
+        counter.increment(self.first.pk)
+        self.assertCounts(0, 0)
+        counter.increment(self.first.pk)
+        self.assertCounts(2, 0)
+
+    @override_settings(DOWNLOAD_COUNTER={'STORE': 'cache', 'CACHE_ALIAS': 'default', 'FLUSH_INTERVAL': 3600,
+                                         'MAX_PENDING': 1000, 'BACKGROUND_FLUSH': False})
+    def test_cache_store_and_flush_command(self):
+        counter = get_download_counter()
+        counter.increment(self.first.pk)
+        counter.increment(self.second.pk, amount=2)
+
+        out = StringIO()
+        call_command('flush_download_counters', stdout=out)
+        self.assertIn('Zapisano pobrań: 3', out.getvalue())
+        self.assertCounts(1, 2)
+
+        # Po opróżnieniu kolejne przyrosty są ponownie rejestrowane
+        counter.increment(self.first.pk)
+        self.assertEqual(counter.flush(), 1)
+        self.assertCounts(2, 2)
+
+    @override_settings(DOWNLOAD_COUNTER={'STORE': 'memory', 'BACKGROUND_FLUSH': False})
+    def test_flush_command_refuses_process_memory_store(self):
+        get_download_counter().increment(self.first.pk)
+        with self.assertRaises(CommandError):
+            call_command('flush_download_counters', stdout=StringIO())
+
+    def test_cache_lock_released_only_by_owner(self):
+        store = CacheCounterStore()
+        store.lock_timeout = 0.05
+        lock_key = f'{store.key_prefix}:lock'
+        caches['default'].set(lock_key, 'inny-proces', timeout=60)
+        try:
+            # Blokada zajęta - po czasie oczekiwania nie usuwamy cudzej blokady
+            with self.assertLogs('kursy.counters', 'WARNING'):
+                with store._locked():
+                    pass
+            self.assertEqual(caches['default'].get(lock_key), 'inny-proces')
+        finally:
+            caches['default'].delete(lock_key)
+
+        with store._locked():
+            self.assertIsNotNone(caches['default'].get(lock_key))
+        self.assertIsNone(caches['default'].get(lock_key))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BackgroundFlushTests(TransactionTestCase):
+    # Wątek zapisujący używa własnego połączenia - dane muszą być zatwierdzone
+    def setUp(self):
+        instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        course = Course.objects.create(
+            name='Kurs', instructor=instructor, edition=CourseEdition.objects.create(name='Edycja 1'), is_visible=True
+        )
+        lesson = Lesson.objects.create(title='Lekcja', course=course, is_published=True)
+        self.attachment = Attachment.objects.create(lesson=lesson, original_filename='a.txt', file='a')
+
+    def wait_for_count(self, expected):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            self.attachment.refresh_from_db()
+            if self.attachment.download_count == expected:
+                return
+            time.sleep(0.02)
+        self.fail(f'Licznik {self.attachment.download_count}, oczekiwano {expected}')
+
+    @override_settings(DOWNLOAD_COUNTER={'STORE': 'memory', 'FLUSH_INTERVAL': 3600, 'MAX_PENDING': 2})
+    def test_max_pending_wakes_background_flush(self):
+        counter = get_download_counter()
+        self.addCleanup(counter.stop)
+        with self.assertNumQueries(0):
+            # Pobranie nie wykonuje UPDATE - zapis w wątku w tle
+            counter.increment(self.attachment.pk)
+            counter.increment(self.attachment.pk)
+        self.wait_for_count(2)
+
+    @override_settings(DOWNLOAD_COUNTER={'STORE': 'memory', 'FLUSH_INTERVAL': 0.05, 'MAX_PENDING': 1000})
+    def test_interval_flush_without_further_downloads(self):
+        counter = get_download_counter()
+        self.addCleanup(counter.stop)
+        counter.increment(self.attachment.pk)
+        self.wait_for_count(1)
+
+
+@override_settings(ATTACHMENT_UPLOAD_TEMP_DIR=MEDIA_ROOT + '/tmp', ATTACHMENT_CHUNK_MAX_SIZE=1024)
+class ChunkedUploadTests(AttachmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.instructor)
+        self.create_url = reverse('api_chunked_upload_create', kwargs={
+            'course_id': self.course.id, 'lesson_id': self.lesson.id
+        })
+        self.content = bytes(range(256)) * 10
+
+    def start(self, filename='wyklad.pdf', size=None):
+        response = self.client.post(
+            self.create_url,
+            {'filename': filename, 'size': len(self.content) if size is None else size},
+            content_type='application/json'
+        )
+        return response
+
+    def detail_url(self, upload_id, suffix=''):
+        name = 'api_chunked_upload_complete' if suffix == 'complete' else 'api_chunked_upload_detail'
+        return reverse(name, kwargs={
+            'course_id': self.course.id, 'lesson_id': self.lesson.id, 'upload_id': upload_id
+        })
+
+    def put_chunk(self, upload_id, start, end):
+        return self.client.put(
+            self.detail_url(upload_id), self.content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}'
+        )
+
+    def test_full_upload(self):
+        upload_id = self.start().json()['upload_id']
+        size = len(self.content)
+        for start in range(0, size, 1000):
+            response = self.put_chunk(upload_id, start, min(start + 999, size - 1))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['offset'], size)
+
+        response = self.client.post(
+            self.detail_url(upload_id, 'complete'),
+            {'sha256': hashlib.sha256(self.content).hexdigest()},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        attachment = Attachment.objects.get()
+        self.assertEqual(attachment.size_bytes, size)
+        self.assertEqual(attachment.sha256, hashlib.sha256(self.content).hexdigest())
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertFalse(AttachmentUpload.objects.exists())
+
+    def test_resume_after_wrong_offset(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0, 999)
+
+        # Klient "zapomniał" postęp - serwer odsyła aktualny offset
+        response = self.put_chunk(upload_id, 0, 999)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()['offset'], 1000)
+
+        self.assertEqual(self.client.get(self.detail_url(upload_id)).json()['offset'], 1000)
+
+    def test_parallel_chunk_for_same_offset_does_not_touch_file(self):
+        upload_id = self.start().json()['upload_id']
+        # Drugie żądanie wczytało sesję przed zapisem pierwszego
+        stale = AttachmentUpload.objects.get(pk=upload_id)
+        self.put_chunk(upload_id, 0, 999)
+
+        with self.assertRaises(UploadError) as raised:
+            append_chunk(stale, BytesIO(b'x' * 1000), 0, 1000)
+        self.assertEqual((raised.exception.status_code, raised.exception.extra), (409, {'offset': 1000}))
+        self.assertEqual(upload_temp_path(stale).read_bytes(), self.content[:1000])
+
+    def test_expire_abandoned_uploads(self):
+        stale_id = self.start().json()['upload_id']
+        self.put_chunk(stale_id, 0, 999)
+        active_id = self.start().json()['upload_id']
+        AttachmentUpload.objects.filter(pk=stale_id).update(updated_at=timezone.now() - timedelta(days=2))
+        stale_path = upload_temp_path(AttachmentUpload.objects.get(pk=stale_id))
+        orphan = stale_path.with_name('osierocony.part')
+        orphan.write_bytes(b'x')
+        os.utime(orphan, (0, 0))
+
+        out = StringIO()
+        call_command('expire_chunked_uploads', stdout=out)
+        self.assertIn('Usunięte sesje: 1, osierocone pliki: 1', out.getvalue())
+        self.assertEqual(list(AttachmentUpload.objects.values_list('pk', flat=True)), [uuid.UUID(active_id)])
+        self.assertFalse(stale_path.exists())
+        self.assertFalse(orphan.exists())
+
+    def test_complete_before_all_chunks(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0, 999)
+        response = self.client.post(self.detail_url(upload_id, 'complete'))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Attachment.objects.exists())
+
+    def test_checksum_mismatch(self):
+        upload_id = self.start(size=10).json()['upload_id']
+        self.client.put(
+            self.detail_url(upload_id), b'0123456789',
+            content_type='application/octet-stream', HTTP_CONTENT_RANGE='bytes 0-9/10'
+        )
+        response = self.client.post(
+            self.detail_url(upload_id, 'complete'), {'sha256': '0' * 64}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 422)
+
+    def test_chunk_too_large(self):
+        upload_id = self.start().json()['upload_id']
+        response = self.put_chunk(upload_id, 0, 1999)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_invalid_extension(self):
+        response = self.start(filename='virus.exe')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_string_filename_and_checksum(self):
+        for data in ({'filename': 123, 'size': 10}, {'filename': ['a.pdf'], 'size': 10},
+                     {'filename': 'a.pdf', 'size': 10, 'sha256': 123}):
+            response = self.client.post(self.create_url, data, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+
+        upload_id = self.start(size=10).json()['upload_id']
+        self.client.put(
+            self.detail_url(upload_id), b'0123456789',
+            content_type='application/octet-stream', HTTP_CONTENT_RANGE='bytes 0-9/10'
+        )
+        response = self.client.post(
+            self.detail_url(upload_id, 'complete'), {'sha256': 123}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(AttachmentUpload.objects.filter(pk=upload_id).exists())
+
+    def test_abort(self):
+        upload_id = self.start().json()['upload_id']
+        response = self.client.delete(self.detail_url(upload_id))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(AttachmentUpload.objects.exists())
+
+
+@override_settings(ATTACHMENT_DEDUPLICATION=True)
+class AttachmentDeduplicationTests(AttachmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.instructor)
+        self.content = b'sylabus ' * 100
+        self.other_lesson = Lesson.objects.create(title='Lekcja 2', course=self.course)
+
+    def upload(self, lesson, filename='sylabus.pdf'):
+        url = reverse('api_attachment_list_create', kwargs={'course_id': self.course.id, 'lesson_id': lesson.id})
+        file = SimpleUploadedFile(filename, self.content, content_type='application/pdf')
+        return self.client.post(url, {'file': file})
+
+    def test_same_content_stored_once(self):
+        self.assertEqual(self.upload(self.lesson).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.upload(self.other_lesson, 'kopia.pdf').status_code, status.HTTP_201_CREATED)
+
+        blob = AttachmentBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        first, second = Attachment.objects.order_by('id')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(first.blob, blob)
+        with second.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_blob_deleted_with_last_reference(self):
+        self.upload(self.lesson)
+        self.upload(self.other_lesson)
+        blob = AttachmentBlob.objects.get()
+        storage, name = blob.file.storage, blob.file.name
+
+        Attachment.objects.first().delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # Usunięcie lekcji kaskadowo usuwa ostatni załącznik
+            self.other_lesson.delete()
+            self.lesson.delete()
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_chunked_upload_of_known_content_is_instant(self):
+        self.upload(self.lesson)
+        url = reverse('api_chunked_upload_create', kwargs={
+            'course_id': self.course.id, 'lesson_id': self.other_lesson.id
+        })
+        response = self.client.post(url, {
+            'filename': 'kopia.pdf',
+            'size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(),
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.json()['deduplicated'])
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 2)
+
+    def test_instant_dedup_requires_own_attachment(self):
+        self.upload(self.lesson)
+        other_instructor = User.objects.create_user(
+            username='inny', email='inny@test.com', password='password', is_instructor=True
+        )
+        other_course = Course.objects.create(name='Inny kurs', instructor=other_instructor, edition=self.edition)
+        other_lesson = Lesson.objects.create(title='Lekcja', course=other_course)
+        self.client.force_login(other_instructor)
+        url = reverse('api_chunked_upload_create', kwargs={'course_id': other_course.id, 'lesson_id': other_lesson.id})
+        response = self.client.post(url, {
+            'filename': 'cudzy.pdf',
+            'size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(),
+        }, content_type='application/json')
+
+        # Znajomość sumy SHA-256 nie wystarcza - treść trzeba przesłać
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('deduplicated', response.json())
+        self.assertFalse(other_lesson.attachments.exists())
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+
+    def test_blob_file_removed_when_save_rolls_back(self):
+        file = SimpleUploadedFile('sylabus.pdf', self.content, content_type='application/pdf')
+        attachment = Attachment(lesson=self.lesson, original_filename='sylabus.pdf', file=file)
+        with patch.object(Attachment, 'save_base', side_effect=DatabaseError('awaria')):
+            with self.assertRaises(DatabaseError):
+                attachment.save()
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertTrue(attachment.blob.new_file)
+        self.assertFalse(attachment.blob.file.storage.exists(attachment.blob.new_file))
@@ -1,4 +1,6 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from kursy.models import Course, CourseEdition, Enrollment
@@ -102,3 +104,74 @@ class EnrollmentApiTest(TestCase):
         response = self.client.post(url)
         self.assertEqual(response.status_code, 403)
 
+
+
+@override_settings(COURSE_CATALOG={'PAGE_SIZE': 2})
+class StudentCourseCatalogTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='password')
+        self.instructor = User.objects.create_user(username='instructor', email='instructor@example.com', password='password', is_instructor=True)
+        self.edition_a = CourseEdition.objects.create(name='2024/2025')
+        self.edition_b = CourseEdition.objects.create(name='2025/2026')
+        self.courses = [
+            Course.objects.create(
+                name=f'Kurs {i}', description='Opis', instructor=self.instructor,
+                edition=self.edition_a if i < 3 else self.edition_b, is_visible=True
+            )
+            for i in range(4)
+        ]
+        Enrollment.objects.create(student=self.student, course=self.courses[1], status='approved')
+        self.url = reverse('student_available_courses')
+        self.client.force_login(self.student)
+
+    def names(self, response):
+        return [item['course'].name for item in response.context['courses_with_status']]
+
+    def test_pagination_and_edition_filter(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self.names(response), ['Kurs 0', 'Kurs 1'])
+        self.assertEqual(response.context['page']['num_pages'], 2)
+        self.assertEqual(response.context['courses_with_status'][1]['user_status'], 'approved')
+
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(self.names(response), ['Kurs 2', 'Kurs 3'])
+
+        response = self.client.get(self.url, {'edition': self.edition_a.id, 'page': 2})
+        self.assertEqual(self.names(response), ['Kurs 2'])
+
+        # Strona spoza zakresu - ostatnia strona
+        response = self.client.get(self.url, {'edition': self.edition_b.id, 'page': 9})
+        self.assertEqual(self.names(response), ['Kurs 3'])
+        self.assertEqual(
+            [edition['name'] for edition in response.context['editions']], ['2024/2025', '2025/2026']
+        )
+
+    def test_catalog_is_cached_and_invalidated(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertFalse(any('"kursy_course"' in query['sql'] for query in queries.captured_queries))
+        # Nakładka statusów studenta nadal jest liczona na bieżąco
+        self.assertEqual(response.context['courses_with_status'][1]['user_status'], 'approved')
+
+        course = self.courses[0]
+        course.name = 'Kurs 9'
+        course.save()
+        self.assertEqual(self.names(self.client.get(self.url)), ['Kurs 1', 'Kurs 2'])
+
+        course.is_visible = False
+        course.save()
+        response = self.client.get(self.url, {'edition': self.edition_a.id})
+        self.assertEqual(self.names(response), ['Kurs 1', 'Kurs 2'])
+
+    def test_moving_course_refreshes_both_editions(self):
+        self.client.get(self.url, {'edition': self.edition_a.id})
+        self.client.get(self.url, {'edition': self.edition_b.id})
+        course = Course.objects.get(pk=self.courses[0].pk)
+        course.edition = self.edition_b
+        course.save()
+        response = self.client.get(self.url, {'edition': self.edition_a.id})
+        self.assertEqual(self.names(response), ['Kurs 1', 'Kurs 2'])
+        response = self.client.get(self.url, {'edition': self.edition_b.id})
+        self.assertEqual(self.names(response), ['Kurs 0', 'Kurs 3'])
@@ -0,0 +1,117 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from kursy.models import Course, CourseEdition, Lesson, Enrollment
+
+User = get_user_model()
+
+class BatchAPITests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='instructor', password='password', is_instructor=True)
+        self.student = User.objects.create_user(username='student', password='password')
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        self.lesson = Lesson.objects.create(title='Lekcja', description='Opis', course=self.course)
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = Client()
+        self.client.force_login(self.instructor)
+        self.url = reverse('api_batch')
+
+    def post(self, requests, atomic=False, client=None, **extra):
+        return (client or self.client).post(
+            self.url, {'requests': requests, 'atomic': atomic}, content_type='application/json', **extra
+        )
+
+    def lesson_path(self):
+        return reverse('api_lesson_detail', args=[self.course.id, self.lesson.id])
+
+    def test_dispatches_in_order(self):
+        response = self.post([
+            {'method': 'POST', 'path': reverse('api_enrollment_bulk_update', args=[self.course.id]),
+             'body': {'enrollment_ids': [self.enrollment.id], 'action': 'approve'}},
+            {'method': 'GET', 'path': reverse('api_enrollment_list', args=[self.course.id]) + '?status=approved'},
+            {'method': 'PATCH', 'path': self.lesson_path(), 'body': {'title': 'Nowy tytuł'}},
+            {'method': 'GET', 'path': reverse('api_course_detail', args=[999])},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        responses = response.json()['responses']
+        self.assertEqual([r['status'] for r in responses], [200, 200, 200, 404])
+        self.assertEqual([e['id'] for e in responses[1]['body']['results']], [self.enrollment.id])
+        self.assertEqual(responses[2]['body']['title'], 'Nowy tytuł')
+        self.assertIn('ETag', responses[2]['headers'])
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.title, 'Nowy tytuł')
+
+    def test_authenticates_once(self):
+        requests = [{'method': 'GET', 'path': reverse('api_course_detail', args=[self.course.id])}] * 5
+        with self.assertNumQueries(7):
+            # sesja i użytkownik raz, potem 5x kurs (z edycją i instruktorem) - podżądania
+            # nie odczytują ponownie sesji ani użytkownika
+            response = self.post(requests)
+        self.assertEqual([r['status'] for r in response.json()['responses']], [200] * 5)
+
+    def test_subrequests_keep_permissions(self):
+        self.client.force_login(self.student)
+        response = self.post([{'method': 'DELETE', 'path': self.lesson_path()}])
+        self.assertEqual(response.json()['responses'][0]['status'], status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Lesson.objects.filter(pk=self.lesson.pk).exists())
+
+    def test_jwt_authentication(self):
+        token = str(RefreshToken.for_user(self.instructor).access_token)
+        response = self.post(
+            [{'method': 'GET', 'path': self.lesson_path()}], client=Client(), HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['responses'][0]['body']['title'], 'Lekcja')
+
+    def test_conditional_headers(self):
+        etag = self.client.get(self.lesson_path())['ETag']
+        response = self.post([
+            {'method': 'GET', 'path': self.lesson_path(), 'headers': {'If-None-Match': etag}},
+            {'method': 'PATCH', 'path': self.lesson_path(), 'body': {'title': 'A'}, 'headers': {'If-Match': '"stary"'}},
+        ])
+        self.assertEqual([r['status'] for r in response.json()['responses']], [304, 412])
+
+    def test_atomic_rolls_back_on_first_error(self):
+        response = self.post([
+            {'method': 'PATCH', 'path': self.lesson_path(), 'body': {'title': 'Zmieniony'}},
+            {'method': 'PATCH', 'path': self.lesson_path(), 'body': {'title': ''}},
+            {'method': 'DELETE', 'path': self.lesson_path()},
+        ], atomic=True)
+        data = response.json()
+        self.assertFalse(data['committed'])
+        self.assertEqual([r['status'] for r in data['responses']], [200, 400, 424])
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.title, 'Lekcja')
+
+    def test_atomic_requires_boolean_true(self):
+        # Napis "false" nie włącza trybu atomowego
+        response = self.post([
+            {'method': 'PATCH', 'path': self.lesson_path(), 'body': {'title': 'Zmieniony'}},
+            {'method': 'PATCH', 'path': self.lesson_path(), 'body': {'title': ''}},
+        ], atomic='false')
+        data = response.json()
+        self.assertTrue(data['committed'])
+        self.assertEqual([r['status'] for r in data['responses']], [200, 400])
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.title, 'Zmieniony')
+
+    def test_rejects_unsupported_routes(self):
+        response = self.post([
+            {'method': 'POST', 'path': reverse('api_login'), 'body': {}},
+            {'method': 'GET', 'path': reverse('api_enrollment_export', args=[self.course.id])},
+            {'method': 'GET', 'path': reverse('instructor_dashboard')},
+            {'method': 'GET', 'path': '/nie-ma/'},
+            {'method': 'OPTIONS', 'path': self.lesson_path()},
+            {'method': 'GET', 'path': self.lesson_path(), 'headers': {'Authorization': 'Bearer x'}},
+        ])
+        self.assertEqual([r['status'] for r in response.json()['responses']], [400] * 6)
+
+        response = self.post([{'method': 'GET', 'path': self.url}], atomic=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post([{'path': self.lesson_path()}] * 21).status_code, status.HTTP_400_BAD_REQUEST)
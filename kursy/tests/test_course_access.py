@@ -0,0 +1,96 @@
+from django.core.cache import caches
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.db import connection
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Lesson, Enrollment
+from kursy.access import approved_course_ids
+from kursy.enrollments import apply_enrollment_action, apply_enrollment_action_to_matching, import_roster
+
+User = get_user_model()
+
+@override_settings(COURSE_ACCESS_CACHE={'STORE': 'cache'})
+class CourseAccessCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.instructor = User.objects.create_user(
+            username='instructor', password='password', is_instructor=True
+        )
+        self.student = User.objects.create_user(username='student', email='student@test.com', password='password')
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        self.lessons = [
+            Lesson.objects.create(title=f'Lekcja {i}', course=self.course, is_published=True, description='Opis')
+            for i in range(3)
+        ]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course, status='pending')
+        self.client = Client()
+        self.client.force_login(self.student)
+
+    def lesson_url(self, lesson):
+        return reverse('student_lesson_detail', args=[self.course.id, lesson.id])
+
+    def test_access_check_is_cached(self):
+        self.enrollment.status = 'approved'
+        self.enrollment.save()
+
+        self.assertEqual(self.client.get(self.lesson_url(self.lessons[0])).status_code, 200)
+        for lesson in self.lessons[1:]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.lesson_url(lesson))
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('"kursy_enrollment"' in query['sql'] for query in queries.captured_queries))
+
+    @override_settings(COURSE_ACCESS_CACHE={'STORE': 'auto'})
+    def test_process_local_cache_is_bypassed(self):
+        # LocMemCache nie jest współdzielony - cofnięcie dostępu w innym procesie
+        # (symulowane przez UPDATE bez unieważnienia) jest widoczne od razu
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(status='approved')
+        self.assertEqual(self.client.get(self.lesson_url(self.lessons[0])).status_code, 200)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(status='rejected')
+        self.assertEqual(self.client.get(self.lesson_url(self.lessons[0])).status_code, 403)
+        self.assertIsNone(caches['default'].get(f'kursy:access:{self.student.pk}'))
+
+    def test_bulk_approval_and_removal_invalidate(self):
+        self.assertEqual(self.client.get(self.lesson_url(self.lessons[0])).status_code, 403)
+
+        apply_enrollment_action(self.course, 'approve', [self.enrollment.id])
+        self.assertEqual(self.client.get(self.lesson_url(self.lessons[0])).status_code, 200)
+
+        apply_enrollment_action_to_matching(self.course, 'delete')
+        self.assertEqual(self.client.get(self.lesson_url(self.lessons[0])).status_code, 403)
+
+    def test_instance_changes_invalidate(self):
+        self.assertEqual(approved_course_ids(self.student), frozenset())
+
+        self.enrollment.status = 'approved'
+        self.enrollment.save()
+        self.assertEqual(approved_course_ids(self.student), {self.course.id})
+
+        self.enrollment.delete()
+        self.assertEqual(approved_course_ids(self.student), frozenset())
+
+        import_roster(self.course, [self.student.email])
+        self.assertEqual(approved_course_ids(self.student), {self.course.id})
+
+    def test_api_lesson_and_attachment_endpoints(self):
+        lesson = self.lessons[0]
+        urls = [
+            reverse('api_lesson_list_create', args=[self.course.id]),
+            reverse('api_lesson_detail', args=[self.course.id, lesson.id]),
+            reverse('api_attachment_list_create', args=[self.course.id, lesson.id]),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        apply_enrollment_action(self.course, 'approve', [self.enrollment.id])
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.client.force_login(self.instructor)
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
@@ -0,0 +1,61 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition
+from kursy.pagination import CourseCursorPagination
+
+User = get_user_model()
+
+class CourseListAPITests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        # Dwa kursy o tej samej nazwie - porządek musi rozstrzygać id
+        for name in ['Kurs C', 'Kurs A', 'Kurs B', 'Kurs A', 'Kurs D']:
+            Course.objects.create(
+                name=name, description='Opis', instructor=self.instructor, edition=self.edition
+            )
+        self.url = reverse('api_course_list_create')
+        self.client = Client()
+        self.client.force_login(self.instructor)
+
+    def test_first_page(self):
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual([c['name'] for c in data['results']], ['Kurs A', 'Kurs A'])
+        self.assertIsNotNone(data['next'])
+
+    def test_walk_all_pages(self):
+        """Przejście po wszystkich stronach zwraca każdy kurs dokładnie raz, w porządku (name, id)."""
+        seen = []
+        params = {'page_size': 2}
+        while True:
+            data = self.client.get(self.url, params).json()
+            seen.extend((c['name'], c['id']) for c in data['results'])
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+
+        expected = list(Course.objects.order_by('name', 'id').values_list('name', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'nie-kursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_values(self):
+        pagination = CourseCursorPagination()
+        for position in (['a', 'abc'], ['a', {'x': 1}], ['a', None], [None, None], [['a'], 1]):
+            response = self.client.get(self.url, {'cursor': pagination.encode_cursor(position)})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+    def test_query_count_constant(self):
+        """Instruktor i edycja są dołączane w jednym zapytaniu (brak N+1)."""
+        # Sesja + użytkownik + strona kursów
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()['results']), 5)
@@ -0,0 +1,94 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Enrollment, normalize_email_key
+from kursy.enrollments import import_roster
+
+User = get_user_model()
+migration = import_module('kursy.migrations.0011_customuser_email_key')
+
+class EmailKeyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='jan', email='Jan.Kowalski@Example.com', password='password123'
+        )
+
+    def test_key_is_normalized_on_save(self):
+        self.assertEqual(self.user.email_key, 'jan.kowalski@example.com')
+        self.user.email = 'NOWY@example.com '
+        self.user.save(update_fields=['email'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email_key, 'nowy@example.com')
+
+        # Użytkownicy bez adresu nie kolidują ze sobą
+        User.objects.create_user(username='a', password='password123')
+        User.objects.create_user(username='b', password='password123')
+
+    def test_key_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='jan2', email='jan.kowalski@example.COM', password='password123')
+
+    def test_login_is_case_insensitive_and_indexed(self):
+        client = Client()
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                reverse('api_login'), {'email': 'JAN.KOWALSKI@example.com', 'password': 'password123'},
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Użytkownik wyszukany po unikalnym indeksie
+        self.assertIn('"email_key" =', context.captured_queries[0]['sql'])
+
+        response = Client().post(
+            reverse('api_login'), {'email': 'inny@example.com', 'password': 'password123'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_non_string_email_is_rejected(self):
+        self.assertIsNone(normalize_email_key(123))
+        client = Client()
+        for body in ({'email': 123, 'password': 'password123'}, {'email': ['jan'], 'password': 'x'},
+                     {'email': 'jan.kowalski@example.com', 'password': 123}, ['jan.kowalski@example.com']):
+            response = client.post(reverse('api_login'), body, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+
+        for email in (123, ['jan.kowalski@example.com'], '   '):
+            response = client.post(reverse('api_password_reset'), {'email': email}, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, email)
+
+        response = client.post(reverse('api_register'), {
+            'email': 123, 'password': 'password123', 'first_name': 'A', 'last_name': 'B'
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+
+    def test_roster_import_matches_any_case(self):
+        instructor = User.objects.create_user(username='inst', email='inst@example.com', is_instructor=True)
+        course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=instructor, edition=CourseEdition.objects.create(name='E')
+        )
+        result = import_roster(course, ['JAN.kowalski@example.com', 'brak@example.com'])
+        self.assertEqual((result['created_count'], result['unknown_emails']), (1, ['brak@example.com']))
+        self.assertTrue(Enrollment.objects.filter(student=self.user, course=course).exists())
+
+    def test_migration_detects_duplicates(self):
+        other = User.objects.create_user(username='jan2', email='inny@example.com', password='password123')
+        # Stan sprzed migracji: adresy różniące się tylko wielkością liter, bez kluczy
+        User.objects.update(email_key=None)
+        User.objects.filter(pk=other.pk).update(email='JAN.KOWALSKI@example.com')
+
+        with self.assertRaisesMessage(RuntimeError, 'jan.kowalski@example.com'):
+            migration.fill_email_keys(apps, None)
+
+        User.objects.filter(pk=other.pk).update(email='inny@example.com')
+        migration.fill_email_keys(apps, None)
+        self.assertEqual(
+            set(User.objects.values_list('email_key', flat=True)), {'jan.kowalski@example.com', 'inny@example.com'}
+        )
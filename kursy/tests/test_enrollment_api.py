@@ -0,0 +1,320 @@
+from django.test import TestCase, Client
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Enrollment
+from kursy.enrollments import apply_enrollment_action, import_roster
+from kursy.pagination import EnrollmentCursorPagination
+from unittest.mock import patch
+import io
+import json
+import tempfile
+
+User = get_user_model()
+
+class EnrollmentListAPITests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition
+        )
+        self.students = []
+        for i in range(5):
+            student = User.objects.create(
+                username=f'student{i}', email=f'student{i}@test.com', first_name='Jan', last_name=f'Nr{i}'
+            )
+            self.students.append(student)
+            Enrollment.objects.create(
+                student=student, course=self.course, status='pending' if i < 3 else 'approved'
+            )
+        self.url = reverse('api_enrollment_list', args=[self.course.id])
+        self.client = Client()
+        self.client.force_login(self.instructor)
+
+    def test_default_shape(self):
+        response = self.client.get(self.url, {'status': 'pending'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(set(results[0]), {'id', 'status', 'student'})
+        self.assertIn('email', results[0]['student'])
+
+    def test_fields_projection(self):
+        response = self.client.get(self.url, {'fields': 'id,name,email'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.json()['results'][0]
+        self.assertEqual(set(first), {'id', 'name', 'email'})
+        self.assertEqual(first['name'], 'Jan Nr4')
+        self.assertEqual(first['email'], 'student4@test.com')
+
+    def test_unknown_field(self):
+        response = self.client.get(self.url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pagination(self):
+        data = self.client.get(self.url, {'page_size': 2}).json()
+        ids = [e['id'] for e in data['results']]
+        while data['next_cursor']:
+            data = self.client.get(self.url, {'page_size': 2, 'cursor': data['next_cursor']}).json()
+            ids.extend(e['id'] for e in data['results'])
+        self.assertEqual(ids, list(Enrollment.objects.order_by('-id').values_list('id', flat=True)))
+
+    def test_cursor_with_invalid_values(self):
+        pagination = EnrollmentCursorPagination()
+        for position in (['x'], [None], [{'id': 1}]):
+            response = self.client.get(self.url, {'cursor': pagination.encode_cursor(position)})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+    def test_query_count_independent_of_size(self):
+        """Studenci są dołączani w jednym zapytaniu, niezależnie od liczby zapisów."""
+        # Sesja + użytkownik + kurs + prowadzący + strona zapisów
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+    def test_other_user_forbidden(self):
+        self.client.force_login(self.students[0])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class EnrollmentExportAPITests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition
+        )
+        for i in range(3):
+            student = User.objects.create(
+                username=f'student{i}', email=f'student{i}@test.com', first_name='Jan', last_name=f'Nr{i}'
+            )
+            Enrollment.objects.create(
+                student=student, course=self.course, status='pending' if i < 2 else 'approved'
+            )
+        self.url = reverse('api_enrollment_export', args=[self.course.id])
+        self.client = Client()
+        self.client.force_login(self.instructor)
+
+    def test_csv_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'id,status,email,first_name,last_name')
+        self.assertEqual(len(lines), 4)
+
+    def test_ndjson_export_filtered(self):
+        response = self.client.get(self.url, {'type': 'ndjson', 'status': 'approved'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['email'], 'student2@test.com')
+
+    def test_invalid_type(self):
+        response = self.client.get(self.url, {'type': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_student_forbidden(self):
+        self.client.force_login(User.objects.get(username='student0'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class EnrollmentBulkUpdateAPITests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition
+        )
+        self.other_course = Course.objects.create(
+            name='Inny kurs', description='Opis', instructor=self.instructor, edition=self.edition
+        )
+        self.enrollments = {}
+        for i, enrollment_status in enumerate(['pending', 'pending', 'approved', 'rejected']):
+            student = User.objects.create(username=f'student{i}', email=f'student{i}@test.com')
+            self.enrollments[i] = Enrollment.objects.create(
+                student=student, course=self.course, status=enrollment_status
+            )
+        self.foreign = Enrollment.objects.create(
+            student=User.objects.get(username='student0'), course=self.other_course, status='pending'
+        )
+        self.url = reverse('api_enrollment_bulk_update', args=[self.course.id])
+        self.client = Client()
+        self.client.force_login(self.instructor)
+
+    def post(self, action, ids, **extra):
+        return self.client.post(
+            self.url, {'action': action, 'enrollment_ids': ids, **extra}, content_type='application/json'
+        )
+
+    def test_only_valid_transitions_applied(self):
+        ids = [e.id for e in self.enrollments.values()] + [self.foreign.id, 999999]
+        response = self.post('approve', ids)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['changed_count'], 2)
+        self.assertEqual(data['updated_count'], 2)
+        self.assertEqual(data['unchanged_count'], 2)
+        self.assertEqual(data['invalid_count'], 2)
+        self.assertCountEqual(data['invalid_ids'], [self.foreign.id, 999999])
+
+        self.enrollments[3].refresh_from_db()
+        self.assertEqual(self.enrollments[3].status, 'rejected')
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, 'pending')
+
+    def test_chunked_execution(self):
+        ids = [e.id for e in self.enrollments.values()]
+        result = apply_enrollment_action(self.course, 'reject', ids, chunk_size=1)
+        self.assertEqual(result['changed_count'], 2)
+        self.assertEqual(Enrollment.objects.filter(course=self.course, status='rejected').count(), 3)
+
+    def test_delete_approved(self):
+        response = self.post('delete', [self.enrollments[2].id, self.enrollments[0].id])
+        self.assertEqual(response.json()['changed_count'], 1)
+        self.assertFalse(Enrollment.objects.filter(pk=self.enrollments[2].id).exists())
+        self.assertTrue(Enrollment.objects.filter(pk=self.enrollments[0].id).exists())
+
+    def test_invalid_action(self):
+        response = self.post('archive', [self.enrollments[0].id])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_background_job(self):
+        # Zadanie wykonujemy synchronicznie - wątek nie widziałby transakcji testu
+        with patch('kursy.jobs._executor.submit', side_effect=lambda fn, *args: fn(*args)):
+            response = self.post('restore', [self.enrollments[3].id], background=True)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['changed_count'], 1)
+
+        # Zadanie jest widoczne tylko pod adresem kursu, którego dotyczy
+        other_url = reverse('api_enrollment_bulk_job', args=[self.course.id + 1, response.json()['job_id']])
+        self.assertEqual(self.client.get(other_url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_login(User.objects.get(username='student0'))
+        self.assertEqual(self.client.get(response.json()['status_url']).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_apply_to_all_matching(self):
+        url = reverse('api_enrollment_bulk_update_matching', args=[self.course.id])
+        # Jedno zapytanie UPDATE niezależnie od liczby zapisów, plus korekta liczników kursu
+        # i odczyt studentów do unieważnienia cache dostępu (+ sesja, użytkownik, kurs, prowadzący, savepoint)
+        with self.assertNumQueries(9):
+            response = self.client.post(url, {
+                'action': 'approve', 'status': 'pending', 'exclude_ids': [self.enrollments[1].id]
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['changed_count'], 1)
+
+        self.enrollments[0].refresh_from_db()
+        self.enrollments[1].refresh_from_db()
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.enrollments[0].status, 'approved')
+        self.assertEqual(self.enrollments[1].status, 'pending')
+        self.assertEqual(self.foreign.status, 'pending')
+
+    def test_apply_to_all_matching_rejects_non_list_exclude_ids(self):
+        url = reverse('api_enrollment_bulk_update_matching', args=[self.course.id])
+        # Napis byłby iterowany po znakach ("12" -> [1, 2])
+        for exclude_ids in (str(self.enrollments[1].id), self.enrollments[1].id, {'id': 1}):
+            response = self.client.post(url, {
+                'action': 'approve', 'status': 'pending', 'exclude_ids': exclude_ids
+            }, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.enrollments[0].refresh_from_db()
+        self.assertEqual(self.enrollments[0].status, 'pending')
+
+    def test_apply_to_all_matching_status_mismatch(self):
+        url = reverse('api_enrollment_bulk_update_matching', args=[self.course.id])
+        response = self.client.post(url, {'action': 'approve', 'status': 'approved'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EnrollmentImportTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition
+        )
+        self.students = [
+            User.objects.create(username=f'student{i}', email=f'student{i}@test.com') for i in range(4)
+        ]
+        Enrollment.objects.create(student=self.students[0], course=self.course, status='pending')
+        self.client = Client()
+        self.client.force_login(self.instructor)
+        self.url = reverse('api_enrollment_import', args=[self.course.id])
+        self.csv = (
+            'email,imie\n'
+            'student0@test.com,A\n'
+            'student1@test.com,B\n'
+            'student2@test.com,C\n'
+            'student2@test.com,C\n'
+            'nikt@test.com,D\n'
+            'inst@test.com,E\n'
+        )
+
+    def post(self, content, **data):
+        roster = SimpleUploadedFile('lista.csv', content.encode('utf-8-sig'), content_type='text/csv')
+        return self.client.post(self.url, {'file': roster, **data})
+
+    def test_import_reports_counts(self):
+        response = self.post(self.csv)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['created_count'], 2)
+        self.assertEqual(data['skipped_count'], 1)
+        self.assertEqual(data['unknown_count'], 2)
+        self.assertEqual(data['unknown_emails'], ['nikt@test.com', 'inst@test.com'])
+
+        self.assertEqual(
+            set(Enrollment.objects.filter(course=self.course, status='approved').values_list('student_id', flat=True)),
+            {self.students[1].id, self.students[2].id}
+        )
+        # Istniejący zapis nie zmienia statusu
+        self.assertEqual(Enrollment.objects.get(student=self.students[0], course=self.course).status, 'pending')
+
+    def test_import_without_header_and_status(self):
+        response = self.post('student3@test.com\n\nstudent1@test.com\n', status='pending')
+        self.assertEqual(response.json()['created_count'], 2)
+        self.assertEqual(Enrollment.objects.get(student=self.students[3], course=self.course).status, 'pending')
+
+    def test_import_queries_are_batched(self):
+        emails = [student.email for student in self.students] * 3
+        # Na paczkę: użytkownicy, istniejące zapisy, bulk_create, wstawione zapisy,
+        # przeliczenie liczników kursu (+ savepoint)
+        with self.assertNumQueries(14):
+            result = import_roster(self.course, iter(emails), chunk_size=2)
+        self.assertEqual(result['created_count'], 3)
+        self.assertEqual(result['skipped_count'], 1)
+
+    def test_import_validation(self):
+        self.assertEqual(self.client.post(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post(self.csv, status='archived').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_login(self.students[1])
+        self.assertEqual(self.post(self.csv).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Enrollment.objects.filter(student=self.students[1]).exists())
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8') as roster:
+            roster.write(self.csv)
+            roster.flush()
+            out = io.StringIO()
+            call_command('import_roster', self.course.id, roster.name, '--status', 'pending', stdout=out)
+        self.assertIn('Utworzono: 2, pominięto: 1, nieznane: 2', out.getvalue())
+        self.assertEqual(Enrollment.objects.filter(course=self.course, status='pending').count(), 3)
@@ -0,0 +1,120 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Enrollment
+from kursy.enrollments import apply_enrollment_action, apply_enrollment_action_to_matching, import_roster
+import io
+from unittest.mock import patch
+
+User = get_user_model()
+
+class EnrollmentCountersTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        self.students = [
+            User.objects.create_user(username=f'student{i}', email=f'student{i}@test.com', password='password')
+            for i in range(4)
+        ]
+        self.client = Client()
+
+    def assertCounts(self, pending, approved, rejected):
+        self.course.refresh_from_db()
+        self.assertEqual(
+            (self.course.pending_count, self.course.approved_count, self.course.rejected_count),
+            (pending, approved, rejected)
+        )
+
+    def test_enroll_api_increments_pending(self):
+        self.client.force_login(self.students[0])
+        response = self.client.post(reverse('api_enroll_course', args=[self.course.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCounts(1, 0, 0)
+
+    def test_instance_save_and_delete(self):
+        enrollment = Enrollment.objects.create(student=self.students[0], course=self.course)
+        self.assertCounts(1, 0, 0)
+
+        enrollment.status = 'approved'
+        enrollment.save()
+        self.assertCounts(0, 1, 0)
+
+        # Ponowny zapis bez zmiany statusu nie zmienia liczników
+        enrollment.save()
+        fetched = Enrollment.objects.get(pk=enrollment.pk)
+        fetched.status = 'rejected'
+        fetched.save(update_fields=['status'])
+        self.assertCounts(0, 0, 1)
+
+        fetched.delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_course_save_keeps_counters(self):
+        stale = Course.objects.get(pk=self.course.pk)
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        stale.name = 'Nowa nazwa'
+        stale.save()
+        self.assertCounts(1, 0, 0)
+
+    def test_bulk_actions(self):
+        enrollments = [
+            Enrollment.objects.create(student=student, course=self.course) for student in self.students
+        ]
+        apply_enrollment_action(self.course, 'approve', [e.id for e in enrollments[:3]], chunk_size=2)
+        self.assertCounts(1, 3, 0)
+
+        apply_enrollment_action(self.course, 'delete', [enrollments[0].id, enrollments[3].id])
+        self.assertCounts(1, 2, 0)
+
+        apply_enrollment_action_to_matching(self.course, 'reject')
+        self.assertCounts(0, 2, 1)
+
+        apply_enrollment_action_to_matching(self.course, 'delete')
+        self.assertCounts(0, 0, 1)
+
+    def test_roster_import(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        import_roster(self.course, [student.email for student in self.students])
+        self.assertCounts(1, 3, 0)
+
+    def test_roster_import_with_concurrent_enrollment(self):
+        bulk_create = Enrollment.objects.bulk_create
+
+        def concurrent_bulk_create(objs, **kwargs):
+            # Równoległe żądanie zapisuje studenta między odczytem istniejących zapisów a wstawieniem
+            Enrollment.objects.create(student=self.students[1], course=self.course, status='pending')
+            return bulk_create(objs, **kwargs)
+
+        with patch.object(Enrollment.objects, 'bulk_create', side_effect=concurrent_bulk_create):
+            result = import_roster(self.course, [student.email for student in self.students])
+        self.assertEqual((result['created_count'], result['skipped_count']), (3, 1))
+        self.assertCounts(1, 3, 0)
+
+    def test_student_deletion(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course, status='approved')
+        Enrollment.objects.create(student=self.students[1], course=self.course, status='approved')
+        self.students[0].delete()
+        self.assertCounts(0, 1, 0)
+
+    def test_recount_command(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course, status='rejected')
+        Course.objects.filter(pk=self.course.pk).update(pending_count=7, approved_count=3)
+
+        out = io.StringIO()
+        call_command('recount_enrollments', self.course.id, stdout=out)
+        self.assertIn('Przeliczono liczniki kursów: 1', out.getvalue())
+        self.assertCounts(0, 0, 1)
+
+    def test_dashboard_reads_counters(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        self.client.force_login(self.instructor)
+        response = self.client.get(reverse('instructor_dashboard'))
+        self.assertEqual(response.context['courses'][0].pending_count, 1)
+        self.assertNotIn('COUNT(', str(response.context['courses'].query))
@@ -0,0 +1,132 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Lesson, Enrollment
+
+User = get_user_model()
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='instructor', password='password', is_instructor=True)
+        self.student = User.objects.create_user(username='student', password='password')
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Długi opis', instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        self.lesson = Lesson.objects.create(title='Lekcja', description='Opis', course=self.course, is_published=True)
+        Enrollment.objects.create(student=self.student, course=self.course, status='approved')
+        self.client = Client()
+        self.client.force_login(self.instructor)
+        self.course_url = reverse('api_course_detail', args=[self.course.id])
+        self.lessons_url = reverse('api_lesson_list_create', args=[self.course.id])
+        self.lesson_url = reverse('api_lesson_detail', args=[self.course.id, self.lesson.id])
+
+    def test_course_not_modified(self):
+        response = self.client.get(self.course_url)
+        etag = response['ETag']
+
+        response = self.client.get(self.course_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        self.client.patch(self.course_url, {'name': 'Nowa nazwa'}, content_type='application/json')
+        self.assertEqual(self.client.get(self.course_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_nested_edition_rename_changes_etag(self):
+        etag = self.client.get(self.course_url)['ETag']
+        self.edition.name = 'Edycja 2'
+        self.edition.save()
+
+        response = self.client.get(self.course_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['edition']['name'], 'Edycja 2')
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Edycja zwracana jako ID - jej nazwa nie jest częścią reprezentacji
+        etag = self.client.get(self.course_url, {'expand': ''})['ETag']
+        self.edition.name = 'Edycja 3'
+        self.edition.save()
+        response = self.client.get(self.course_url, {'expand': ''}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_expanded_course_rename_changes_lesson_etag(self):
+        etag = self.client.get(self.lesson_url, {'expand': 'course'})['ETag']
+        self.client.patch(self.course_url, {'name': 'Nowa nazwa'}, content_type='application/json')
+        response = self.client.get(self.lesson_url, {'expand': 'course'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['course']['name'], 'Nowa nazwa')
+
+    def test_projection_is_part_of_etag(self):
+        default = self.client.get(self.course_url)['ETag']
+        names = self.client.get(self.course_url, {'fields': 'id,name'})['ETag']
+        self.assertNotEqual(default, names)
+        # Równoważne parametry - ta sama reprezentacja
+        self.assertEqual(self.client.get(self.course_url, {'fields': 'name, id'})['ETag'], names)
+        self.assertEqual(self.client.get(self.course_url, {'expand': 'instructor,edition'})['ETag'], default)
+
+        response = self.client.get(self.course_url, {'fields': 'id,name'}, HTTP_IF_NONE_MATCH=default)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'id': self.course.id, 'name': 'Kurs'})
+
+    def test_if_match_detects_concurrent_edit(self):
+        etag = self.client.get(self.lesson_url)['ETag']
+
+        response = self.client.patch(
+            self.lesson_url, {'title': 'Pierwsza zmiana'}, content_type='application/json', HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_etag = response['ETag']
+        self.assertNotEqual(new_etag, etag)
+
+        # Drugi klient edytuje na podstawie starej wersji
+        response = self.client.patch(
+            self.lesson_url, {'title': 'Druga zmiana'}, content_type='application/json', HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.title, 'Pierwsza zmiana')
+
+        response = self.client.put(
+            self.course_url, {'name': 'Kurs', 'description': 'Opis', 'is_visible': True, 'edition_id': self.edition.id},
+            content_type='application/json', HTTP_IF_MATCH='"course-0-0"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_lesson_list_etag(self):
+        etag = self.client.get(self.lessons_url)['ETag']
+        with self.assertNumQueries(4):
+            # sesja, użytkownik, kurs, agregat ETagu (bez pobierania lekcji)
+            response = self.client.get(self.lessons_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Studenci widzą inną listę - inny ETag
+        self.client.force_login(self.student)
+        self.assertNotEqual(self.client.get(self.lessons_url)['ETag'], etag)
+
+        self.client.force_login(self.instructor)
+        Lesson.objects.create(title='Druga', description='Opis', course=self.course)
+        self.assertEqual(self.client.get(self.lessons_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_lesson_list_etag_covers_expanded_course(self):
+        etag = self.client.get(self.lessons_url, {'expand': 'course'})['ETag']
+        self.client.patch(self.course_url, {'name': 'Nowa nazwa'}, content_type='application/json')
+        response = self.client.get(self.lessons_url, {'expand': 'course'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]['course']['name'], 'Nowa nazwa')
+
+        # Kurs zwracany jako ID - zmiana jego nazwy nie zmienia listy
+        etag = self.client.get(self.lessons_url)['ETag']
+        self.client.patch(self.course_url, {'name': 'Trzecia nazwa'}, content_type='application/json')
+        self.assertEqual(
+            self.client.get(self.lessons_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_lesson_list_etag_covers_projection(self):
+        default = self.client.get(self.lessons_url)['ETag']
+        response = self.client.get(self.lessons_url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=default)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{'id': self.lesson.id}])
+        self.assertEqual(self.client.get(self.lessons_url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=response['ETag'])
+                         .status_code, status.HTTP_304_NOT_MODIFIED)
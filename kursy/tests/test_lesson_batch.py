@@ -0,0 +1,98 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Lesson, LESSON_POSITION_GAP
+from kursy import search
+
+User = get_user_model()
+
+class LessonBatchTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='instructor', password='password', is_instructor=True)
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        self.lessons = [
+            Lesson.objects.create(title=title, description='Opis', course=self.course)
+            for title in ['Wstęp', 'Zmienne', 'Funkcje']
+        ]
+        self.client = Client()
+        self.client.force_login(self.instructor)
+        self.url = reverse('api_lesson_batch', args=[self.course.id])
+
+    def post(self, operations):
+        return self.client.post(self.url, {'operations': operations}, content_type='application/json')
+
+    def test_mixed_operations(self):
+        response = self.post([
+            {'op': 'create', 'data': {'title': 'Klasy', 'description': 'Programowanie obiektowe'}},
+            {'op': 'update', 'id': self.lessons[0].id, 'data': {'title': 'Wprowadzenie'}},
+            {'op': 'publish', 'id': self.lessons[1].id},
+            {'op': 'delete', 'id': self.lessons[2].id},
+            {'op': 'create', 'data': {'title': 'Moduły', 'description': 'Import', 'is_published': True}},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual([r['op'] for r in results], ['create', 'update', 'publish', 'delete', 'create'])
+        self.assertEqual(results[1]['lesson']['title'], 'Wprowadzenie')
+
+        lessons = list(self.course.lessons.all())
+        self.assertEqual([l.title for l in lessons], ['Wprowadzenie', 'Zmienne', 'Klasy', 'Moduły'])
+        self.assertEqual([l.id for l in lessons[2:]], [results[0]['id'], results[4]['id']])
+        self.assertEqual(lessons[3].position - lessons[2].position, LESSON_POSITION_GAP)
+        self.assertTrue(lessons[1].is_published)
+
+        # bulk_create/bulk_update omijają sygnały - indeks musi być aktualny mimo to
+        found = {r['id'] for r in search.search(self.instructor, 'obiektowe')}
+        self.assertEqual(found, {results[0]['id']})
+        self.assertEqual([r['id'] for r in search.search(self.instructor, 'Wprowadzenie')], [self.lessons[0].id])
+        self.assertEqual(search.search(self.instructor, 'Funkcje'), [])
+
+    def test_invalid_item_rolls_back_everything(self):
+        response = self.post([
+            {'op': 'create', 'data': {'title': 'Klasy', 'description': 'Opis'}},
+            {'op': 'create', 'data': {'description': 'Brak tytułu'}},
+            {'op': 'delete', 'id': self.lessons[0].id},
+            {'op': 'rename', 'id': self.lessons[1].id},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()['errors']
+        self.assertEqual([e['index'] for e in errors], [1, 3])
+        self.assertIn('title', errors[0]['errors'])
+        self.assertEqual(self.course.lessons.count(), 3)
+
+    def test_foreign_and_duplicate_ids(self):
+        other = Course.objects.create(name='Inny', description='Opis', instructor=self.instructor, edition=self.edition)
+        foreign = Lesson.objects.create(title='Obca', description='Opis', course=other)
+        response = self.post([
+            {'op': 'delete', 'id': foreign.id},
+            {'op': 'publish', 'id': self.lessons[0].id},
+            {'op': 'delete', 'id': self.lessons[0].id},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in response.json()['errors']], [0, 2])
+        self.assertTrue(Lesson.objects.filter(pk=foreign.pk).exists())
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def run(count):
+            operations = [{'op': 'create', 'data': {'title': f'Lekcja {i}', 'description': 'Opis'}} for i in range(count)]
+            operations += [{'op': 'update', 'id': lesson.id, 'data': {'description': 'Nowy'}} for lesson in self.lessons]
+            with self.assertNumQueries(11):
+                # sesja, użytkownik, kurs, lekcje z operacji, max pozycji, INSERT, indeks,
+                # UPDATE, indeks (+ savepoint x2)
+                response = self.post(operations)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        run(2)
+        run(50)
+
+    def test_limits_and_permissions(self):
+        self.assertEqual(self.post([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post([{'op': 'publish', 'id': 1}] * 201).status_code, status.HTTP_400_BAD_REQUEST)
+
+        student = User.objects.create_user(username='student', password='password')
+        self.client.force_login(student)
+        self.assertEqual(self.post([{'op': 'delete', 'id': self.lessons[0].id}]).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.course.lessons.count(), 3)
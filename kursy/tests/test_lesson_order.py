@@ -0,0 +1,82 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Lesson, LESSON_POSITION_GAP
+from kursy.lessons import move_lesson
+
+User = get_user_model()
+
+class LessonOrderTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='instructor', password='password', is_instructor=True)
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        # Tytuły celowo w innej kolejności niż alfabetyczna
+        self.lessons = [
+            Lesson.objects.create(title=title, description='Opis', course=self.course, is_published=True)
+            for title in ['Wstęp', 'Zmienne', 'Funkcje', 'Klasy']
+        ]
+        self.client = Client()
+        self.client.force_login(self.instructor)
+        self.url = reverse('api_lesson_reorder', args=[self.course.id])
+        self.list_url = reverse('api_lesson_list_create', args=[self.course.id])
+
+    def titles(self):
+        return [lesson['title'] for lesson in self.client.get(self.list_url).json()]
+
+    def test_new_lessons_are_appended_with_gaps(self):
+        self.assertEqual(
+            [lesson.position for lesson in self.lessons],
+            [LESSON_POSITION_GAP * i for i in range(1, 5)]
+        )
+        self.assertEqual(self.titles(), ['Wstęp', 'Zmienne', 'Funkcje', 'Klasy'])
+
+    def test_move_is_single_row_update(self):
+        with self.assertNumQueries(9):
+            # sesja, użytkownik, kurs, lekcja, pozycja docelowej, następna pozycja, UPDATE (+ savepoint x2)
+            response = self.client.post(
+                self.url, {'lesson_id': self.lessons[3].id, 'after_id': self.lessons[0].id},
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(), ['Wstęp', 'Klasy', 'Zmienne', 'Funkcje'])
+
+        self.client.post(self.url, {'lesson_id': self.lessons[2].id, 'after_id': None}, content_type='application/json')
+        self.assertEqual(self.titles(), ['Funkcje', 'Wstęp', 'Klasy', 'Zmienne'])
+
+    def test_move_renumbers_when_gap_is_exhausted(self):
+        Lesson.objects.filter(pk=self.lessons[1].pk).update(position=self.lessons[0].position + 1)
+        move_lesson(self.lessons[3], after_id=self.lessons[0].id)
+        self.assertEqual(self.titles(), ['Wstęp', 'Klasy', 'Zmienne', 'Funkcje'])
+        self.assertEqual(
+            list(self.course.lessons.values_list('position', flat=True)),
+            [LESSON_POSITION_GAP * i for i in range(1, 5)]
+        )
+
+    def test_bulk_reorder(self):
+        new_order = [self.lessons[i].id for i in (2, 0, 3, 1)]
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.post(self.url, {'lesson_ids': new_order}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['updated_count'], 4)
+        self.assertEqual(self.titles(), ['Funkcje', 'Wstęp', 'Klasy', 'Zmienne'])
+        # Zmiana kolejności zmienia ETag listy
+        self.assertNotEqual(self.client.get(self.list_url)['ETag'], etag)
+
+        # Niepełna lista jest odrzucana
+        response = self.client.post(self.url, {'lesson_ids': new_order[:3]}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_views_use_position_order(self):
+        self.client.post(self.url, {'lesson_ids': [l.id for l in reversed(self.lessons)]}, content_type='application/json')
+        response = self.client.get(reverse('instructor_course_lessons', args=[self.course.id]))
+        self.assertEqual([l.title for l in response.context['lessons']], ['Klasy', 'Funkcje', 'Zmienne', 'Wstęp'])
+
+    def test_only_instructor_can_reorder(self):
+        student = User.objects.create_user(username='student', password='password')
+        self.client.force_login(student)
+        response = self.client.post(self.url, {'lesson_ids': []}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,58 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from kursy.middleware import QueryInspectorMiddleware, NPlusOneError, normalize_sql
+
+User = get_user_model()
+
+
+def n_plus_one_view(request):
+    # Jedno zapytanie o listę + jedno zapytanie na każdy wiersz
+    for user_id in User.objects.values_list('id', flat=True):
+        User.objects.get(pk=user_id)
+    return HttpResponse('ok')
+
+
+def single_query_view(request):
+    list(User.objects.all())
+    return HttpResponse('ok')
+
+
+class QueryInspectorMiddlewareTests(TestCase):
+    def setUp(self):
+        for i in range(4):
+            User.objects.create(username=f'user{i}')
+        self.factory = RequestFactory()
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': False})
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryInspectorMiddleware(single_query_view)
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': True, 'THRESHOLD': 3, 'RAISE': True})
+    def test_raises_on_repeated_shape(self):
+        middleware = QueryInspectorMiddleware(n_plus_one_view)
+        with self.assertRaises(NPlusOneError) as ctx:
+            middleware(self.factory.get('/'))
+        self.assertIn('4x', str(ctx.exception))
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': True, 'THRESHOLD': 3, 'RAISE': False})
+    def test_logs_on_repeated_shape(self):
+        middleware = QueryInspectorMiddleware(n_plus_one_view)
+        with self.assertLogs('kursy.queries', level='WARNING'):
+            response = middleware(self.factory.get('/'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': True, 'THRESHOLD': 3, 'RAISE': True})
+    def test_single_query_passes(self):
+        middleware = QueryInspectorMiddleware(single_query_view)
+        response = middleware(self.factory.get('/'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_normalize_sql(self):
+        """Zapytania różniące się tylko parametrami mają ten sam kształt."""
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'"),
+            normalize_sql("SELECT *  FROM t WHERE id IN (7) AND name = 'y'"),
+        )
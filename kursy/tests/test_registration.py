@@ -47,7 +47,7 @@ class RegistrationAPITest(TestCase):
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(User.objects.filter(email='newuser@example.com').exists())
-        self.assertEqual(response.data['email'], 'newuser@example.com')
+        self.assertEqual(response.json()['email'], 'newuser@example.com')
         
         # Verify default fields if any (e.g., is_active)
         user = User.objects.get(email='newuser@example.com')
@@ -69,8 +69,22 @@ class RegistrationAPITest(TestCase):
         }
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('email', response.data)
-        self.assertEqual(response.data['email'][0], 'User with this email already exists.')
+        self.assertIn('email', response.json())
+        self.assertEqual(response.json()['email'][0], 'User with this email already exists.')
+
+    def test_register_duplicate_email_other_case(self):
+        """Adresy różniące się wielkością liter to ten sam adres."""
+        User.objects.create_user(username='existing@example.com', email='existing@example.com', password='password123')
+
+        data = {
+            'email': ' Existing@Example.COM',
+            'password': 'newpassword123',
+            'first_name': 'Another',
+            'last_name': 'User'
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(User.objects.count(), 1)
 
     def test_register_short_password(self):
         """Test registration with short password fails."""
@@ -82,8 +96,8 @@ class RegistrationAPITest(TestCase):
         }
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('password', response.data)
-        self.assertEqual(response.data['password'][0], 'Password must be at least 8 characters long.')
+        self.assertIn('password', response.json())
+        self.assertEqual(response.json()['password'][0], 'Password must be at least 8 characters long.')
 
     def test_register_missing_fields(self):
         """Test registration with missing fields fails."""
@@ -94,8 +108,8 @@ class RegistrationAPITest(TestCase):
         }
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('email', response.data)
-        self.assertIn('password', response.data)
-        self.assertIn('first_name', response.data)
-        self.assertIn('last_name', response.data)
+        self.assertIn('email', response.json())
+        self.assertIn('password', response.json())
+        self.assertIn('first_name', response.json())
+        self.assertIn('last_name', response.json())
 
@@ -0,0 +1,100 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Lesson, Enrollment
+from kursy.search import COURSE_INDEX, build_match_query
+import io
+
+User = get_user_model()
+
+class SearchAPITests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='instructor', password='password', is_instructor=True)
+        self.student = User.objects.create_user(username='student', password='password')
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Programowanie w Pythonie', description='Podstawy języka i biblioteki standardowej',
+            instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        self.hidden_course = Course.objects.create(
+            name='Python dla zaawansowanych', description='Ukryty kurs',
+            instructor=self.instructor, edition=self.edition, is_visible=False
+        )
+        self.lesson = Lesson.objects.create(
+            title='Generatory', description='Generatory i iteratory w Pythonie', course=self.course, is_published=True
+        )
+        self.draft = Lesson.objects.create(
+            title='Dekoratory', description='Szkic lekcji o Pythonie', course=self.course, is_published=False
+        )
+        self.url = reverse('api_search')
+        self.client = Client()
+        self.client.force_login(self.student)
+
+    def found(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item['type'], item['id']) for item in response.json()['results']]
+
+    def test_visibility_rules(self):
+        # Bez zapisu: tylko widoczne kursy
+        self.assertEqual(self.found('python'), [('course', self.course.id)])
+
+        Enrollment.objects.create(student=self.student, course=self.course, status='approved')
+        self.assertCountEqual(self.found('python'), [('course', self.course.id), ('lesson', self.lesson.id)])
+
+        # Prowadzący widzi swoje ukryte kursy i nieopublikowane lekcje
+        self.client.force_login(self.instructor)
+        self.assertCountEqual(self.found('python'), [
+            ('course', self.course.id), ('course', self.hidden_course.id),
+            ('lesson', self.lesson.id), ('lesson', self.draft.id),
+        ])
+
+    def test_ranking_prefix_and_diacritics(self):
+        # Trafienie w nazwie kursu waży więcej niż w opisie
+        Course.objects.create(
+            name='Bazy danych', description='Dostęp do baz z poziomu Pythona',
+            instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        results = self.found('pyth')
+        self.assertEqual(results[0], ('course', self.course.id))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.found('jezyka'), [('course', self.course.id)])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.course.name = 'Analiza danych'
+        self.course.save()
+        self.assertEqual(self.found('analiza'), [('course', self.course.id)])
+
+        self.course.delete()
+        self.assertEqual(self.found('analiza'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {COURSE_INDEX}')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_pagination(self):
+        for i in range(3):
+            Course.objects.create(
+                name=f'Kurs {i}', description='wspólne słowo',
+                instructor=self.instructor, edition=self.edition, is_visible=True
+            )
+        response = self.client.get(self.url, {'q': 'wspólne', 'page_size': 2})
+        data = response.json()
+        self.assertEqual(len(data['results']), 2)
+        next_page = self.client.get(data['next']).json()
+        self.assertEqual(len(next_page['results']), 1)
+        self.assertIsNone(next_page['next'])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(build_match_query('python OR "NEAR(x'), '"python"* "OR"* "NEAR"* "x"*')
+        self.assertEqual(self.client.get(self.url, {'q': '"*'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {COURSE_INDEX}')
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Zaindeksowano kursy: 2, lekcje: 2', out.getvalue())
+        self.assertEqual(self.found('python'), [('course', self.course.id)])
@@ -0,0 +1,92 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition, Lesson, Enrollment
+
+User = get_user_model()
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.student = User.objects.create_user(username='student', password='password')
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.courses = [
+            Course.objects.create(
+                name=f'Kurs {i}', description='Długi opis', instructor=self.instructor, edition=self.edition,
+                is_visible=True
+            )
+            for i in range(3)
+        ]
+        self.course = self.courses[0]
+        for i in range(3):
+            Lesson.objects.create(title=f'Lekcja {i}', description='Długa treść', course=self.course, is_published=True)
+        Enrollment.objects.create(student=self.student, course=self.course, status='approved')
+        self.client = Client()
+        self.client.force_login(self.instructor)
+        self.courses_url = reverse('api_course_list_create')
+        self.lessons_url = reverse('api_lesson_list_create', args=[self.course.id])
+
+    def test_default_course_shape_is_unchanged(self):
+        course = self.client.get(reverse('api_course_detail', args=[self.course.id])).json()
+        self.assertEqual(course['edition'], {'id': self.edition.id, 'name': 'Edycja 1'})
+        self.assertEqual(course['instructor']['email'], 'inst@test.com')
+
+    def test_course_list_fields_skip_joins(self):
+        with self.assertNumQueries(3):
+            # sesja, użytkownik, strona kursów
+            response = self.client.get(self.courses_url, {'fields': 'id,name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'][0], {'id': self.course.id, 'name': 'Kurs 0'})
+
+        # Pobierane są tylko potrzebne kolumny (i pola sortowania)
+        with self.assertNumQueries(3) as context:
+            self.client.get(self.courses_url, {'fields': 'id,name'})
+        sql = context.captured_queries[-1]['sql']
+        self.assertNotIn('description', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_expand_controls_nesting(self):
+        response = self.client.get(self.courses_url, {'fields': 'id,instructor', 'expand': ''})
+        self.assertEqual(response.json()['results'][0], {'id': self.course.id, 'instructor': self.instructor.id})
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.courses_url, {'fields': 'id,instructor', 'expand': 'instructor'})
+        self.assertEqual(response.json()['results'][0]['instructor']['id'], self.instructor.id)
+
+    def test_lesson_fields_and_course_expansion(self):
+        response = self.client.get(self.lessons_url, {'fields': 'id,title'})
+        self.assertEqual(response.json()[0], {'id': response.json()[0]['id'], 'title': 'Lekcja 0'})
+
+        with self.assertNumQueries(5):
+            # sesja, użytkownik, kurs, agregat ETagu, lekcje z kursem (JOIN)
+            response = self.client.get(self.lessons_url, {'fields': 'id,course', 'expand': 'course'})
+        lesson = response.json()[0]
+        self.assertEqual(lesson['course']['name'], 'Kurs 0')
+        # Relacje rozwiniętego kursu pozostają ID
+        self.assertEqual(lesson['course']['instructor'], self.instructor.id)
+
+        lesson_id = lesson['id']
+        response = self.client.get(
+            reverse('api_lesson_detail', args=[self.course.id, lesson_id]), {'fields': 'id,is_published'}
+        )
+        self.assertEqual(response.json(), {'id': lesson_id, 'is_published': True})
+
+    def test_enrollment_and_attachment_fields(self):
+        response = self.client.get(
+            reverse('api_enrollment_list', args=[self.course.id]), {'fields': 'id,student', 'expand': ''}
+        )
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'student'})
+
+        lesson = self.course.lessons.first()
+        response = self.client.get(
+            reverse('api_attachment_list_create', args=[self.course.id, lesson.id]), {'fields': 'id,size'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get(self.courses_url, {'fields': 'id,password'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.courses_url, {'expand': 'lessons'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.lessons_url, {'expand': 'instructor'}).status_code, status.HTTP_400_BAD_REQUEST)
@@ -2,6 +2,7 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
+from kursy.lessons import move_lesson
 from kursy.models import Course, CourseEdition, Lesson, Enrollment
 
 User = get_user_model()
@@ -105,7 +106,7 @@ class StudentCourseDetailViewTests(TestCase):
         self.assertTemplateUsed(response, 'student/course_detail.html')
 
     def test_lessons_visibility_and_order(self):
-        """Student widzi tylko opublikowane lekcje, posortowane alfabetycznie."""
+        """Student widzi tylko opublikowane lekcje, w kolejności ustalonej przez prowadzącego."""
         self.client.force_login(self.student_approved)
         response = self.client.get(self.url)
         
@@ -114,9 +115,14 @@ class StudentCourseDetailViewTests(TestCase):
         # Powinny być 2 lekcje (draft ukryty)
         self.assertEqual(len(lessons), 2)
         
-        # Sortowanie alfabetyczne po tytule: 'A Lekcja', potem 'B Lekcja'
-        self.assertEqual(lessons[0], self.lesson_published_2)
-        self.assertEqual(lessons[1], self.lesson_published_1)
+        # Sortowanie po pozycji: 'B Lekcja' dodana jako pierwsza, potem 'A Lekcja'
+        self.assertEqual(lessons[0], self.lesson_published_1)
+        self.assertEqual(lessons[1], self.lesson_published_2)
+
+        # Po zmianie kolejności lista ją odzwierciedla
+        move_lesson(self.lesson_published_2, after_id=None)
+        lessons = list(self.client.get(self.url).context['lessons'])
+        self.assertEqual(lessons, [self.lesson_published_2, self.lesson_published_1])
         
         # Draft nie powinien być w ogóle na liście
         self.assertNotIn(self.lesson_draft, lessons)
@@ -0,0 +1,209 @@
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, SimpleTestCase, Client, AsyncClient, RequestFactory, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from kursy.models import Course, CourseEdition
+from kursy.throttling import CacheBucketStore, LocalBucketStore, client_ip, consume, get_store
+
+User = get_user_model()
+
+RATES = {
+    'login_ip': (5, 60),
+    'login_account': (2, 60),
+    'register_ip': (1, 60),
+    'password_reset_ip': (5, 60),
+    'password_reset_account': (1, 60),
+    'enroll_user': (1, 60),
+}
+
+@override_settings(THROTTLE={'STORE': 'local', 'RATES': RATES})
+class ThrottledEndpointsTests(TestCase):
+    def setUp(self):
+        get_store().clear()
+        self.user = User.objects.create_user(
+            username='jan@example.com', email='jan@example.com', password='password123'
+        )
+        self.client = Client()
+
+    async def test_login_throttled_per_account_before_hashing(self):
+        client = AsyncClient()
+        url = reverse('api_login')
+        for _ in range(2):
+            response = await client.post(
+                url, {'email': 'jan@example.com', 'password': 'zle-haslo'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 401)
+
+        with patch('kursy.backends.EmailBackend.aauthenticate') as authenticate:
+            response = await client.post(
+                url, {'email': 'JAN@example.com', 'password': 'password123'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 429)
+        # Token wraca co 30 s (część mogła już wrócić w trakcie haszowania)
+        self.assertIn(int(response['Retry-After']), range(1, 31))
+        authenticate.assert_not_called()
+
+        # Inne konto z tego samego IP nadal może się logować
+        response = await client.post(
+            url, {'email': 'inny@example.com', 'password': 'password123'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_login_throttled_per_ip(self):
+        client = AsyncClient()
+        url = reverse('api_login')
+        for i in range(5):
+            response = await client.post(
+                url, {'email': f'konto{i}@example.com', 'password': 'x'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 401)
+        response = await client.post(
+            url, {'email': 'jan@example.com', 'password': 'password123'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_token_endpoint_shares_login_limits(self):
+        url = reverse('api_token_obtain')
+        for _ in range(2):
+            response = self.client.post(url, {'username': 'jan@example.com', 'password': 'zle-haslo'},
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(url, {'username': 'JAN@example.com', 'password': 'password123'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    async def test_login_ip_limit_ignores_spoofed_forwarded_for(self):
+        client = AsyncClient()
+        url = reverse('api_login')
+        statuses = []
+        for i in range(10):
+            response = await client.post(
+                url, {'email': f'konto{i}@example.com', 'password': 'x'}, content_type='application/json',
+                HTTP_X_FORWARDED_FOR=f'203.0.113.{i}',
+            )
+            statuses.append(response.status_code)
+        self.assertEqual(statuses, [401] * 5 + [429] * 5)
+
+    def test_register_ip_limit_ignores_spoofed_forwarded_for(self):
+        url = reverse('api_register')
+        data = {'password': 'password123', 'first_name': 'A', 'last_name': 'B'}
+        response = self.client.post(
+            url, {**data, 'email': 'nowy@example.com'}, content_type='application/json', HTTP_X_FORWARDED_FOR='1.1.1.1'
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(
+            url, {**data, 'email': 'drugi@example.com'}, content_type='application/json', HTTP_X_FORWARDED_FOR='2.2.2.2'
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_rejected_request_does_not_drain_other_buckets(self):
+        url = reverse('api_password_reset')
+        self.client.post(url, {'email': 'jan@example.com'}, content_type='application/json')
+        # Konto wyczerpane - odrzucone próby nie zużywają limitu IP
+        for _ in range(10):
+            response = self.client.post(url, {'email': 'jan@example.com'}, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post(url, {'email': 'inny@example.com'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_register_throttled_per_ip(self):
+        url = reverse('api_register')
+        data = {'email': 'nowy@example.com', 'password': 'password123', 'first_name': 'A', 'last_name': 'B'}
+        response = self.client.post(url, data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(url, {**data, 'email': 'drugi@example.com'}, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(User.objects.filter(email_key='drugi@example.com').exists())
+
+        # Inny adres IP ma osobne wiadro
+        response = self.client.post(
+            url, {**data, 'email': 'drugi@example.com'}, content_type='application/json', REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_password_reset_throttled_per_account(self):
+        url = reverse('api_password_reset')
+        response = self.client.post(url, {'email': 'jan@example.com'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(url, {'email': ' Jan@Example.com'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response['Retry-After']), range(1, 61))
+
+    def test_enroll_throttled_per_user(self):
+        instructor = User.objects.create_user(
+            username='inst@example.com', email='inst@example.com', password='password123', is_instructor=True
+        )
+        edition = CourseEdition.objects.create(name='Edycja 1')
+        courses = [
+            Course.objects.create(name=f'Kurs {i}', description='Opis', instructor=instructor, edition=edition,
+                                  is_visible=True)
+            for i in range(2)
+        ]
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('api_enroll_course', args=[courses[0].id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('api_enroll_course', args=[courses[1].id]))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(THROTTLE={'ENABLED': False, 'RATES': RATES})
+    def test_disabled(self):
+        url = reverse('api_password_reset')
+        for _ in range(3):
+            response = self.client.post(url, {'email': 'jan@example.com'}, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_bucket_refills_over_time(self):
+        store = LocalBucketStore(max_keys=10)
+        # 2 tokeny, 1 token na 10 s
+        bucket = [('k', 2, 0.1)]
+        self.assertEqual(store.consume(bucket, now=0), 0)
+        self.assertEqual(store.consume(bucket, now=0), 0)
+        self.assertAlmostEqual(store.consume(bucket, now=0), 10)
+        self.assertAlmostEqual(store.consume(bucket, now=5), 5)
+        self.assertEqual(store.consume(bucket, now=10), 0)
+        # Wiadro nie przekracza pojemności
+        self.assertEqual(store.consume(bucket, now=1000), 0)
+        self.assertEqual(store.consume(bucket, now=1000), 0)
+        self.assertGreater(store.consume(bucket, now=1000), 0)
+
+    def test_tokens_taken_only_when_all_buckets_allow(self):
+        store = LocalBucketStore(max_keys=10)
+        self.assertEqual(store.consume([('ip', 3, 1), ('konto', 1, 0.1)], now=0), 0)
+        self.assertAlmostEqual(store.consume([('ip', 3, 1), ('konto', 1, 0.1)], now=0), 10)
+        self.assertEqual(store._buckets['ip'], (2, 0))
+
+    def test_local_store_is_bounded(self):
+        store = LocalBucketStore(max_keys=2)
+        for key in ('a', 'b', 'c'):
+            store.consume([(key, 1, 1)], now=0)
+        self.assertEqual(list(store._buckets), ['b', 'c'])
+
+    def test_client_ip_ignores_forwarded_for_without_proxy(self):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='203.0.113.7', REMOTE_ADDR='10.0.0.1')
+        with override_settings(THROTTLE={'NUM_PROXIES': 0}):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7', REMOTE_ADDR='10.0.0.1')
+        with override_settings(THROTTLE={'NUM_PROXIES': 1}):
+            # Adres dopisany przez proxy, nie podany przez klienta
+            self.assertEqual(client_ip(request), '203.0.113.7')
+
+    @override_settings(THROTTLE={'STORE': 'cache', 'RATES': {'login_ip': (1, 60)}})
+    def test_cache_store(self):
+        caches['default'].clear()
+        self.assertIsInstance(get_store(), CacheBucketStore)
+        with patch('kursy.throttling.time.time', return_value=1000):
+            self.assertEqual(consume([('login_ip', '10.0.0.1')]), 0)
+            self.assertEqual(consume([('login_ip', '10.0.0.1')]), 60)
+        with patch('kursy.throttling.time.time', return_value=1060):
+            self.assertEqual(consume([('login_ip', '10.0.0.1')]), 0)
+
+    @override_settings(THROTTLE={'STORE': 'auto'})
+    def test_auto_store_uses_process_memory_for_locmem_cache(self):
+        self.assertIsInstance(get_store(), LocalBucketStore)
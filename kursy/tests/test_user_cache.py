@@ -0,0 +1,127 @@
+from django.core.cache import caches
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from kursy.models import Course, CourseEdition
+
+User = get_user_model()
+
+@override_settings(USER_CACHE={'STORE': 'cache'})
+class UserCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.instructor = User.objects.create_user(
+            username='instructor', email='inst@test.com', password='password', is_instructor=True
+        )
+        self.edition = CourseEdition.objects.create(name='Edycja 1')
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor, edition=self.edition, is_visible=True
+        )
+        self.url = reverse('api_lesson_list_create', args=[self.course.id])
+
+    def jwt_client(self):
+        token = str(RefreshToken.for_user(self.instructor).access_token)
+        return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_jwt_user_is_cached(self):
+        client = self.jwt_client()
+        client.get(self.url)
+        with self.assertNumQueries(3):
+            # kurs, agregat ETagu, lekcje - bez zapytania o użytkownika
+            response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_session_user_is_cached(self):
+        client = Client()
+        client.force_login(self.instructor)
+        client.get(self.url)
+        with self.assertNumQueries(4):
+            # sesja, kurs, agregat ETagu, lekcje
+            client.get(self.url)
+
+    def test_save_invalidates_cache(self):
+        client = self.jwt_client()
+        client.get(self.url)
+
+        self.instructor.is_active = False
+        self.instructor.save()
+        self.assertEqual(client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_password_change_logs_out_sessions(self):
+        client = Client()
+        client.force_login(self.instructor)
+        self.assertEqual(client.get(self.url).status_code, status.HTTP_200_OK)
+
+        self.instructor.set_password('nowe-haslo')
+        self.instructor.save()
+        self.assertEqual(client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cached_entry_has_no_password(self):
+        client = self.jwt_client()
+        client.get(self.url)
+        data = caches['default'].get(f'kursy:user:{self.instructor.pk}')
+        self.assertNotIn('password', data['fields'])
+        self.assertEqual(data['session_auth_hash'], self.instructor.get_session_auth_hash())
+
+    @override_settings(USER_CACHE={'STORE': 'auto'})
+    def test_process_local_cache_is_bypassed(self):
+        # LocMemCache nie jest współdzielony między procesami - użytkownik zawsze z bazy
+        client = self.jwt_client()
+        client.get(self.url)
+        with self.assertNumQueries(4):
+            # użytkownik, kurs, agregat ETagu, lekcje
+            client.get(self.url)
+        self.assertIsNone(caches['default'].get(f'kursy:user:{self.instructor.pk}'))
+
+
+@override_settings(USER_CACHE={'STATELESS_JWT': True}, THROTTLE={'ENABLED': False})
+class StatelessJWTTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='inst@test.com', email='inst@test.com', password='password123', is_instructor=True
+        )
+        self.course = Course.objects.create(
+            name='Kurs', description='Opis', instructor=self.instructor,
+            edition=CourseEdition.objects.create(name='Edycja 1'), is_visible=True
+        )
+        self.url = reverse('api_lesson_list_create', args=[self.course.id])
+
+    def obtain(self):
+        response = Client().post(
+            reverse('api_token_obtain'), {'username': 'inst@test.com', 'password': 'password123'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_hot_endpoint_without_user_query(self):
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {self.obtain()["access"]}')
+        with self.assertNumQueries(3):
+            # kurs, agregat ETagu, lekcje - użytkownik z claimów tokenu
+            response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_refresh_issues_current_claims(self):
+        tokens = self.obtain()
+        self.assertTrue(AccessToken(tokens['access'])['is_instructor'])
+
+        User.objects.filter(pk=self.instructor.pk).update(is_instructor=False)
+        response = Client().post(reverse('api_token_refresh'), {'refresh': tokens['refresh']},
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken(response.json()['access'])['is_instructor'])
+
+        # Nieaktywne konto nie dostaje nowego tokenu
+        User.objects.filter(pk=self.instructor.pk).update(is_active=False)
+        response = Client().post(reverse('api_token_refresh'), {'refresh': tokens['refresh']},
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(USER_CACHE={'STATELESS_JWT': False})
+    def test_claims_ignored_when_disabled(self):
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {self.obtain()["access"]}')
+        with self.assertNumQueries(4):
+            # użytkownik z bazy, kurs, agregat ETagu, lekcje
+            client.get(self.url)
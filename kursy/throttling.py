@@ -0,0 +1,240 @@
+"""
+Limity żądań (token bucket) dla logowania, rejestracji, resetu hasła
+i zapisów na kursy.
+
+Każdy klucz (zakres + IP lub konto) ma wiadro o pojemności CAPACITY
+tokenów, uzupełniane w tempie CAPACITY / PERIOD tokenów na sekundę.
+Żądanie zużywa jeden token; gdy wiadro jest puste, odpowiedź to 429
+z Retry-After równym czasowi do odzyskania tokenu. Limit jest sprawdzany
+przed haszowaniem hasła, więc koszt CPU przy nadużyciach jest ograniczony.
+
+Stan wiader jest trzymany w pamięci procesu, a jeśli cache
+THROTTLE['CACHE_ALIAS'] jest współdzielony między procesami (np. Redis,
+Memcached) - w cache. Odczyt i zapis w cache nie są atomowe, więc przy
+równoległych żądaniach limit może zostać nieznacznie przekroczony.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+from .models import normalize_email_key
+
+DEFAULT_THROTTLE = {
+    'ENABLED': True,
+    # 'auto' - cache, jeśli jest współdzielony między procesami, w przeciwnym razie pamięć procesu
+    'STORE': 'auto',
+    'CACHE_ALIAS': 'default',
+    # Limit kluczy w pamięci procesu - najdawniej używane są usuwane
+    'MAX_LOCAL_KEYS': 10000,
+    # Liczba zaufanych proxy przed aplikacją (0 - klucz IP to REMOTE_ADDR)
+    'NUM_PROXIES': 0,
+    # zakres -> (pojemność wiadra, czas pełnego uzupełnienia w sekundach)
+    'RATES': {
+        'login_ip': (30, 60),
+        'login_account': (10, 300),
+        'register_ip': (10, 3600),
+        'password_reset_ip': (10, 3600),
+        'password_reset_account': (3, 3600),
+        'enroll_user': (20, 60),
+    },
+}
+KEY_PREFIX = 'kursy:throttle'
+
+
+def throttle_config():
+    configured = getattr(settings, 'THROTTLE', {})
+    return {
+        **DEFAULT_THROTTLE,
+        **configured,
+        'RATES': {**DEFAULT_THROTTLE['RATES'], **configured.get('RATES', {})},
+    }
+
+
+def _take_all(states, buckets, now):
+    """
+    Uzupełnia wiadra za czas od ostatniego żądania i pobiera po tokenie
+    z każdego - ale tylko gdy wszystkie mają wolny token (odrzucone żądanie
+    nie zużywa limitów pozostałych wiader).
+    Zwraca (nowe stany wiader, czas oczekiwania - 0 gdy tokeny pobrano).
+    """
+    levels = {}
+    wait = 0.0
+    for key, capacity, rate in buckets:
+        tokens, updated = states.get(key) or (capacity, now)
+        levels[key] = min(capacity, tokens + max(now - updated, 0) * rate)
+        if levels[key] < 1:
+            wait = max(wait, (1 - levels[key]) / rate)
+    if not wait:
+        levels = {key: tokens - 1 for key, tokens in levels.items()}
+    return {key: (tokens, now) for key, tokens in levels.items()}, wait
+
+
+class LocalBucketStore:
+    """
+    Wiadra w pamięci procesu (LRU ograniczone do `max_keys` kluczy).
+    """
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, buckets, now):
+        with self._lock:
+            states = {key: self._buckets.pop(key, None) for key, _, _ in buckets}
+            states, wait = _take_all(states, buckets, now)
+            self._buckets.update(states)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Wiadra we współdzielonym cache. Wpis wygasa po pełnym uzupełnieniu wiadra.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+
+    def consume(self, buckets, now):
+        states, wait = _take_all(self.cache.get_many([key for key, _, _ in buckets]), buckets, now)
+        timeout = max(math.ceil(capacity / rate) for _, capacity, rate in buckets) + 1
+        self.cache.set_many(states, timeout=timeout)
+        return wait
+
+
+_local_store = None
+_local_store_lock = threading.Lock()
+
+
+def local_store():
+    global _local_store
+    with _local_store_lock:
+        if _local_store is None:
+            _local_store = LocalBucketStore(throttle_config()['MAX_LOCAL_KEYS'])
+    return _local_store
+
+
+@receiver(setting_changed)
+def _reset_local_store(sender, setting, **kwargs):
+    global _local_store
+    if setting == 'THROTTLE':
+        with _local_store_lock:
+            _local_store = None
+
+
+def get_store():
+    config = throttle_config()
+    if config['STORE'] == 'local':
+        return local_store()
+    cache = caches[config['CACHE_ALIAS']]
+    if config['STORE'] == 'auto' and isinstance(cache, (LocMemCache, DummyCache)):
+        # Cache lokalny dla procesu nie daje nic ponad pamięć procesu
+        return local_store()
+    return CacheBucketStore(cache)
+
+
+def consume(checks):
+    """
+    Pobiera token z każdego wiadra z listy [(zakres, identyfikator)].
+    Zwraca najdłuższy czas oczekiwania w sekundach (0 - żądanie dozwolone).
+    """
+    config = throttle_config()
+    if not config['ENABLED']:
+        return 0.0
+    buckets = []
+    for scope, ident in checks:
+        if ident is None:
+            continue
+        capacity, period = config['RATES'][scope]
+        buckets.append((f'{KEY_PREFIX}:{scope}:{ident}', capacity, capacity / period))
+    if not buckets:
+        return 0.0
+    return get_store().consume(buckets, time.time())
+
+
+async def aconsume(checks):
+    """
+    consume() dla widoków asynchronicznych - zapytania do cache poza pętlą zdarzeń.
+    """
+    if isinstance(get_store(), LocalBucketStore):
+        return consume(checks)
+    return await sync_to_async(consume)(checks)
+
+
+def client_ip(request):
+    """
+    Adres klienta dla limitów. Domyślnie REMOTE_ADDR - X-Forwarded-For
+    ustawia klient, więc jest brany pod uwagę tylko za zaufanym proxy
+    (THROTTLE['NUM_PROXIES'] > 0), i to adres dopisany przez to proxy.
+    """
+    num_proxies = throttle_config()['NUM_PROXIES']
+    if num_proxies:
+        forwarded = [addr.strip() for addr in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if addr.strip()]
+        if forwarded:
+            return forwarded[-min(num_proxies, len(forwarded))]
+    return request.META.get('REMOTE_ADDR')
+
+
+def throttled_response(wait):
+    seconds = math.ceil(wait)
+    response = JsonResponse({'detail': f'Zbyt wiele żądań. Spróbuj ponownie za {seconds} s.'}, status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle DRF oparty na consume(). Podklasy definiują get_checks().
+    DRF odpowiada 429 z Retry-After = wait().
+    """
+    def allow_request(self, request, view):
+        self._wait = consume(self.get_checks(request))
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+    def get_checks(self, request):
+        raise NotImplementedError
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """
+    Limity logowania dla endpointu tokenów JWT (jak login_view_api).
+    """
+    def get_checks(self, request):
+        username = request.data.get(get_user_model().USERNAME_FIELD) if hasattr(request.data, 'get') else None
+        return [
+            ('login_ip', client_ip(request)),
+            ('login_account', normalize_email_key(username)),
+        ]
+
+
+class PasswordResetThrottle(TokenBucketThrottle):
+    def get_checks(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return [
+            ('password_reset_ip', client_ip(request)),
+            ('password_reset_account', normalize_email_key(email)),
+        ]
+
+
+class EnrollThrottle(TokenBucketThrottle):
+    def get_checks(self, request):
+        return [('enroll_user', request.user.pk)]
@@ -0,0 +1,299 @@
+"""
+Walidacja załączników i wznawialne przesyłanie plików w częściach.
+
+Protokół: utworzenie sesji (POST) -> kolejne części (PUT z nagłówkiem
+Content-Range) -> finalizacja (POST .../complete/). Części są dopisywane
+do pliku tymczasowego na dysku, więc proces nigdy nie trzyma całego
+pliku w pamięci. Skrót SHA-256 jest liczony przyrostowo w trakcie
+przesyłania; jeśli kolejne części obsługiwał inny proces, skrót jest
+liczony ponownie z pliku tymczasowego przy finalizacji.
+
+Sesje bez nowych części przez ATTACHMENT_UPLOAD_TTL sekund usuwa komenda
+expire_chunked_uploads (razem z plikami tymczasowymi).
+
+W trybie deduplikacji (ATTACHMENT_DEDUPLICATION) klient może podać sumę
+SHA-256 już przy rozpoczęciu - jeśli taka treść jest przechowywana,
+załącznik powstaje od razu, bez przesyłania bajtów.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Attachment, AttachmentBlob, AttachmentUpload, Lesson
+
+ALLOWED_ATTACHMENT_EXTENSIONS = ['.pdf', '.zip', '.pptx', '.docx', '.txt', '.jpg', '.jpeg']
+MAX_ATTACHMENTS_PER_LESSON = 10
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+READ_SIZE = 64 * 1024
+
+# Stan skrótu SHA-256 dla sesji obsługiwanych przez bieżący proces: id -> (offset, hasher)
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """
+    Błąd protokołu przesyłania - niesie komunikat i kod statusu HTTP.
+    """
+    def __init__(self, detail, status_code=400, **extra):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.extra = extra
+
+
+def validate_attachment_name(filename):
+    """
+    Zwraca komunikat błędu dla niedozwolonego rozszerzenia lub None.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in ALLOWED_ATTACHMENT_EXTENSIONS:
+        return f'Niedozwolone rozszerzenie: {ext}'
+    return None
+
+
+def upload_temp_dir():
+    configured = getattr(settings, 'ATTACHMENT_UPLOAD_TEMP_DIR', None)
+    path = Path(configured) if configured else Path(tempfile.gettempdir()) / 'kursy_uploads'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def upload_temp_path(upload):
+    return upload_temp_dir() / f'{upload.pk}.part'
+
+
+def start_upload(lesson, user, filename, total_size):
+    """
+    Tworzy sesję przesyłania i pusty plik tymczasowy.
+    """
+    error = validate_attachment_name(filename)
+    if error:
+        raise UploadError(error)
+    if total_size <= 0:
+        raise UploadError('Nieprawidłowy rozmiar pliku.')
+    if total_size > settings.ATTACHMENT_CHUNKED_MAX_SIZE:
+        max_mb = settings.ATTACHMENT_CHUNKED_MAX_SIZE // (1024 * 1024)
+        raise UploadError(f'Plik jest za duży (max {max_mb}MB).')
+    if lesson.attachments.count() >= MAX_ATTACHMENTS_PER_LESSON:
+        raise UploadError(f'Przekroczono limit {MAX_ATTACHMENTS_PER_LESSON} załączników dla tej lekcji.')
+
+    upload = AttachmentUpload.objects.create(
+        lesson=lesson, uploaded_by=user, original_filename=filename, total_size=total_size
+    )
+    upload_temp_path(upload).touch()
+    with _hashers_lock:
+        _hashers[upload.pk] = (0, hashlib.sha256())
+    return upload
+
+
+def parse_content_range(header, upload):
+    """
+    Zwraca (start, length) z nagłówka 'Content-Range: bytes start-end/total'.
+    """
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        raise UploadError('Wymagany nagłówek Content-Range: bytes start-end/total.')
+    start, end, total = (int(value) for value in match.groups())
+    if total != upload.total_size or end < start or end >= total:
+        raise UploadError('Nieprawidłowy zakres Content-Range.')
+    length = end - start + 1
+    if length > settings.ATTACHMENT_CHUNK_MAX_SIZE:
+        raise UploadError('Część pliku jest za duża.', status_code=413)
+    return start, length
+
+
+def append_chunk(upload, stream, start, length):
+    """
+    Dopisuje część pliku od pozycji `start`. Zwraca nową liczbę odebranych bajtów.
+
+    Część musi zaczynać się dokładnie w miejscu, w którym skończyła się
+    poprzednia - w przeciwnym razie klient dostaje 409 z aktualnym offsetem.
+    Wiersz sesji jest zablokowany na czas zapisu, więc równoległe żądanie
+    z tym samym offsetem czeka, a potem dostaje 409 - bez dotykania pliku.
+    """
+    with transaction.atomic():
+        received_bytes = (
+            AttachmentUpload.objects.select_for_update().filter(pk=upload.pk)
+            .values_list('received_bytes', flat=True).first()
+        )
+        if received_bytes is None:
+            raise UploadError('Przesyłanie zostało przerwane.', status_code=404)
+        upload.received_bytes = received_bytes
+        if start != received_bytes:
+            raise UploadError('Nieprawidłowy offset części.', status_code=409, offset=received_bytes)
+
+        with _hashers_lock:
+            offset, hasher = _hashers.pop(upload.pk, (None, None))
+        if offset != start:
+            hasher = None
+
+        written = 0
+        with open(upload_temp_path(upload), 'r+b') as temp:
+            # Odcinamy ewentualne resztki nieudanej wcześniej próby
+            temp.seek(start)
+            temp.truncate()
+            while written < length:
+                data = stream.read(min(READ_SIZE, length - written))
+                if not data:
+                    break
+                temp.write(data)
+                if hasher is not None:
+                    hasher.update(data)
+                written += len(data)
+
+        received = start + written
+        AttachmentUpload.objects.filter(pk=upload.pk).update(received_bytes=received, updated_at=timezone.now())
+    upload.received_bytes = received
+
+    if hasher is not None:
+        with _hashers_lock:
+            _hashers[upload.pk] = (received, hasher)
+    return received
+
+
+def _final_digest(upload, path):
+    with _hashers_lock:
+        offset, hasher = _hashers.pop(upload.pk, (None, None))
+    if offset == upload.total_size:
+        return hasher.hexdigest()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as temp:
+        for data in iter(lambda: temp.read(READ_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class AssembledFile(File):
+    """
+    Złożony plik tymczasowy - storage przenosi go (rename) zamiast kopiować.
+    """
+    def __init__(self, path):
+        super().__init__(None, name=str(path))
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def finalize_upload(upload, expected_sha256=None):
+    """
+    Tworzy załącznik z kompletnego pliku tymczasowego.
+    """
+    if not upload.is_complete:
+        raise UploadError(
+            'Plik nie został przesłany w całości.', status_code=409, offset=upload.received_bytes
+        )
+    path = upload_temp_path(upload)
+    sha256 = _final_digest(upload, path)
+    if expected_sha256 and expected_sha256.lower() != sha256:
+        raise UploadError('Suma kontrolna pliku się nie zgadza.', status_code=422)
+
+    attachment = None
+    try:
+        with transaction.atomic():
+            # Blokada lekcji serializuje sprawdzenie limitu załączników
+            lesson = Lesson.objects.select_for_update().select_related('course').get(pk=upload.lesson_id)
+            if lesson.attachments.count() >= MAX_ATTACHMENTS_PER_LESSON:
+                raise UploadError(f'Przekroczono limit {MAX_ATTACHMENTS_PER_LESSON} załączników dla tej lekcji.')
+
+            guessed_type, _ = mimetypes.guess_type(upload.original_filename)
+            attachment = Attachment(
+                lesson=lesson,
+                original_filename=upload.original_filename,
+                size_bytes=upload.total_size,
+                sha256=sha256,
+                content_type=guessed_type or 'application/octet-stream',
+            )
+            attachment.store_content(AssembledFile(path), upload.original_filename)
+            attachment.save()
+            upload.delete()
+    except Exception:
+        # Transakcja wycofana - plik zapisany w niej nie ma już wiersza w bazie
+        if attachment is not None:
+            attachment.discard_stored_content()
+        raise
+    # Treść była już w magazynie - plik tymczasowy nie został przeniesiony
+    path.unlink(missing_ok=True)
+    return attachment
+
+
+def attach_existing_content(lesson, filename, sha256, user):
+    """
+    Tworzy załącznik bez przesyłania bajtów, jeśli treść o danej sumie
+    SHA-256 jest już przechowywana (tylko w trybie deduplikacji) i należy
+    do załącznika w kursie tego samego prowadzącego. Suma SHA-256 jest
+    jawna (API, ETag), więc nie może sama w sobie dawać dostępu do treści
+    innych kursów. Zwraca załącznik lub None (wtedy plik trzeba przesłać).
+    """
+    if not settings.ATTACHMENT_DEDUPLICATION or not sha256:
+        return None
+    error = validate_attachment_name(filename)
+    if error:
+        raise UploadError(error)
+    with transaction.atomic():
+        lesson = Lesson.objects.select_for_update().get(pk=lesson.pk)
+        if lesson.attachments.count() >= MAX_ATTACHMENTS_PER_LESSON:
+            raise UploadError(f'Przekroczono limit {MAX_ATTACHMENTS_PER_LESSON} załączników dla tej lekcji.')
+        sha256 = sha256.lower()
+        owned = Attachment.objects.filter(blob__sha256=sha256, lesson__course__instructor=user).exists()
+        if not owned:
+            return None
+        blob = AttachmentBlob.objects.acquire(sha256)
+        if blob is None:
+            return None
+        guessed_type, _ = mimetypes.guess_type(filename)
+        return Attachment.objects.create(
+            lesson=lesson,
+            original_filename=filename,
+            file=blob.file.name,
+            blob=blob,
+            size_bytes=blob.size_bytes,
+            sha256=blob.sha256,
+            content_type=guessed_type or 'application/octet-stream',
+        )
+
+
+def abort_upload(upload):
+    with _hashers_lock:
+        _hashers.pop(upload.pk, None)
+    upload_temp_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def expire_uploads(max_age):
+    """
+    Usuwa sesje przesyłania bez nowych części od `max_age` sekund oraz
+    osierocone pliki tymczasowe (bez sesji w bazie) starsze niż `max_age`.
+    Zwraca (liczba sesji, liczba osieroconych plików).
+    """
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    expired = 0
+    for upload in AttachmentUpload.objects.filter(updated_at__lt=cutoff).iterator():
+        abort_upload(upload)
+        expired += 1
+
+    orphans = 0
+    known = {str(pk) for pk in AttachmentUpload.objects.values_list('pk', flat=True)}
+    oldest_mtime = time.time() - max_age
+    for path in upload_temp_dir().glob('*.part'):
+        if path.stem in known:
+            continue
+        try:
+            if path.stat().st_mtime < oldest_mtime:
+                path.unlink()
+                orphans += 1
+        except FileNotFoundError:
+            # Plik usunięty równolegle (finalizacja lub przerwanie przesyłania)
+            continue
+    return expired, orphans
@@ -1,6 +1,8 @@
 from django.urls import path
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from . import views
 from . import api_views
+from .throttling import LoginThrottle
 
 urlpatterns = [
     # Frontend views
@@ -24,15 +26,29 @@ urlpatterns = [
     # API endpoints
     path('api/auth/login/', api_views.login_view_api, name='api_login'),
     path('api/auth/register/', api_views.register_view_api, name='api_register'),
+    path('api/auth/token/', TokenObtainPairView.as_view(throttle_classes=[LoginThrottle]), name='api_token_obtain'),
+    path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='api_token_refresh'),
     path('api/auth/password-reset/', api_views.password_reset_api, name='api_password_reset'),
+    path('api/batch/', api_views.batch_api, name='api_batch'),
     path('api/courses/', api_views.course_list_create_api, name='api_course_list_create'),
+    path('api/search/', api_views.search_api, name='api_search'),
     path('api/courses/<int:pk>/', api_views.course_detail_api, name='api_course_detail'),
     path('api/courses/<int:course_id>/enroll/', api_views.enroll_course_api, name='api_enroll_course'),
     path('api/courses/<int:course_id>/enrollments/', api_views.enrollment_list_api, name='api_enrollment_list'),
+    path('api/courses/<int:course_id>/enrollments/export/', api_views.enrollment_export_api, name='api_enrollment_export'),
+    path('api/courses/<int:course_id>/enrollments/import/', api_views.enrollment_import_api, name='api_enrollment_import'),
     path('api/courses/<int:course_id>/enrollments/bulk-update/', api_views.enrollment_bulk_update_api, name='api_enrollment_bulk_update'),
+    path('api/courses/<int:course_id>/enrollments/bulk-update-matching/', api_views.enrollment_bulk_update_matching_api, name='api_enrollment_bulk_update_matching'),
+    path('api/courses/<int:course_id>/enrollments/bulk-update/<str:job_id>/', api_views.enrollment_bulk_job_api, name='api_enrollment_bulk_job'),
     path('api/courses/<int:course_id>/lessons/', api_views.lesson_list_create_api, name='api_lesson_list_create'),
+    path('api/courses/<int:course_id>/lessons/reorder/', api_views.lesson_reorder_api, name='api_lesson_reorder'),
+    path('api/courses/<int:course_id>/lessons/batch/', api_views.lesson_batch_api, name='api_lesson_batch'),
     path('api/courses/<int:course_id>/lessons/<int:pk>/', api_views.lesson_detail_api, name='api_lesson_detail'),
     path('api/courses/<int:course_id>/lessons/<int:lesson_id>/attachments/', api_views.attachment_list_create_api, name='api_attachment_list_create'),
     path('api/courses/<int:course_id>/lessons/<int:lesson_id>/attachments/<int:pk>/', api_views.attachment_detail_api, name='api_attachment_detail'),
+    path('api/courses/<int:course_id>/lessons/<int:lesson_id>/attachments/<int:pk>/download/', api_views.AttachmentDownloadAPIView.as_view(), name='api_attachment_download'),
+    path('api/courses/<int:course_id>/lessons/<int:lesson_id>/uploads/', api_views.chunked_upload_create_api, name='api_chunked_upload_create'),
+    path('api/courses/<int:course_id>/lessons/<int:lesson_id>/uploads/<uuid:upload_id>/', api_views.chunked_upload_detail_api, name='api_chunked_upload_detail'),
+    path('api/courses/<int:course_id>/lessons/<int:lesson_id>/uploads/<uuid:upload_id>/complete/', api_views.chunked_upload_complete_api, name='api_chunked_upload_complete'),
     # path('api/auth/register/', api_views.register_view_api, name='api_register'),
 ]
@@ -0,0 +1,125 @@
+"""
+Cache użytkowników uwierzytelnionych sesją lub tokenem JWT.
+
+Każde żądanie API odczytuje użytkownika po ID, a wiersz użytkownika
+zmienia się rzadko - trzymamy go w cache i usuwamy wpis przy każdym
+zapisie lub usunięciu użytkownika (w tym zmianie hasła i last_login).
+Zmiany przez QuerySet.update() omijają sygnały - po nich należy wywołać
+invalidate_users().
+
+Unieważnienie musi dotrzeć do wszystkich procesów serwera, dlatego
+w trybie 'auto' cache jest używany tylko wtedy, gdy jest współdzielony
+(np. Redis, Memcached) - przy LocMemCache użytkownik jest czytany z bazy.
+Hasło nie trafia do cache - zamiast niego zapisywany jest skrót sesji
+(get_session_auth_hash), a pole password jest wczytywane dopiero przy
+pierwszym odczycie.
+
+Opcjonalnie (STATELESS_JWT) użytkownik tokenu dostępu JWT jest odtwarzany
+z podpisanych claimów (email, is_instructor, is_active) bez zapytania
+do bazy - kosztem tego, że ich zmiany są widoczne dopiero w tokenie
+wydanym po odświeżeniu (najpóźniej po ACCESS_TOKEN_LIFETIME).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router, transaction
+
+DEFAULT_USER_CACHE = {
+    # 'auto' - tylko współdzielony cache, 'cache' - zawsze, 'none' - bez cache
+    'STORE': 'auto',
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    'STATELESS_JWT': False,
+}
+KEY_PREFIX = 'kursy:user'
+EXCLUDED_FIELDS = ('password',)
+# Pola użytkownika zapisywane w tokenie dostępu (tryb STATELESS_JWT)
+CLAIM_FIELDS = ('email', 'is_instructor', 'is_active')
+
+
+def user_cache_config():
+    return {**DEFAULT_USER_CACHE, **getattr(settings, 'USER_CACHE', {})}
+
+
+def _cache():
+    """
+    Zwraca cache użytkowników albo None, gdy użytkownicy nie są cache'owani.
+    """
+    config = user_cache_config()
+    if config['STORE'] == 'none':
+        return None
+    cache = caches[config['CACHE_ALIAS']]
+    if config['STORE'] == 'auto' and isinstance(cache, (LocMemCache, DummyCache)):
+        # Cache lokalny dla procesu - unieważnienie nie dotarłoby do pozostałych procesów
+        return None
+    return cache
+
+
+def _key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def _dump(user):
+    fields = {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields if field.attname not in EXCLUDED_FIELDS
+    }
+    return {'fields': fields, 'session_auth_hash': user.get_session_auth_hash()}
+
+
+def _from_values(values):
+    UserModel = get_user_model()
+    # from_db oczekuje wartości w kolejności pól modelu; pominięte pola są odroczone
+    field_names = [field.attname for field in UserModel._meta.concrete_fields if field.attname in values]
+    return UserModel.from_db(router.db_for_read(UserModel), field_names, [values[name] for name in field_names])
+
+
+def _load(data):
+    user = _from_values(data['fields'])
+    user._session_auth_hash = data['session_auth_hash']
+    return user
+
+
+def get_cached_user(user_id):
+    """
+    Zwraca użytkownika o podanym ID (z cache lub z bazy), albo None.
+    """
+    UserModel = get_user_model()
+    cache = _cache()
+    if cache is None:
+        return UserModel._default_manager.filter(pk=user_id).first()
+    data = cache.get(_key(user_id))
+    if data is not None:
+        return _load(data)
+    user = UserModel._default_manager.filter(pk=user_id).first()
+    if user is not None:
+        cache.set(_key(user_id), _dump(user), timeout=user_cache_config()['TIMEOUT'])
+    return user
+
+
+def invalidate_users(user_ids):
+    """
+    Usuwa użytkowników z cache - od razu i ponownie po zatwierdzeniu
+    transakcji (równoległe żądanie mogło w międzyczasie wczytać stare dane).
+    """
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    cache = _cache()
+    if not keys or cache is None:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def user_claims(user):
+    return {field: getattr(user, field) for field in CLAIM_FIELDS}
+
+
+def user_from_claims(user_id, claims):
+    """
+    Odtwarza użytkownika z claimów tokenu bez zapytania do bazy.
+    Pozostałe pola są odroczone - zostaną wczytane przy pierwszym odczycie.
+    """
+    pk = get_user_model()._meta.pk
+    return _from_values({pk.attname: pk.to_python(user_id), **{field: claims[field] for field in CLAIM_FIELDS}})
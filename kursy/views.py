@@ -5,9 +5,11 @@ from django.utils.decorators import method_decorator
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth import logout
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.urls import reverse_lazy, reverse
 from django.http import HttpResponseRedirect
+from .access import approved_course_ids
+from .catalog import catalog_editions, catalog_page, user_statuses
 from .models import Course, Lesson, Enrollment, Attachment
 from .forms import CourseForm, LessonCreateForm, LessonUpdateForm
 
@@ -59,36 +61,40 @@ class StudentMyCoursesView(LoginRequiredMixin, TemplateView):
         context['courses'] = courses
         return context
 
+def _positive_int(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
 class StudentAvailableCoursesView(LoginRequiredMixin, TemplateView):
     """
     Widok 'Dostępne Kursy' dla studenta (Katalog).
-    Prezentuje listę wszystkich kursów w systemie, które mają status "Widoczny".
+    Prezentuje stronicowaną listę kursów, które mają status "Widoczny",
+    z opcjonalnym filtrem edycji (?edition=ID&page=N).
     """
     template_name = 'courses/student/available_courses.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # 1. Pobierz wszystkie widoczne kursy
-        visible_courses = Course.objects.filter(is_visible=True).select_related('instructor', 'edition')
-        
-        # 2. Pobierz zapisy studenta
-        student_enrollments = Enrollment.objects.filter(
-            student=self.request.user
-        ).values('course_id', 'status')
-        
-        enrollment_map = {e['course_id']: e['status'] for e in student_enrollments}
-        
+        edition_id = _positive_int(self.request.GET.get('edition'))
+        number = _positive_int(self.request.GET.get('page')) or 1
+
+        # 1. Strona katalogu - wspólna dla wszystkich studentów, z cache
+        page = catalog_page(edition_id, number)
+
+        # 2. Statusy zapisów studenta tylko dla kursów z tej strony
+        enrollment_map = user_statuses(self.request.user, page['courses'])
+
         # 3. Zbuduj strukturę danych dla szablonu
-        courses_with_status = []
-        for course in visible_courses:
-            status = enrollment_map.get(course.id, 'none')
-            courses_with_status.append({
-                'course': course,
-                'user_status': status
-            })
-            
-        context['courses_with_status'] = courses_with_status
+        context['courses_with_status'] = [
+            {'course': course, 'user_status': enrollment_map.get(course.id, 'none')}
+            for course in page['courses']
+        ]
+        context['page'] = page
+        context['editions'] = catalog_editions()
+        context['selected_edition'] = edition_id
         return context
 
 def begin(request):
@@ -117,9 +123,8 @@ class InstructorDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateV
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        courses = Course.objects.filter(instructor=self.request.user).annotate(
-            pending_count=Count('enrollments', filter=Q(enrollments__status='pending'))
-        ).select_related('edition')
+        # pending_count to licznik utrzymywany na kursie - bez agregacji zapisów
+        courses = Course.objects.filter(instructor=self.request.user).select_related('edition')
         context['courses'] = courses
         return context
 
@@ -204,7 +209,7 @@ class CourseLessonsView(InstructorCourseMixin, TemplateView):
         course = get_object_or_404(Course, pk=course_id, instructor=self.request.user)
         
         context['course'] = course
-        context['lessons'] = course.lessons.annotate(files_count=Count('attachments')).order_by('title')
+        context['lessons'] = course.lessons.annotate(files_count=Count('attachments')).order_by('position', 'id')
         return context
 
 class LessonUpdateView(InstructorCourseMixin, UpdateView):
@@ -270,14 +275,8 @@ class StudentCourseDetailView(LoginRequiredMixin, DetailView):
     def get_object(self, queryset=None):
         course = super().get_object(queryset)
         
-        # Sprawdzenie czy student jest zapisany i zatwierdzony
-        has_enrollment = Enrollment.objects.filter(
-            student=self.request.user,
-            course=course,
-            status='approved'
-        ).exists()
-        
-        if not has_enrollment:
+        # Sprawdzenie czy student jest zapisany i zatwierdzony (zbiór kursów z cache)
+        if course.id not in approved_course_ids(self.request.user):
             raise PermissionDenied("Nie masz dostępu do tego kursu (wymagany zatwierdzony zapis).")
             
         return course
@@ -285,7 +284,7 @@ class StudentCourseDetailView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Pobieranie tylko opublikowanych lekcji
-        context['lessons'] = self.object.lessons.filter(is_published=True).order_by('title')
+        context['lessons'] = self.object.lessons.filter(is_published=True).order_by('position', 'id')
         return context
 
 
@@ -312,14 +311,8 @@ class StudentLessonDetailView(LoginRequiredMixin, DetailView):
         lesson = super().get_object(queryset)
         course = lesson.course
 
-        # Sprawdzenie czy student jest zapisany i zatwierdzony na kurs
-        has_enrollment = Enrollment.objects.filter(
-            student=self.request.user,
-            course=course,
-            status='approved'
-        ).exists()
-
-        if not has_enrollment:
+        # Sprawdzenie czy student jest zapisany i zatwierdzony na kurs (zbiór kursów z cache)
+        if course.id not in approved_course_ids(self.request.user):
             raise PermissionDenied("Nie masz dostępu do tej lekcji (wymagany zatwierdzony zapis na kurs).")
         
         return lesson